@@ -0,0 +1,31 @@
+"""
+Benchmark tree construction time for a range of bucket counts.
+
+Usage::
+
+    python benchmarks/build.py [n]
+
+This builds a CellTree2d for a triangulated grid of ``2 * n * n`` faces
+(default n = 750: 1.125 million faces).
+"""
+import sys
+
+from common import best_of, triangle_grid
+
+from numba_celltree import CellTree2d
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 750
+vertices, faces = triangle_grid(n)
+# Compile first.
+CellTree2d(*triangle_grid(2), -1)
+
+print(f"{len(faces)} faces")
+print("n_buckets  cells_per_leaf  build time (s)")
+for n_buckets in (2, 4, 8, 16):
+    for cells_per_leaf in (1, 2, 4):
+        elapsed = best_of(
+            lambda: CellTree2d(
+                vertices, faces, -1, n_buckets=n_buckets, cells_per_leaf=cells_per_leaf
+            )
+        )
+        print(f"{n_buckets:>9d}  {cells_per_leaf:>14d}  {elapsed:>14.3f}")
@@ -0,0 +1,33 @@
+"""
+Benchmark tree construction time against the number of threads.
+
+Usage::
+
+    python benchmarks/build_threads.py [n]
+
+This builds a CellTree2d for a triangulated grid of ``2 * n * n`` faces
+(default n = 1000: two million faces) for every thread count from one up to
+the number of threads available to numba.
+"""
+import sys
+
+import numba as nb
+from common import best_of, triangle_grid
+
+from numba_celltree import CellTree2d
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+vertices, faces = triangle_grid(n)
+# Compile first.
+CellTree2d(*triangle_grid(2), -1)
+
+max_threads = nb.get_num_threads()
+print(f"{len(faces)} faces")
+print("threads  build time (s)  speedup")
+serial = None
+for n_threads in range(1, max_threads + 1):
+    nb.set_num_threads(n_threads)
+    elapsed = best_of(lambda: CellTree2d(vertices, faces, -1))
+    if serial is None:
+        serial = elapsed
+    print(f"{n_threads:>7d}  {elapsed:>14.3f}  {serial / elapsed:>7.2f}")
@@ -0,0 +1,33 @@
+"""
+Benchmark build time and point location time of the tree builders.
+
+Usage::
+
+    python benchmarks/builders.py [n] [n_point]
+
+This builds a CellTree2d with every builder for a triangulated grid of
+``2 * n * n`` faces (default n = 750: 1.125 million faces), and locates
+``n_point`` random points (default: 1 million).
+"""
+import sys
+
+import numpy as np
+from common import best_of, triangle_grid
+
+from numba_celltree import CellTree2d
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 750
+n_point = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+vertices, faces = triangle_grid(n)
+points = np.random.default_rng(0).uniform(0.0, 1.0, (n_point, 2))
+
+print(f"{len(faces)} faces, {n_point} points")
+print("builder  build time (s)  locate time (s)")
+for builder in ("sah", "lbvh"):
+    # Compile first.
+    tree = CellTree2d(*triangle_grid(2), -1, builder=builder)
+    tree.locate_points(points[:10])
+    elapsed_build = best_of(lambda: CellTree2d(vertices, faces, -1, builder=builder))
+    tree = CellTree2d(vertices, faces, -1, builder=builder)
+    elapsed_locate = best_of(lambda: tree.locate_points(points))
+    print(f"{builder:>7s}  {elapsed_build:>14.3f}  {elapsed_locate:>15.3f}")
@@ -0,0 +1,50 @@
+"""
+Benchmark the bulk box and edge queries, searching the tree twice (count,
+then store) and once (``single_pass=True``).
+
+Usage::
+
+    python benchmarks/bulk_queries.py [n] [n_query]
+
+This searches the faces of a CellTree2d of a triangulated grid of the unit
+square of ``2 * n * n`` faces (default n = 1000: 2 million faces) that
+intersect with ``n_query`` (default: 1 million) random boxes and edges, of
+about one and about five cells across.
+"""
+import sys
+
+import numpy as np
+from common import best_of, triangle_grid
+
+from numba_celltree import CellTree2d
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+n_query = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+vertices, faces = triangle_grid(n)
+tree = CellTree2d(vertices, faces, -1)
+rng = np.random.default_rng(0)
+xy = rng.uniform(0.0, 1.0, (n_query, 2))
+angle = rng.uniform(0.0, 2.0 * np.pi, n_query)
+direction = np.column_stack([np.cos(angle), np.sin(angle)])
+
+# Compile first.
+for single_pass in (False, True):
+    tree.locate_boxes(np.ones((10, 4)), single_pass=single_pass)
+    tree.intersect_edges(np.ones((10, 2, 2)), single_pass=single_pass)
+
+print(f"{len(faces)} faces, {n_query} queries")
+print("                         locate_boxes (s)     intersect_edges (s)")
+print("   size  faces/query  two-pass  single pass  two-pass  single pass")
+for size in (1.0 / n, 5.0 / n):
+    boxes = np.column_stack([xy[:, 0], xy[:, 0] + size, xy[:, 1], xy[:, 1] + size])
+    edges = np.stack([xy, xy + size * direction], axis=1)
+    times = [
+        best_of(lambda: getattr(tree, name)(data, single_pass=single_pass))
+        for name, data in (("locate_boxes", boxes), ("intersect_edges", edges))
+        for single_pass in (False, True)
+    ]
+    n_found = len(tree.locate_boxes(boxes)[0])
+    print(
+        f"{size:>7.3f}  {n_found / n_query:>11.1f}  {times[0]:>8.3f}  "
+        f"{times[1]:>11.3f}  {times[2]:>8.3f}  {times[3]:>11.3f}"
+    )
@@ -0,0 +1,62 @@
+"""
+Benchmark the peak memory of a face overlay, with and without chunking.
+
+Usage::
+
+    python benchmarks/chunked_queries.py [n] [memory_budget_mb]
+
+This overlays two triangulated grids of ``2 * n * n`` faces (default n = 700:
+about 1 million faces each), the second shifted by a fraction of a cell, with
+``CellTree2d.intersect_faces``. Every mode runs in a fresh process, and
+reports the wall clock time and the peak resident memory of the process.
+"""
+import resource
+import subprocess
+import sys
+import time
+
+from common import triangle_grid
+
+from numba_celltree import CellTree2d
+
+
+def run(n: int, memory_budget: int) -> None:
+    vertices, faces = triangle_grid(n)
+    tree = CellTree2d(vertices, faces, -1)
+    other_vertices, other_faces = triangle_grid(n, seed=1)
+    other_vertices += 0.3 / n
+    # Compile first.
+    tree.intersect_faces(other_vertices, other_faces[:10], -1, chunk_size=5)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if memory_budget > 0:
+        n_found = sum(
+            len(i)
+            for i, _, _ in tree.iter_intersect_faces(
+                other_vertices, other_faces, -1, memory_budget=memory_budget
+            )
+        )
+    else:
+        n_found = len(tree.intersect_faces(other_vertices, other_faces, -1)[0])
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    mode = f"budget {memory_budget / 1e6:.0f} MB" if memory_budget else "unchunked"
+    print(
+        f"{mode:>16s}  {n_found:>10d}  {elapsed:>8.3f}"
+        f"  {(peak - before) / 1e3:>17.1f}"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3:
+        run(int(sys.argv[1]), int(sys.argv[3]))
+        sys.exit()
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 700
+    budget = int(float(sys.argv[2]) * 1e6) if len(sys.argv) > 2 else 16_000_000
+    print(f"{2 * n * n} x {2 * n * n} faces")
+    print("            mode     n_found  time (s)  peak increase (MB)")
+    for memory_budget in (0, budget):
+        subprocess.run(
+            [sys.executable, __file__, str(n), "0", str(memory_budget)],
+            check=True,
+        )
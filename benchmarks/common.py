@@ -0,0 +1,44 @@
+"""
+Utilities shared by the benchmark scripts.
+
+The scripts in this directory are not part of the test suite. Run them
+directly, e.g.::
+
+    python benchmarks/build_threads.py
+"""
+import time
+from typing import Callable, Tuple
+
+import numpy as np
+
+from numba_celltree.constants import FloatArray, IntArray
+
+
+def triangle_grid(n: int, seed: int = 0) -> Tuple[FloatArray, IntArray]:
+    """
+    Generate a perturbed, triangulated grid of the unit square with
+    ``2 * n * n`` triangles, shuffled to mimic the face order of a mesh
+    generator.
+    """
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0.0, 1.0, n + 1)
+    xx, yy = np.meshgrid(x, x, indexing="ij")
+    vertices = np.column_stack([xx.ravel(), yy.ravel()])
+    vertices += rng.uniform(-0.25 / n, 0.25 / n, vertices.shape)
+    a = (np.arange(n)[:, None] * (n + 1) + np.arange(n)[None, :]).ravel()
+    lower = np.column_stack([a, a + n + 1, a + n + 2])
+    upper = np.column_stack([a, a + n + 2, a + 1])
+    faces = np.concatenate([lower, upper])
+    return vertices, faces[rng.permutation(len(faces))]
+
+
+def best_of(f: Callable, repeat: int = 3) -> float:
+    """
+    Return the shortest wall clock time of ``repeat`` calls of ``f``.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+    return min(times)
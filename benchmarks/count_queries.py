@@ -0,0 +1,59 @@
+"""
+Benchmark the count-only queries against the queries they count.
+
+Usage::
+
+    python benchmarks/count_queries.py [n] [n_query]
+
+This counts the faces of a CellTree2d of a triangulated grid of the unit
+square of ``2 * n * n`` faces (default n = 1000: 2 million faces) that
+intersect with ``n_query`` (default: 1 million) random boxes and edges of
+about five cells across, and the number of ``n_query`` random points per
+face.
+"""
+import sys
+
+import numpy as np
+from common import best_of, triangle_grid
+
+from numba_celltree import CellTree2d
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+n_query = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+vertices, faces = triangle_grid(n)
+tree = CellTree2d(vertices, faces, -1)
+rng = np.random.default_rng(0)
+xy = rng.uniform(0.0, 1.0, (n_query, 2))
+angle = rng.uniform(0.0, 2.0 * np.pi, n_query)
+size = 5.0 / n
+boxes = np.column_stack([xy[:, 0], xy[:, 0] + size, xy[:, 1], xy[:, 1] + size])
+edges = np.stack([xy, xy + size * np.column_stack([np.cos(angle), np.sin(angle)])], 1)
+
+# Compile first.
+tree.locate_boxes(boxes[:10])
+tree.count_boxes(boxes[:10])
+tree.intersect_edges(edges[:10])
+tree.count_edges(edges[:10])
+tree.locate_points(xy[:10])
+tree.count_points_per_face(xy[:10])
+
+print(f"{len(faces)} faces, {n_query} queries")
+print("                                       query (s)  count (s)")
+for name, query, count in (
+    (
+        "locate_boxes / count_boxes",
+        lambda: tree.locate_boxes(boxes),
+        lambda: tree.count_boxes(boxes),
+    ),
+    (
+        "intersect_edges / count_edges",
+        lambda: tree.intersect_edges(edges),
+        lambda: tree.count_edges(edges),
+    ),
+    (
+        "locate_points + bincount",
+        lambda: np.bincount(tree.locate_points(xy) + 1, minlength=len(faces) + 1),
+        lambda: tree.count_points_per_face(xy),
+    ),
+):
+    print(f"{name:>37s}  {best_of(query):>9.3f}  {best_of(count):>9.3f}")
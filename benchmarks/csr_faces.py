@@ -0,0 +1,42 @@
+"""
+Benchmark the storage of faces of a mesh padded to many nodes per face.
+
+Usage::
+
+    python benchmarks/csr_faces.py [n] [n_point]
+
+This builds a CellTree2d for a triangulated grid of ``2 * n * n`` faces
+(default n = 500: 0.5 million faces), with the faces padded with fill values
+to 3, 8, and 32 columns: as for a mesh of triangles containing a single
+octagon or 32-gon. It reports the memory used to store the faces, and
+locates ``n_point`` random points (default: 1 million).
+"""
+import sys
+
+import numpy as np
+from common import best_of, triangle_grid
+
+from numba_celltree import CellTree2d
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+n_point = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+vertices, triangles = triangle_grid(n)
+points = np.random.default_rng(0).uniform(0.0, 1.0, (n_point, 2))
+
+print(f"{len(triangles)} faces, {n_point} points")
+print("n_max_vert  face bytes (MB)  build time (s)  locate points (s)")
+for n_max_vert in (3, 8, 32):
+    faces = np.full((len(triangles), n_max_vert), -1, dtype=np.intp)
+    faces[:, :3] = triangles
+    # Compile first.
+    tree = CellTree2d(*triangle_grid(2), -1)
+    tree.locate_points(points[:10])
+    elapsed_build = best_of(lambda: CellTree2d(vertices, faces, -1))
+    tree = CellTree2d(vertices, faces, -1)
+    nbytes = tree.stats()["nbytes"]
+    face_bytes = sum(v for k, v in nbytes.items() if k.startswith("face"))
+    elapsed_points = best_of(lambda: tree.locate_points(points))
+    print(
+        f"{n_max_vert:>10d}  {face_bytes / 1e6:>15.1f}  {elapsed_build:>14.3f}"
+        f"  {elapsed_points:>17.3f}"
+    )
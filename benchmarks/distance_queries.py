@@ -0,0 +1,56 @@
+"""
+Benchmark the radius and k-nearest face queries.
+
+Usage::
+
+    python benchmarks/distance_queries.py [n] [n_point]
+
+This searches the faces near ``n_point`` random points (default: 1 million)
+in a CellTree2d of a triangulated grid of the unit square of ``2 * n * n``
+faces (default n = 1000: 2 million faces), for a radius of about one, and of
+about three cells, in two passes and in a single pass, and for the nearest one
+and eight faces. For comparison, ``locate_boxes`` finds the candidates within
+the bounding box of every circle, without computing any distance.
+"""
+import sys
+
+import numpy as np
+from common import best_of, triangle_grid
+
+from numba_celltree import CellTree2d
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+n_point = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+vertices, faces = triangle_grid(n)
+tree = CellTree2d(vertices, faces, -1)
+points = np.random.default_rng(0).uniform(0.0, 1.0, (n_point, 2))
+
+# Compile first.
+tree.locate_within_distance(points[:10], 0.1)
+tree.locate_within_distance(points[:10], 0.1, single_pass=True)
+tree.locate_k_nearest(points[:10], 2)
+tree.locate_boxes(np.ones((10, 4)))
+
+print(f"{len(faces)} faces, {n_point} points")
+print(
+    "  radius  locate_boxes (s)  within_distance (s)  single pass (s)  faces per point"
+)
+for radius in (1.0 / n, 3.0 / n):
+    boxes = np.column_stack(
+        [points[:, 0] - radius, points[:, 0] + radius]
+        + [points[:, 1] - radius, points[:, 1] + radius]
+    )
+    elapsed_boxes = best_of(lambda: tree.locate_boxes(boxes))
+    elapsed = best_of(lambda: tree.locate_within_distance(points, radius))
+    elapsed_single = best_of(
+        lambda: tree.locate_within_distance(points, radius, single_pass=True)
+    )
+    offsets, _, _ = tree.locate_within_distance(points, radius)
+    print(
+        f"{radius:>8.4f}  {elapsed_boxes:>16.3f}  {elapsed:>19.3f}  "
+        f"{elapsed_single:>15.3f}  {offsets[-1] / n_point:>15.1f}"
+    )
+
+print("  k  locate_k_nearest (s)")
+for k in (1, 8):
+    print(f"{k:>3d}  {best_of(lambda: tree.locate_k_nearest(points, k)):>20.3f}")
@@ -0,0 +1,56 @@
+"""
+Benchmark point location of slowly moving particles, with and without the
+face of the previous step as a hint.
+
+Usage::
+
+    python benchmarks/hinted_points.py [n] [n_point] [n_step]
+
+This moves ``n_point`` random particles (default: 2 million) ``n_step``
+steps (default: 10) through a CellTree2d of a triangulated grid of
+``2 * n * n`` faces (default n = 1000: 2 million faces). Every step moves a
+particle a random distance of at most half a cell.
+"""
+import sys
+
+import numpy as np
+from common import best_of, triangle_grid
+
+from numba_celltree import CellTree2d
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+n_point = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000_000
+n_step = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+vertices, faces = triangle_grid(n)
+tree = CellTree2d(vertices, faces, -1)
+
+rng = np.random.default_rng(0)
+start = rng.uniform(0.0, 1.0, (n_point, 2))
+steps = rng.uniform(-0.5 / n, 0.5 / n, (n_step, n_point, 2))
+trajectories = start + np.cumsum(steps, axis=0)
+
+# Compile first; this also computes the face neighbors.
+first = tree.locate_points(trajectories[0])
+tree.locate_points(trajectories[0, :10], hint=first[:10])
+tree.locate_trajectories(trajectories[:2, :10])
+
+
+def without_hint():
+    for points in trajectories:
+        tree.locate_points(points)
+
+
+def with_hint():
+    hint = first
+    for points in trajectories:
+        hint = tree.locate_points(points, hint=hint)
+
+
+print(f"{len(faces)} faces, {n_point} particles, {n_step} steps")
+print("                     method  time (s)")
+for name, f in (
+    ("locate_points", without_hint),
+    ("locate_points with hint", with_hint),
+    ("locate_trajectories", lambda: tree.locate_trajectories(trajectories, first)),
+):
+    print(f"{name:>27s}  {best_of(f):>8.3f}")
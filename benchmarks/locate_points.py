@@ -0,0 +1,31 @@
+"""
+Benchmark point location time.
+
+Usage::
+
+    python benchmarks/locate_points.py [n] [n_point]
+
+This locates ``n_point`` random points (default: 2 million) in a CellTree2d
+of a triangulated grid of ``2 * n * n`` faces (default n = 750: 1.125 million
+faces).
+"""
+import sys
+
+import numpy as np
+from common import best_of, triangle_grid
+
+from numba_celltree import CellTree2d
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 750
+n_point = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000_000
+vertices, faces = triangle_grid(n)
+points = np.random.default_rng(0).uniform(0.0, 1.0, (n_point, 2))
+
+print(f"{len(faces)} faces, {n_point} points")
+print("cells_per_leaf  node bytes  locate time (s)")
+for cells_per_leaf in (1, 2, 4):
+    tree = CellTree2d(vertices, faces, -1, cells_per_leaf=cells_per_leaf)
+    # Compile first.
+    tree.locate_points(points[:10])
+    elapsed = best_of(lambda: tree.locate_points(points))
+    print(f"{cells_per_leaf:>14d}  {tree.nodes.nbytes:>10d}  {elapsed:>15.3f}")
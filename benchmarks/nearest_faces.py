@@ -0,0 +1,43 @@
+"""
+Benchmark the nearest face search, for points inside and outside of the mesh.
+
+Usage::
+
+    python benchmarks/nearest_faces.py [n] [n_point]
+
+This searches the nearest face for ``n_point`` points (default: 1 million) in
+a CellTree2d of a triangulated grid of the unit square of ``2 * n * n`` faces
+(default n = 1000: 2 million faces): random points inside of the mesh, and
+random points just outside of it, within a tenth of its size.
+"""
+import sys
+
+import numpy as np
+from common import best_of, triangle_grid
+
+from numba_celltree import CellTree2d
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+n_point = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+vertices, faces = triangle_grid(n)
+tree = CellTree2d(vertices, faces, -1)
+
+rng = np.random.default_rng(0)
+inside = rng.uniform(0.0, 1.0, (n_point, 2))
+# Move the points across the nearest side of the square.
+outside = inside.copy()
+side = rng.integers(0, 4, n_point)
+offset = rng.uniform(0.0, 0.1, n_point)
+for s, (dim, value, sign) in enumerate([(0, 0, -1), (0, 1, 1), (1, 0, -1), (1, 1, 1)]):
+    outside[side == s, dim] = value + sign * offset[side == s]
+
+# Compile first.
+tree.locate_points(inside[:10])
+tree.locate_nearest_faces(inside[:10])
+
+print(f"{len(faces)} faces, {n_point} points")
+print("  points  locate_points (s)  locate_nearest_faces (s)")
+for name, points in (("inside", inside), ("outside", outside)):
+    elapsed = best_of(lambda: tree.locate_points(points))
+    elapsed_nearest = best_of(lambda: tree.locate_nearest_faces(points))
+    print(f"{name:>8s}  {elapsed:>17.3f}  {elapsed_nearest:>24.3f}")
@@ -0,0 +1,42 @@
+"""
+Benchmark the leaf tests with and without packed polygon coordinates.
+
+Usage::
+
+    python benchmarks/packed_polygons.py [n] [n_point]
+
+This builds a CellTree2d for a triangulated grid of ``2 * n * n`` faces
+(default n = 750: 1.125 million faces), with ``pack_polygons`` False and
+True. It locates ``n_point`` random points (default: 1 million), and
+intersects ``n_point // 100`` random edges.
+"""
+import sys
+
+import numpy as np
+from common import best_of, triangle_grid
+
+from numba_celltree import CellTree2d
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 750
+n_point = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+vertices, faces = triangle_grid(n)
+rng = np.random.default_rng(0)
+points = rng.uniform(0.0, 1.0, (n_point, 2))
+edges = rng.uniform(0.0, 1.0, (n_point // 100, 2, 2))
+edges[:, 1] = edges[:, 0] + rng.uniform(-0.05, 0.05, (n_point // 100, 2))
+
+print(f"{len(faces)} faces, {n_point} points, {len(edges)} edges")
+print("pack_polygons  build time (s)  locate points (s)  intersect edges (s)")
+for pack in (False, True):
+    # Compile first.
+    tree = CellTree2d(*triangle_grid(2), -1, pack_polygons=pack)
+    tree.locate_points(points[:10])
+    tree.intersect_edges(edges[:10])
+    elapsed_build = best_of(lambda: CellTree2d(vertices, faces, -1, pack_polygons=pack))
+    tree = CellTree2d(vertices, faces, -1, pack_polygons=pack)
+    elapsed_points = best_of(lambda: tree.locate_points(points))
+    elapsed_edges = best_of(lambda: tree.intersect_edges(edges))
+    print(
+        f"{str(pack):>13s}  {elapsed_build:>14.3f}  {elapsed_points:>17.3f}"
+        f"  {elapsed_edges:>19.3f}"
+    )
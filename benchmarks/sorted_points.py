@@ -0,0 +1,48 @@
+"""
+Benchmark point location with and without ordering the points along a Morton
+curve.
+
+Usage::
+
+    python benchmarks/sorted_points.py [n] [n_point]
+
+This locates ``n_point`` points (default: 4 million) in a CellTree2d of a
+triangulated grid of ``2 * n * n`` faces (default n = 1000: 2 million faces),
+in three orders: random, as e.g. shuffled particles; row by row, as the cell
+centres of a raster; and already sorted along a Morton curve.
+"""
+import sys
+
+import numpy as np
+from common import best_of, triangle_grid
+
+from numba_celltree import CellTree2d
+from numba_celltree.lbvh import morton_order
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+n_point = int(sys.argv[2]) if len(sys.argv) > 2 else 4_000_000
+vertices, faces = triangle_grid(n)
+tree = CellTree2d(vertices, faces, -1)
+
+rng = np.random.default_rng(0)
+random_points = rng.uniform(0.0, 1.0, (n_point, 2))
+n_row = int(np.sqrt(n_point))
+x = (np.arange(n_row) + 0.5) / n_row
+xx, yy = np.meshgrid(x, x)
+row_points = np.column_stack([xx.ravel(), yy.ravel()])
+sorted_points = random_points[morton_order(random_points, tree.bbox)]
+
+# Compile first.
+tree.locate_points(random_points[:10])
+tree.locate_points(random_points[:10], sort="morton")
+
+print(f"{len(faces)} faces, {n_point} points")
+print("  point order  sort=None (s)  sort='morton' (s)")
+for name, points in (
+    ("random", random_points),
+    ("rows", row_points),
+    ("morton", sorted_points),
+):
+    elapsed = best_of(lambda: tree.locate_points(points))
+    elapsed_sorted = best_of(lambda: tree.locate_points(points, sort="morton"))
+    print(f"{name:>13s}  {elapsed:>13.3f}  {elapsed_sorted:>17.3f}")
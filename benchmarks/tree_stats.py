@@ -0,0 +1,45 @@
+"""
+Report the quality of the tree for a range of build parameters, next to the
+point location time.
+
+Usage::
+
+    python benchmarks/tree_stats.py [n] [n_point]
+
+This builds a CellTree2d for a triangulated grid of ``2 * n * n`` faces
+(default n = 300), for every combination of ``n_buckets`` and
+``cells_per_leaf``, and locates ``n_point`` random points (default: 1
+million).
+"""
+import sys
+
+import numpy as np
+from common import best_of, triangle_grid
+
+from numba_celltree import CellTree2d
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+n_point = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+vertices, faces = triangle_grid(n)
+points = np.random.default_rng(0).uniform(0.0, 1.0, (n_point, 2))
+
+# Compile first.
+CellTree2d(*triangle_grid(2), -1).locate_points(points[:10])
+
+print(f"{len(faces)} faces, {n_point} points")
+print(
+    "n_buckets  cells_per_leaf  max_depth  mean_leaf_size  relative_overlap"
+    "  sah_cost  nodes (MB)  locate time (s)"
+)
+for n_buckets in (2, 4, 8):
+    for cells_per_leaf in (1, 2, 4, 8):
+        tree = CellTree2d(vertices, faces, -1, n_buckets, cells_per_leaf)
+        stats = tree.stats()
+        elapsed = best_of(lambda: tree.locate_points(points))
+        print(
+            f"{n_buckets:>9d}  {cells_per_leaf:>14d}  {stats['max_depth']:>9d}"
+            f"  {stats['mean_leaf_size']:>14.2f}"
+            f"  {stats['mean_relative_overlap']:>16.3f}"
+            f"  {stats['sah_cost']:>8.1f}"
+            f"  {stats['nbytes']['nodes'] / 1e6:>10.2f}  {elapsed:>15.3f}"
+        )
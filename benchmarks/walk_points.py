@@ -0,0 +1,46 @@
+"""
+Benchmark point location by searching the tree, and by walking across the
+mesh.
+
+Usage::
+
+    python benchmarks/walk_points.py [n] [n_point]
+
+This locates ``n_point`` points (default: 4 million) in a CellTree2d of a
+triangulated grid of ``2 * n * n`` faces (default n = 1000: 2 million faces):
+densely spaced points along a zigzagging transect, and random points, as is
+and ordered along a Morton curve.
+"""
+import sys
+
+import numpy as np
+from common import best_of, triangle_grid
+
+from numba_celltree import CellTree2d
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+n_point = int(sys.argv[2]) if len(sys.argv) > 2 else 4_000_000
+vertices, faces = triangle_grid(n)
+tree = CellTree2d(vertices, faces, -1)
+
+t = np.linspace(0.0, 1.0, n_point)
+transect = np.column_stack([t, 0.5 + 0.4 * np.sin(40.0 * np.pi * t)])
+random_points = np.random.default_rng(0).uniform(0.0, 1.0, (n_point, 2))
+
+# Compile first; this also computes the face neighbors.
+for method in ("tree", "walk"):
+    for sort in (None, "morton"):
+        tree.locate_points(transect[:10], sort=sort, method=method)
+
+print(f"{len(faces)} faces, {n_point} points")
+print("     points      sort  method='tree' (s)  method='walk' (s)")
+for name, points, sort in (
+    ("transect", transect, None),
+    ("random", random_points, None),
+    ("random", random_points, "morton"),
+):
+    times = [
+        best_of(lambda: tree.locate_points(points, sort=sort, method=method))
+        for method in ("tree", "walk")
+    ]
+    print(f"{name:>11s}  {str(sort):>8s}  {times[0]:>17.3f}  {times[1]:>17.3f}")
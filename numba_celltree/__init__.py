@@ -1 +1,4 @@
+from .aabbtree import AABBTree2d
 from .celltree import CellTree2d
+from .edgetree import EdgeTree2d
+from .forest import CellTreeForest
@@ -0,0 +1,175 @@
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from .celltree import (
+    bbox_tree,
+    cast_bboxes,
+    cast_vertices,
+    check_build_arguments,
+)
+from .constants import (
+    MAX_N_FACE,
+    BoolArray,
+    CellTreeData,
+    FloatArray,
+    FloatDType,
+    IntArray,
+    IntDType,
+)
+from .creation import initialize_bboxes
+from .query import collect_node_bounds, locate_boxes, validate_node_bounds
+from .statistics import tree_statistics
+
+
+class AABBTree2d:
+    """
+    Construct a bounding volume tree from axis-aligned bounding boxes alone.
+
+    This tree uses the same construction and traversal as
+    :class:`CellTree2d`, but has no faces: the queries return every box that
+    intersects, without an additional polygon test. It can index any
+    feature that can be represented by a box, such as points (boxes of zero
+    size), raster cells, or the extents of building footprints.
+
+    Unlike for :class:`CellTree2d`, boxes sharing only an edge or a corner are
+    considered intersecting, so that points and boxes of zero size are found.
+
+    Parameters
+    ----------
+    bbox_coords: ndarray of floats with shape ``(n_box, 4)``
+        Every row containing ``(xmin, xmax, ymin, ymax)``.
+    n_buckets: int, optional, default: 4
+        The number of "buckets" used in tree construction. Must be higher
+        or equal to 2. Values over 8 provide diminishing returns.
+    cells_per_leaf: int, optional, default: 2
+        The number of boxes in the leaf nodes of the tree.
+    builder: str, optional, default: "sah"
+        The tree construction strategy, see :class:`CellTree2d`.
+    """
+
+    def __init__(
+        self,
+        bbox_coords: FloatArray,
+        n_buckets: int = 4,
+        cells_per_leaf: int = 2,
+        builder: str = "sah",
+    ):
+        check_build_arguments(n_buckets, cells_per_leaf, builder)
+        bbox_coords = cast_bboxes(bbox_coords)
+        if len(bbox_coords) > MAX_N_FACE:
+            raise ValueError(
+                f"bbox_coords contains {len(bbox_coords)} boxes. "
+                f"numba_celltree supports a maximum of {MAX_N_FACE} boxes."
+            )
+        if (bbox_coords[:, 0] > bbox_coords[:, 1]).any() or (
+            bbox_coords[:, 2] > bbox_coords[:, 3]
+        ).any():
+            raise ValueError("bbox_coords must satisfy xmin <= xmax, ymin <= ymax")
+
+        nodes, bb_indices = initialize_bboxes(
+            bbox_coords, n_buckets, cells_per_leaf, builder=builder
+        )
+        self.bb_coords = bbox_coords
+        self.n_buckets = n_buckets
+        self.cells_per_leaf = cells_per_leaf
+        self.builder = builder
+        self.nodes = nodes
+        self.bb_indices = bb_indices
+        self.bbox = bbox_tree(bbox_coords)
+        # The box queries do not access the faces and vertices.
+        self.celltree_data = CellTreeData(
+            np.empty(0, dtype=IntDType),
+            np.zeros(1, dtype=IntDType),
+            0,
+            np.empty((0, 2), dtype=FloatDType),
+            self.nodes,
+            self.bb_indices,
+            self.bb_coords,
+            self.bbox,
+            self.cells_per_leaf,
+            np.empty((0, 2), dtype=FloatDType),
+            np.empty(0, dtype=IntDType),
+        )
+
+    def locate_points(self, points: FloatArray) -> Tuple[IntArray, IntArray]:
+        """
+        Finds the index of a box containing a point, including points on the
+        boundary of the box.
+
+        Parameters
+        ----------
+        points: ndarray of floats with shape ``(n_point, 2)``
+
+        Returns
+        -------
+        point_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the point.
+        tree_bbox_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the box.
+        """
+        points = cast_vertices(points)
+        bbox_coords = np.ascontiguousarray(points[:, [0, 0, 1, 1]])
+        return locate_boxes(bbox_coords, self.celltree_data, True)
+
+    def locate_boxes(self, bbox_coords: FloatArray) -> Tuple[IntArray, IntArray]:
+        """
+        Finds the index of a box intersecting with a bounding box.
+
+        Parameters
+        ----------
+        bbox_coords: ndarray of floats with shape ``(n_box, 4)``
+            Every row containing ``(xmin, xmax, ymin, ymax)``.
+
+        Returns
+        -------
+        bbox_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the bounding box.
+        tree_bbox_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the tree box.
+        """
+        bbox_coords = cast_bboxes(bbox_coords)
+        return locate_boxes(bbox_coords, self.celltree_data, True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Compute statistics describing the quality of the tree. See
+        :meth:`CellTree2d.stats`; the leaf sizes count boxes rather than
+        faces.
+
+        Returns
+        -------
+        stats: dict
+        """
+        return tree_statistics(
+            self.nodes,
+            self.bb_indices,
+            self.bb_coords,
+            {
+                "nodes": self.nodes,
+                "bb_indices": self.bb_indices,
+                "bb_coords": self.bb_coords,
+            },
+        )
+
+    @property
+    def node_bounds(self) -> FloatArray:
+        """
+        Return the bounds (xmin, xmax, ymin, ymax) for every node of the tree.
+        """
+        return collect_node_bounds(self.celltree_data)
+
+    def validate_node_bounds(self) -> BoolArray:
+        """
+        Traverse the tree. Check whether all children are contained in the bounding
+        box.
+
+        For the leaf nodes, check whether the bounding boxes are contained.
+
+        Returns
+        -------
+        node_validity: np.array of bool
+            For each node, whether all children are fully contained by its
+            bounds.
+        """
+        return validate_node_bounds(self.celltree_data, self.node_bounds)
@@ -0,0 +1,88 @@
+"""
+Face-face adjacency of a mesh.
+
+Every face of ``n`` nodes has ``n`` edges: edge ``k`` runs from
+``face_nodes[k]`` to the next node of the face. The neighbors are stored
+alongside ``face_nodes``: ``neighbors[k]`` is the face on the other side of
+edge ``k``, or -1 on the boundary of the mesh.
+
+Two edges are shared when they connect the same pair of nodes. The edges are
+identified by a key of their sorted nodes; sorting the keys with the parallel
+radix sort of the LBVH builder places shared edges next to each other. The
+keys go up to ``n_vertex ** 2 + n_edge``, which limits the number of vertices
+to about 3e9.
+"""
+import numba as nb
+import numpy as np
+
+from .constants import INT_MAX, PARALLEL, BoolArray, IntArray, IntDType
+from .lbvh import radix_sort
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def edge_keys(
+    face_nodes: IntArray, face_offsets: IntArray, n_vertex: int, contained: BoolArray
+):
+    """
+    Compute a key identifying every edge, and the face of every edge. The
+    edges of faces not contained in the tree get a unique key, so that they
+    have no neighbors.
+    """
+    n_face = len(face_offsets) - 1
+    n_edge = len(face_nodes)
+    keys = np.empty(n_edge, dtype=IntDType)
+    edge_face = np.empty(n_edge, dtype=IntDType)
+    unique_key = n_vertex * n_vertex
+    for i in nb.prange(n_face):  # pylint: disable=not-an-iterable
+        start = face_offsets[i]
+        end = face_offsets[i + 1]
+        for k in range(start, end):
+            edge_face[k] = i
+            if not contained[i]:
+                keys[k] = unique_key + k
+                continue
+            a = face_nodes[k]
+            b = face_nodes[k + 1] if k + 1 < end else face_nodes[start]
+            keys[k] = min(a, b) * n_vertex + max(a, b)
+    return keys, edge_face
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def pair_edges(keys: IntArray, edges: IntArray, edge_face: IntArray) -> IntArray:
+    """
+    Find the neighbors from the sorted edge keys. Only edges shared by exactly
+    two faces have neighbors.
+    """
+    n = len(keys)
+    neighbors = np.full(n, -1, dtype=IntDType)
+    for s in nb.prange(n - 1):  # pylint: disable=not-an-iterable
+        key = keys[s]
+        if keys[s + 1] != key:
+            continue
+        if s > 0 and keys[s - 1] == key:
+            continue
+        if s + 2 < n and keys[s + 2] == key:
+            continue
+        a = edges[s]
+        b = edges[s + 1]
+        neighbors[a] = edge_face[b]
+        neighbors[b] = edge_face[a]
+    return neighbors
+
+
+def face_neighbors(
+    face_nodes: IntArray, face_offsets: IntArray, n_vertex: int, contained: BoolArray
+) -> IntArray:
+    """
+    Return for every edge the face on the other side, or -1.
+    """
+    # Python integers: the check itself must not overflow.
+    if int(n_vertex) ** 2 + len(face_nodes) > INT_MAX:
+        raise ValueError(
+            f"too many vertices ({n_vertex}) for the face neighbors: the edge "
+            "keys would overflow"
+        )
+    keys, edge_face = edge_keys(face_nodes, face_offsets, n_vertex, contained)
+    edges = np.arange(len(face_nodes), dtype=IntDType)
+    keys, edges = radix_sort(keys, edges, nb.get_num_threads())
+    return pair_edges(keys, edges, edge_face)
@@ -3,5 +3,6 @@ from .barycentric_wachspress import barycentric_wachspress_weights
 from .cohen_sutherland import cohen_sutherland_line_box_clip
 from .cyrus_beck import cyrus_beck_line_polygon_clip
 from .liang_barsky import liang_barsky_line_box_clip
+from .segment_intersection import segment_segment_intersection
 from .separating_axis import polygons_intersect
 from .sutherland_hodgman import area_of_intersection, box_area_of_intersection
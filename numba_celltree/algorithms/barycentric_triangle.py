@@ -10,7 +10,14 @@ import numba as nb
 import numpy as np
 
 from ..constants import PARALLEL, FloatArray, FloatDType, IntArray, Triangle
-from ..geometry_utils import Point, as_point, as_triangle, cross_product, to_vector
+from ..geometry_utils import (
+    Point,
+    as_point,
+    as_triangle,
+    cross_product,
+    get_face,
+    to_vector,
+)
 
 
 @nb.njit(inline="always")
@@ -35,7 +42,8 @@ def compute_weights(triangle: Triangle, p: Point, weights: FloatArray):
 def barycentric_triangle_weights(
     points: FloatArray,
     face_indices: IntArray,
-    faces: IntArray,
+    face_nodes: IntArray,
+    face_offsets: IntArray,
     vertices: FloatArray,
 ) -> FloatArray:
     n_points = len(points)
@@ -44,7 +52,7 @@ def barycentric_triangle_weights(
         face_index = face_indices[i]
         if face_index == -1:
             continue
-        face = faces[face_index]
+        face = get_face(face_nodes, face_offsets, face_index)
         triangle = as_triangle(vertices, face)
         point = as_point(points[i])
         compute_weights(triangle, point, weights[i])
@@ -12,6 +12,7 @@ from ..geometry_utils import (
     copy_vertices,
     cross_product,
     dot_product,
+    get_face,
     to_vector,
 )
 
@@ -81,17 +82,18 @@ def compute_weights(polygon: FloatArray, p: Point, weights: FloatArray):
 def barycentric_wachspress_weights(
     points: FloatArray,
     face_indices: IntArray,
-    faces: IntArray,
+    face_nodes: IntArray,
+    face_offsets: IntArray,
     vertices: FloatArray,
+    n_max_vert: int,
 ) -> FloatArray:
     n_points = len(points)
-    n_max_vert = faces.shape[1]
     weights = np.zeros((n_points, n_max_vert), dtype=FloatDType)
     for i in nb.prange(n_points):
         face_index = face_indices[i]
         if face_index == -1:
             continue
-        face = faces[face_index]
+        face = get_face(face_nodes, face_offsets, face_index)
         polygon = copy_vertices(vertices, face)
         point = as_point(points[i])
         compute_weights(polygon, point, weights[i])
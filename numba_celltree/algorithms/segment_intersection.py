@@ -0,0 +1,55 @@
+"""
+Intersection of two line segments, parametrized as a + t * r and c + u * s.
+
+See e.g.:
+Goldman, R. (1990). Intersection of two lines in three-space. Graphics Gems,
+p. 304.
+"""
+from typing import Tuple
+
+import numba as nb
+import numpy as np
+
+from ..constants import Point
+from ..geometry_utils import cross_product, dot_product, to_point, to_vector
+
+NO_INTERSECTION = False, Point(np.nan, np.nan)
+
+
+@nb.njit(inline="always")
+def segment_segment_intersection(
+    a: Point, b: Point, c: Point, d: Point
+) -> Tuple[bool, Point]:
+    """
+    Find the intersection of segment a -> b with segment c -> d. Segments
+    touching at an end point intersect.
+
+    If the segments are collinear and overlap, the intersection is the point
+    of the overlap which is closest to a. Segments of zero length do not
+    intersect.
+    """
+    r = to_vector(a, b)
+    s = to_vector(c, d)
+    if (r.x == 0.0 and r.y == 0.0) or (s.x == 0.0 and s.y == 0.0):
+        return NO_INTERSECTION
+
+    ac = to_vector(a, c)
+    denominator = cross_product(r, s)
+    if denominator == 0.0:
+        # Parallel: intersecting only if collinear and overlapping.
+        if cross_product(ac, r) != 0.0:
+            return NO_INTERSECTION
+        rr = dot_product(r, r)
+        t0 = dot_product(ac, r) / rr
+        t1 = t0 + dot_product(s, r) / rr
+        if t0 > t1:
+            t0, t1 = t1, t0
+        if t1 < 0.0 or t0 > 1.0:
+            return NO_INTERSECTION
+        return True, to_point(max(t0, 0.0), a, r)
+
+    t = cross_product(ac, s) / denominator
+    u = cross_product(ac, r) / denominator
+    if t >= 0.0 and t <= 1.0 and u >= 0.0 and u <= 1.0:
+        return True, to_point(t, a, r)
+    return NO_INTERSECTION
@@ -4,7 +4,7 @@ import numba as nb
 import numpy as np
 
 from ..constants import FLOAT_MAX, FLOAT_MIN, PARALLEL, BoolArray, FloatArray, IntArray
-from ..geometry_utils import Vector, as_point, copy_vertices, dot_product
+from ..geometry_utils import Vector, as_point, copy_vertices, dot_product, get_face
 
 
 @nb.njit(inline="always")
@@ -52,16 +52,18 @@ def separating_axes(a: FloatArray, b: FloatArray) -> bool:
 def polygons_intersect(
     vertices_a: FloatArray,
     vertices_b: FloatArray,
-    faces_a: IntArray,
-    faces_b: IntArray,
+    face_nodes_a: IntArray,
+    face_offsets_a: IntArray,
+    face_nodes_b: IntArray,
+    face_offsets_b: IntArray,
     indices_a: IntArray,
     indices_b: IntArray,
 ) -> BoolArray:
     n_shortlist = indices_a.size
     intersects = np.empty(n_shortlist, dtype=np.bool_)
     for i in nb.prange(n_shortlist):
-        face_a = faces_a[indices_a[i]]
-        face_b = faces_b[indices_b[i]]
+        face_a = get_face(face_nodes_a, face_offsets_a, indices_a[i])
+        face_b = get_face(face_nodes_b, face_offsets_b, indices_b[i])
         a = copy_vertices(vertices_a, face_a)
         b = copy_vertices(vertices_b, face_b)
         intersects[i] = separating_axes(a, b) and separating_axes(b, a)
@@ -38,7 +38,7 @@ from typing import Sequence, Tuple
 import numba as nb
 import numpy as np
 
-from ..constants import PARALLEL, FloatArray, FloatDType, IntArray
+from ..constants import NDIM, PARALLEL, FloatArray, FloatDType, IntArray
 from ..geometry_utils import (
     Point,
     Vector,
@@ -47,9 +47,10 @@ from ..geometry_utils import (
     copy_box_vertices,
     copy_vertices,
     dot_product,
+    get_face,
     polygon_area,
 )
-from ..utils import allocate_clip_polygon, copy
+from ..utils import CLIP_MAX_N_VERTEX, allocate_clip_polygon, copy
 
 
 @nb.njit(inline="always")
@@ -84,8 +85,15 @@ def push_point(polygon: FloatArray, size: int, p: Point) -> int:
 def polygon_polygon_clip_area(polygon: Sequence, clipper: Sequence) -> float:
     n_output = len(polygon)
     n_clip = len(clipper)
-    subject = allocate_clip_polygon()
-    output = allocate_clip_polygon()
+    # Clipping adds at most one vertex per edge of the clipper.
+    n_max = n_output + n_clip
+    if n_max > CLIP_MAX_N_VERTEX:
+        # Too large for the stack allocated arrays.
+        subject = np.empty((n_max, NDIM), dtype=FloatDType)
+        output = np.empty((n_max, NDIM), dtype=FloatDType)
+    else:
+        subject = allocate_clip_polygon()
+        output = allocate_clip_polygon()
 
     # Copy polygon into output
     copy(polygon, output, n_output)
@@ -151,16 +159,18 @@ def polygon_polygon_clip_area(polygon: Sequence, clipper: Sequence) -> float:
 def area_of_intersection(
     vertices_a: FloatArray,
     vertices_b: FloatArray,
-    faces_a: IntArray,
-    faces_b: IntArray,
+    face_nodes_a: IntArray,
+    face_offsets_a: IntArray,
+    face_nodes_b: IntArray,
+    face_offsets_b: IntArray,
     indices_a: IntArray,
     indices_b: IntArray,
 ) -> FloatArray:
     n_intersection = indices_a.size
     area = np.empty(n_intersection, dtype=FloatDType)
     for i in nb.prange(n_intersection):
-        face_a = faces_a[indices_a[i]]
-        face_b = faces_b[indices_b[i]]
+        face_a = get_face(face_nodes_a, face_offsets_a, indices_a[i])
+        face_b = get_face(face_nodes_b, face_offsets_b, indices_b[i])
         a = copy_vertices(vertices_a, face_a)
         b = copy_vertices(vertices_b, face_b)
         area[i] = polygon_polygon_clip_area(a, b)
@@ -171,7 +181,8 @@ def area_of_intersection(
 def box_area_of_intersection(
     bbox_coords: FloatArray,
     vertices: FloatArray,
-    faces: IntArray,
+    face_nodes: IntArray,
+    face_offsets: IntArray,
     indices_bbox: IntArray,
     indices_face: IntArray,
 ) -> FloatArray:
@@ -179,7 +190,7 @@ def box_area_of_intersection(
     area = np.empty(n_intersection, dtype=FloatDType)
     for i in nb.prange(n_intersection):
         box = as_box(bbox_coords[indices_bbox[i]])
-        face = faces[indices_face[i]]
+        face = get_face(face_nodes, face_offsets, indices_face[i])
         a = copy_box_vertices(box)
         b = copy_vertices(vertices, face)
         area[i] = polygon_polygon_clip_area(a, b)
@@ -1,7 +1,9 @@
-from typing import Tuple
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
 
+import numba as nb
 import numpy as np
 
+from .adjacency import face_neighbors
 from .algorithms import (
     area_of_intersection,
     barycentric_triangle_weights,
@@ -9,26 +11,62 @@ from .algorithms import (
     box_area_of_intersection,
     polygons_intersect,
 )
+from .chunking import gather, iter_chunks
 from .constants import (
     FILL_VALUE,
+    LEAF,
     MAX_N_FACE,
-    MAX_N_VERTEX,
     BoolArray,
     CellTreeData,
     FloatArray,
     FloatDType,
     IntArray,
     IntDType,
+    NodeArray,
+    NodeDType,
 )
-from .creation import initialize
-from .geometry_utils import build_bboxes, counter_clockwise
+from .creation import (
+    collect_faces,
+    fit_node_bounds,
+    initialize,
+    insert_bboxes,
+    leaf_capacity,
+    pack_polygons,
+    pessimistic_n_nodes,
+    refit,
+    remove_bboxes,
+    tree_cost,
+)
+from .geometry_utils import (
+    build_bboxes,
+    counter_clockwise,
+    csr_to_faces,
+    faces_to_csr,
+    is_counter_clockwise,
+)
+from .lbvh import morton_order
 from .query import (
     collect_node_bounds,
+    count_boxes,
+    count_edges,
+    count_points_per_face,
     locate_boxes,
+    locate_boxes_single_pass,
     locate_edges,
+    locate_edges_single_pass,
+    locate_k_nearest,
+    locate_nearest_faces,
     locate_points,
+    locate_points_hinted,
+    locate_points_ordered,
+    locate_points_walk,
+    locate_trajectories,
+    locate_within_distance,
+    locate_within_distance_single_pass,
     validate_node_bounds,
 )
+from .serialization import PathLike, load_arrays, save_arrays
+from .statistics import tree_statistics
 
 
 # Ensure all types are as as statically expected.
@@ -49,24 +87,62 @@ def cast_faces(faces: IntArray, fill_value: int) -> IntArray:
         faces = np.ascontiguousarray(faces, dtype=IntDType)
     if faces.ndim != 2:
         raise ValueError("faces must have shape (n_face, n_max_vert)")
-    n_face, n_max_vert = faces.shape
+    n_face = len(faces)
     if n_face > MAX_N_FACE:
         raise ValueError(
             f"faces contains {n_face} faces. "
             f"numba_celltree supports a maximum of {MAX_N_FACE} faces. "
             f"Increase MAX_N_FACE in the source code, or supply a smaller mesh."
         )
-    if n_max_vert > MAX_N_VERTEX:
-        raise ValueError(
-            f"faces contains up to {n_max_vert} vertices for a single face. "
-            f"numba_celltree supports a maximum of {MAX_N_VERTEX} vertices. "
-            f"Increase MAX_N_VERTEX in the source code, or alter the mesh."
-        )
     if fill_value != FILL_VALUE:
         faces[faces == fill_value] = FILL_VALUE
     return faces
 
 
+def cast_indices(indices: IntArray, copy: bool) -> IntArray:
+    if isinstance(indices, np.ndarray):
+        return indices.astype(IntDType, copy=copy)
+    return np.ascontiguousarray(indices, dtype=IntDType)
+
+
+def cast_csr(
+    face_nodes: IntArray, face_offsets: IntArray, n_vertex: int, copy: bool = True
+) -> Tuple[IntArray, IntArray]:
+    face_nodes = cast_indices(face_nodes, copy)
+    face_offsets = cast_indices(face_offsets, copy)
+    if face_nodes.ndim != 1 or face_offsets.ndim != 1 or face_offsets.size == 0:
+        raise ValueError("face_nodes and face_offsets must be one dimensional")
+    if face_offsets[0] != 0 or face_offsets[-1] != face_nodes.size:
+        raise ValueError(
+            "face_offsets must start at 0 and end at the size of face_nodes"
+        )
+    n_face = face_offsets.size - 1
+    if n_face > MAX_N_FACE:
+        raise ValueError(
+            f"face_offsets contains {n_face} faces. "
+            f"numba_celltree supports a maximum of {MAX_N_FACE} faces. "
+            f"Increase MAX_N_FACE in the source code, or supply a smaller mesh."
+        )
+    if (np.diff(face_offsets) < 3).any():
+        raise ValueError("faces must have at least 3 nodes")
+    if ((face_nodes < 0) | (face_nodes >= n_vertex)).any():
+        raise ValueError("face_nodes contains indices beyond the vertices")
+    return face_nodes, face_offsets
+
+
+def borrow(array: np.ndarray, dtype: np.dtype, name: str) -> np.ndarray:
+    if (
+        not isinstance(array, np.ndarray)
+        or array.dtype != dtype
+        or not array.flags.c_contiguous
+    ):
+        raise ValueError(
+            f"{name} must be a C-contiguous array of dtype {np.dtype(dtype)} "
+            "when copy is False"
+        )
+    return array
+
+
 def cast_bboxes(bbox_coords: FloatArray) -> FloatArray:
     bbox_coords = np.ascontiguousarray(bbox_coords, dtype=FloatDType)
     if bbox_coords.ndim != 2 or bbox_coords.shape[1] != 4:
@@ -81,6 +157,44 @@ def cast_edges(edges: FloatArray) -> FloatArray:
     return edges
 
 
+BUILDERS = ("sah", "lbvh")
+
+
+def check_build_arguments(n_buckets: int, cells_per_leaf: int, builder: str) -> None:
+    if n_buckets < 2:
+        raise ValueError("n_buckets must be >= 2")
+    if cells_per_leaf < 1:
+        raise ValueError("cells_per_leaf must be >= 1")
+    if builder not in BUILDERS:
+        raise ValueError(
+            f"builder must be one of {BUILDERS}, received instead: {builder}"
+        )
+
+
+SORT_ORDERS = (None, "morton")
+LOCATE_METHODS = ("tree", "walk")
+
+
+def check_locate_arguments(sort: Optional[str], method: str) -> None:
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"sort must be one of {SORT_ORDERS}, received instead: {sort}")
+    if method not in LOCATE_METHODS:
+        raise ValueError(
+            f"method must be one of {LOCATE_METHODS}, received instead: {method}"
+        )
+
+
+def uniform_face_length(face_offsets: IntArray) -> int:
+    """
+    Return the number of nodes of every face if all faces have the same
+    number of nodes, 0 otherwise.
+    """
+    lengths = np.diff(face_offsets)
+    if lengths.size > 0 and (lengths == lengths[0]).all():
+        return int(lengths[0])
+    return 0
+
+
 def bbox_tree(bb_coords: FloatArray) -> FloatArray:
     xmin = bb_coords[:, 0].min()
     xmax = bb_coords[:, 1].max()
@@ -111,6 +225,29 @@ class CellTree2d:
         performance.
     fill_value: int, optional, default: -1
         Fill value marking empty nodes in ``faces``.
+    copy: bool, optional, default: True
+        Whether to copy ``vertices``. If False, the vertices are borrowed
+        rather than copied: they must be C-contiguous and of dtype float64.
+        Read-only arrays, such as memory mapped arrays, are accepted. The
+        vertices must not be modified while the tree is in use. Only the
+        vertices are borrowed: the faces are always converted to the
+        compressed sparse row layout, and made counter-clockwise. Use
+        :meth:`CellTree2d.from_csr` to borrow the faces as well.
+    builder: str, optional, default: "sah"
+        The tree construction strategy. "sah" splits nodes with a bucketed
+        surface area heuristic. "lbvh" sorts the faces along a Morton curve
+        and splits nodes in the sorted order: this builds faster, but results
+        in a tree of lower quality, and slower queries.
+    pack_polygons: bool, optional, default: False
+        Whether to store a copy of the vertex coordinates of every face, in
+        the order of the leaves of the tree. Testing the faces of a leaf then
+        reads memory sequentially, rather than gathering the vertices of
+        every face. This speeds up ``locate_points`` and ``intersect_edges``,
+        at the cost of the memory of (roughly) a second copy of the vertices
+        per face. Inserting faces appends their coordinates, and removing
+        faces leaves theirs in place: the packed coordinates are only
+        compacted, and put in leaf order again, when the tree is rebuilt or
+        its vertices are updated.
     """
 
     def __init__(
@@ -120,44 +257,734 @@ class CellTree2d:
         fill_value: int,
         n_buckets: int = 4,
         cells_per_leaf: int = 2,
+        copy: bool = True,
+        builder: str = "sah",
+        pack_polygons: bool = False,
     ):
-        if n_buckets < 2:
-            raise ValueError("n_buckets must be >= 2")
-        if cells_per_leaf < 1:
-            raise ValueError("cells_per_leaf must be >= 1")
-
-        vertices = cast_vertices(vertices, copy=True)
+        check_build_arguments(n_buckets, cells_per_leaf, builder)
+        if copy:
+            vertices = cast_vertices(vertices, copy=True)
+            borrowed = ()
+        else:
+            vertices = cast_vertices(borrow(vertices, FloatDType, "vertices"))
+            borrowed = ("vertices",)
         faces = cast_faces(faces, fill_value)
-        counter_clockwise(vertices, faces)
+        face_nodes, face_offsets = faces_to_csr(faces)
+        counter_clockwise(vertices, face_nodes, face_offsets)
+
+        self._build(
+            vertices,
+            face_nodes,
+            face_offsets,
+            faces.shape[1],
+            n_buckets,
+            cells_per_leaf,
+            builder,
+            pack_polygons,
+            borrowed,
+        )
+
+    @classmethod
+    def from_csr(
+        cls,
+        vertices: FloatArray,
+        face_nodes: IntArray,
+        face_offsets: IntArray,
+        n_buckets: int = 4,
+        cells_per_leaf: int = 2,
+        copy: bool = True,
+        builder: str = "sah",
+        pack_polygons: bool = False,
+    ) -> "CellTree2d":
+        """
+        Construct a cell tree from 2D vertices and faces in the compressed
+        sparse row (CSR) layout, as stored by the tree: the nodes of face
+        ``i`` are ``face_nodes[face_offsets[i] : face_offsets[i + 1]]``. This
+        requires no fill values, and no memory for the padding of meshes
+        mixing faces with few and many nodes.
 
+        Parameters
+        ----------
+        vertices: ndarray of floats with shape ``(n_point, 2)``
+            Corner coordinates (x, y) of the cells.
+        face_nodes: ndarray of integers with shape ``(n_total_node,)``
+            The indices of the corner nodes of all faces.
+        face_offsets: ndarray of integers with shape ``(n_face + 1,)``
+            For every face, the offset of its first node into ``face_nodes``;
+            the last entry is the size of ``face_nodes``.
+        copy: bool, optional, default: True
+            Whether to copy the arrays. If False, the arrays are borrowed
+            rather than copied: they must be C-contiguous, of dtype float64,
+            intp, and intp respectively, and the faces must already be
+            counter-clockwise. The arrays must not be modified while the tree
+            is in use.
+
+        The other parameters are those of :class:`CellTree2d`.
+
+        Returns
+        -------
+        tree: CellTree2d
+        """
+        check_build_arguments(n_buckets, cells_per_leaf, builder)
+        if copy:
+            vertices = cast_vertices(vertices, copy=True)
+            face_nodes, face_offsets = cast_csr(face_nodes, face_offsets, len(vertices))
+            counter_clockwise(vertices, face_nodes, face_offsets)
+            borrowed = ()
+        else:
+            vertices = cast_vertices(borrow(vertices, FloatDType, "vertices"))
+            face_nodes, face_offsets = cast_csr(
+                borrow(face_nodes, IntDType, "face_nodes"),
+                borrow(face_offsets, IntDType, "face_offsets"),
+                len(vertices),
+                copy=False,
+            )
+            if not is_counter_clockwise(vertices, face_nodes, face_offsets):
+                raise ValueError("faces must be counter-clockwise when copy is False")
+            borrowed = ("vertices", "face_nodes", "face_offsets")
+
+        tree = cls.__new__(cls)
+        tree._build(
+            vertices,
+            face_nodes,
+            face_offsets,
+            int(np.diff(face_offsets).max(initial=0)),
+            n_buckets,
+            cells_per_leaf,
+            builder,
+            pack_polygons,
+            borrowed,
+        )
+        return tree
+
+    def _build(
+        self,
+        vertices: FloatArray,
+        face_nodes: IntArray,
+        face_offsets: IntArray,
+        n_max_vert: int,
+        n_buckets: int,
+        cells_per_leaf: int,
+        builder: str,
+        pack_polygons: bool,
+        borrowed: Tuple[str, ...],
+    ) -> None:
         nodes, bb_indices, bb_coords = initialize(
-            vertices, faces, n_buckets, cells_per_leaf
+            vertices,
+            face_nodes,
+            face_offsets,
+            n_buckets,
+            cells_per_leaf,
+            builder=builder,
+        )
+        self.builder = builder
+        self.pack_polygons = pack_polygons
+        self.n_max_vert = n_max_vert
+        self._set_data(
+            vertices,
+            face_nodes,
+            face_offsets,
+            nodes,
+            bb_indices,
+            bb_coords,
+            bbox_tree(bb_coords),
+            n_buckets,
+            cells_per_leaf,
+            borrowed,
         )
+        self._reset_state()
+
+    def _set_data(
+        self,
+        vertices: FloatArray,
+        face_nodes: IntArray,
+        face_offsets: IntArray,
+        nodes: NodeArray,
+        bb_indices: IntArray,
+        bb_coords: FloatArray,
+        bbox: FloatArray,
+        n_buckets: int,
+        cells_per_leaf: int,
+        borrowed: Tuple[str, ...],
+        polygons: Optional[Tuple[FloatArray, IntArray]] = None,
+    ) -> None:
+        if face_nodes is not getattr(
+            self, "face_nodes", None
+        ) or face_offsets is not getattr(self, "face_offsets", None):
+            # Derived from the faces only: moving the vertices keeps them.
+            self._faces = None
+            self._face_neighbors = None
         self.vertices = vertices
-        self.faces = faces
+        self.face_nodes = face_nodes
+        self.face_offsets = face_offsets
+        self.face_stride = uniform_face_length(face_offsets)
         self.n_buckets = n_buckets
         self.cells_per_leaf = cells_per_leaf
         self.nodes = nodes
         self.bb_indices = bb_indices
         self.bb_coords = bb_coords
-        self.bbox = bbox_tree(bb_coords)
+        self.bbox = bbox
+        self._borrowed = borrowed
+        if polygons is None:
+            self._pack()
+        else:
+            self.polygon_coords, self.polygon_offsets = polygons
+            self._set_celltree_data()
+
+    def _pack(self) -> None:
+        """
+        (Re)compute the packed polygon coordinates, after the vertices have
+        changed, or the tree has been built.
+        """
+        if self.pack_polygons:
+            polygon_coords, polygon_offsets = pack_polygons(
+                self.nodes,
+                self.bb_indices,
+                self.face_nodes,
+                self.face_offsets,
+                self.vertices,
+            )
+        else:
+            polygon_coords = np.empty((0, 2), dtype=FloatDType)
+            polygon_offsets = np.empty(0, dtype=IntDType)
+        self.polygon_coords = polygon_coords
+        self.polygon_offsets = polygon_offsets
+        # Inserting faces appends their coordinates to polygon_coords, which
+        # is grown with spare capacity: the number of rows in use.
+        self._n_polygon_coords = len(polygon_coords)
+        self._set_celltree_data()
+
+    def _set_celltree_data(self) -> None:
         self.celltree_data = CellTreeData(
-            self.faces,
+            self.face_nodes,
+            self.face_offsets,
+            self.face_stride,
             self.vertices,
             self.nodes,
             self.bb_indices,
             self.bb_coords,
             self.bbox,
             self.cells_per_leaf,
+            self.polygon_coords,
+            self.polygon_offsets,
+        )
+
+    def _reset_state(self) -> None:
+        """
+        Discard the state derived from a newly built or loaded tree. It is
+        derived again when first required.
+        """
+        # Cost of the tree as built or loaded.
+        self._reference_cost = None
+        # Required for inserting and removing faces: the array holding
+        # bb_indices, the capacity of every leaf, and the faces in the tree.
+        self._bb_buffer = None
+        self._capacity = None
+        self._contained = None
+
+    def _writeable_nodes(self) -> NodeArray:
+        # Memory mapped nodes are read-only.
+        if not self.nodes.flags.writeable:
+            self.nodes = self.nodes.copy()
+            self._borrowed = tuple(n for n in self._borrowed if n != "nodes")
+        return self.nodes
+
+    def _contained_faces(self) -> BoolArray:
+        if self._contained is None:
+            self._contained = collect_faces(self.nodes, self.bb_indices, self.n_face)
+        return self._contained
+
+    def _rebuild(self, vertices: FloatArray) -> None:
+        bb_indices = np.flatnonzero(self._contained_faces()).astype(IntDType)
+        nodes, bb_indices, bb_coords = initialize(
+            vertices,
+            self.face_nodes,
+            self.face_offsets,
+            self.n_buckets,
+            self.cells_per_leaf,
+            bb_indices,
+            self.builder,
+        )
+        kept = ("face_nodes", "face_offsets")
+        if vertices is self.vertices:
+            kept += ("vertices",)
+        self._set_data(
+            vertices,
+            self.face_nodes,
+            self.face_offsets,
+            nodes,
+            bb_indices,
+            bb_coords,
+            bbox_tree(bb_coords),
+            self.n_buckets,
+            self.cells_per_leaf,
+            tuple(name for name in self._borrowed if name in kept),
+        )
+        self._reset_state()
+
+    @property
+    def borrowed_arrays(self) -> Tuple[str, ...]:
+        """
+        Names of the arrays which are borrowed rather than owned by the tree:
+        the input arrays when constructed with ``copy=False``, or all arrays
+        after loading with ``mmap=True``.
+        """
+        return self._borrowed
+
+    @property
+    def n_face(self) -> int:
+        """
+        Number of faces, including faces removed from the tree.
+        """
+        return len(self.face_offsets) - 1
+
+    @property
+    def faces(self) -> IntArray:
+        """
+        The faces as an array of shape ``(n_face, n_max_vert)``, padded with
+        -1. The faces are stored in the compressed sparse row layout, as
+        :attr:`face_nodes` and :attr:`face_offsets`: this array is created on
+        first access, and kept until faces are inserted. It is read-only.
+        """
+        if self._faces is None:
+            faces = csr_to_faces(self.face_nodes, self.face_offsets, self.n_max_vert)
+            faces.flags.writeable = False
+            self._faces = faces
+        return self._faces
+
+    @property
+    def node_bytes_saved(self) -> int:
+        """
+        Number of bytes saved by storing the nodes in an array of exact size,
+        rather than in an array of the size pre-allocated for the worst case
+        during construction. Both are counted in the packed node layout.
+        """
+        n_allocated = pessimistic_n_nodes(self.n_face)
+        return (n_allocated - len(self.nodes)) * NodeDType.itemsize
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Compute statistics describing the quality of the tree, e.g. to tune
+        ``n_buckets`` and ``cells_per_leaf``.
+
+        Returns
+        -------
+        stats: dict
+            With the entries:
+
+            * ``n_nodes``, ``n_leaves``: the number of nodes and of leaves.
+            * ``max_depth``: the depth of the deepest leaf; the root has depth
+              0.
+            * ``depth_histogram``: the number of leaves at every depth.
+            * ``leaf_size_histogram``: the number of leaves containing 0, 1,
+              2, ... faces.
+            * ``mean_leaf_size``: the mean number of faces per leaf.
+            * ``overlap``: the summed overlap of the children of every node,
+              along the split dimension (Lmax - Rmin, where positive).
+            * ``mean_relative_overlap``: the mean over the internal nodes of
+              the overlap relative to the extent of the node, from 0 (no
+              overlap) to 1.
+            * ``n_overlapping``: the number of nodes with overlapping
+              children.
+            * ``sah_cost``: the expected cost of a query, estimated with the
+              surface area heuristic, relative to the perimeter of the root.
+            * ``nbytes``: the memory used by every array of the tree.
+        """
+        arrays = {
+            "vertices": self.vertices,
+            "face_nodes": self.face_nodes,
+            "face_offsets": self.face_offsets,
+            "nodes": self.nodes,
+            "bb_indices": self.bb_indices,
+            "bb_coords": self.bb_coords,
+        }
+        if self.pack_polygons:
+            arrays["polygon_coords"] = self.polygon_coords
+            arrays["polygon_offsets"] = self.polygon_offsets
+        return tree_statistics(self.nodes, self.bb_indices, self.bb_coords, arrays)
+
+    def save(self, path: PathLike) -> None:
+        """
+        Store the tree in a single binary file, to be read by
+        :meth:`CellTree2d.load`.
+
+        Parameters
+        ----------
+        path: str or os.PathLike
+        """
+        arrays = {
+            "vertices": self.vertices,
+            "face_nodes": self.face_nodes,
+            "face_offsets": self.face_offsets,
+            "nodes": self.nodes,
+            "bb_indices": self.bb_indices,
+            "bb_coords": self.bb_coords,
+            "bbox": self.bbox,
+        }
+        attrs = {
+            "n_buckets": self.n_buckets,
+            "cells_per_leaf": self.cells_per_leaf,
+            "builder": self.builder,
+            "pack_polygons": self.pack_polygons,
+            "n_max_vert": self.n_max_vert,
+        }
+        save_arrays(path, arrays, attrs)
+
+    @classmethod
+    def load(cls, path: PathLike, mmap: bool = True) -> "CellTree2d":
+        """
+        Load a tree stored by :meth:`CellTree2d.save`, without rebuilding it.
+
+        Parameters
+        ----------
+        path: str or os.PathLike
+        mmap: bool, optional, default: True
+            Memory map the arrays of the file rather than reading them into
+            memory. The arrays are read-only. Processes loading the same file
+            share its pages through the operating system's page cache.
+
+        Returns
+        -------
+        tree: CellTree2d
+        """
+        arrays, attrs = load_arrays(path, mmap)
+        borrowed = tuple(arrays) if mmap else ()
+        if arrays["nodes"].dtype != NodeDType:
+            raise ValueError(f"{path} contains nodes of an incompatible layout")
+        tree = cls.__new__(cls)
+        tree.builder = attrs.get("builder", "sah")
+        tree.pack_polygons = attrs.get("pack_polygons", False)
+        tree.n_max_vert = attrs["n_max_vert"]
+        tree._set_data(
+            arrays["vertices"],
+            arrays["face_nodes"],
+            arrays["face_offsets"],
+            arrays["nodes"],
+            arrays["bb_indices"],
+            arrays["bb_coords"],
+            arrays["bbox"],
+            attrs["n_buckets"],
+            attrs["cells_per_leaf"],
+            borrowed,
+        )
+        tree._reset_state()
+        return tree
+
+    def update_vertices(
+        self, vertices: FloatArray, rebuild_threshold: Optional[float] = None
+    ) -> bool:
+        """
+        Replace the vertices, keeping the faces. The bounds of the nodes are
+        refitted to the new bounding boxes of the faces, without splitting the
+        tree again. The faces must remain counter-clockwise.
+
+        A refitted tree remains valid, but its nodes may increasingly overlap
+        as the vertices move, making queries slower. The cost of the tree is
+        estimated with the surface area heuristic.
+
+        Parameters
+        ----------
+        vertices: ndarray of floats with shape ``(n_point, 2)``
+            New corner coordinates (x, y) of the cells. The number of points
+            must not change.
+        rebuild_threshold: float, optional
+            If given, the tree is rebuilt from scratch rather than refitted
+            when the cost of the refitted tree exceeds the cost of the tree as
+            it was built (or loaded) by this factor, e.g. 1.5.
+
+        Returns
+        -------
+        rebuilt: bool
+            Whether the tree has been rebuilt.
+        """
+        vertices = cast_vertices(vertices, copy=True)
+        if vertices.shape != self.vertices.shape:
+            raise ValueError(
+                f"vertices must have shape {self.vertices.shape}, "
+                f"received instead: {vertices.shape}"
+            )
+        if self._reference_cost is None:
+            self._reference_cost = self._cost(self.bb_coords)
+        bb_coords = build_bboxes(self.face_nodes, self.face_offsets, vertices)
+        node_bounds = fit_node_bounds(self.nodes, self.bb_indices, bb_coords)
+        rebuilt = (
+            rebuild_threshold is not None
+            and tree_cost(self.nodes, node_bounds)
+            > rebuild_threshold * self._reference_cost
+        )
+        if rebuilt:
+            self._rebuild(vertices)
+            return rebuilt
+
+        refit(self._writeable_nodes(), node_bounds)
+        self._set_data(
+            vertices,
+            self.face_nodes,
+            self.face_offsets,
+            self.nodes,
+            self.bb_indices,
+            bb_coords,
+            bbox_tree(bb_coords),
+            self.n_buckets,
+            self.cells_per_leaf,
+            tuple(
+                name
+                for name in self._borrowed
+                if name not in ("vertices", "bb_coords", "bbox")
+            ),
         )
+        return rebuilt
+
+    def _cost(self, bb_coords: FloatArray) -> float:
+        node_bounds = fit_node_bounds(self.nodes, self.bb_indices, bb_coords)
+        return tree_cost(self.nodes, node_bounds)
+
+    def _dynamic_state(self) -> Tuple[IntArray, IntArray, BoolArray]:
+        if self._bb_buffer is None:
+            if self._reference_cost is None:
+                self._reference_cost = self._cost(self.bb_coords)
+            # Memory mapped arrays are read-only.
+            nodes = self._writeable_nodes()
+            bb_indices = self.bb_indices
+            if not bb_indices.flags.writeable:
+                bb_indices = bb_indices.copy()
+            self._set_data(
+                self.vertices,
+                self.face_nodes,
+                self.face_offsets,
+                nodes,
+                bb_indices,
+                self.bb_coords,
+                self.bbox,
+                self.n_buckets,
+                self.cells_per_leaf,
+                tuple(name for name in self._borrowed if name != "bb_indices"),
+                (self.polygon_coords, self.polygon_offsets),
+            )
+            self._bb_buffer = bb_indices
+            self._capacity = leaf_capacity(nodes)
+        return self._bb_buffer, self._capacity, self._contained_faces()
+
+    def insert_faces(
+        self, vertices: FloatArray, faces: IntArray, fill_value: int
+    ) -> IntArray:
+        """
+        Add faces to the tree, without rebuilding it. The new faces are placed
+        in the existing leaves; the tree degrades as more faces are added. Call
+        :meth:`CellTree2d.rebalance` to rebuild it.
+
+        Parameters
+        ----------
+        vertices: ndarray of floats with shape ``(n_new_point, 2)``
+            Corner coordinates (x, y) of the new vertices, added to the
+            existing vertices. May be empty.
+        faces: ndarray of integers with shape ``(n_new_face, n_max_vert)``
+            Index identifying for every new face the indices of its corner
+            nodes, into the existing vertices followed by the new vertices. If a
+            face has less corner nodes than ``n_max_vert``, its last indices
+            should be equal to ``fill_value``.
+        fill_value: int
+            Fill value marking empty nodes in ``faces``.
+
+        Returns
+        -------
+        face_indices: ndarray of integers with shape ``(n_new_face,)``
+            The indices of the new faces.
+        """
+        vertices = np.concatenate([self.vertices, cast_vertices(vertices)])
+        faces = cast_faces(faces, fill_value)
+        if (faces >= len(vertices)).any():
+            raise ValueError("faces contains indices beyond the vertices")
+        new_nodes, new_offsets = faces_to_csr(faces)
+        counter_clockwise(vertices, new_nodes, new_offsets)
+        face_nodes = np.concatenate([self.face_nodes, new_nodes])
+        face_offsets = np.concatenate(
+            [self.face_offsets, new_offsets[1:] + self.face_offsets[-1]]
+        )
+        new_indices = np.arange(self.n_face, len(face_offsets) - 1, dtype=IntDType)
+        new_coords = build_bboxes(new_nodes, new_offsets, vertices)
+        bb_coords = np.concatenate([self.bb_coords, new_coords])
+        bbox = bbox_tree(np.concatenate([self.bbox[np.newaxis], new_coords]))
+
+        bb_buffer, capacity, contained = self._dynamic_state()
+        polygon_coords, new_starts = self._append_polygons(
+            vertices, new_nodes, new_offsets
+        )
+        bb_buffer, polygon_offsets, n_used = insert_bboxes(
+            self.nodes,
+            bb_buffer,
+            self.polygon_offsets,
+            len(self.bb_indices),
+            capacity,
+            bb_coords,
+            new_indices,
+            new_starts,
+        )
+        self._bb_buffer = bb_buffer
+        self._contained = np.concatenate([contained, np.ones(len(faces), dtype=bool)])
+        self.n_max_vert = max(self.n_max_vert, faces.shape[1])
+        self._set_data(
+            vertices,
+            face_nodes,
+            face_offsets,
+            self.nodes,
+            bb_buffer[:n_used],
+            bb_coords,
+            bbox,
+            self.n_buckets,
+            self.cells_per_leaf,
+            (),
+            (polygon_coords, polygon_offsets),
+        )
+        return new_indices
+
+    def _append_polygons(
+        self, vertices: FloatArray, new_nodes: IntArray, new_offsets: IntArray
+    ) -> Tuple[FloatArray, IntArray]:
+        """
+        Append the coordinates of new faces to the packed coordinates, if
+        any, growing them with spare capacity. Returns the packed coordinates,
+        and the start of every new face.
+        """
+        if not self.pack_polygons:
+            return self.polygon_coords, np.empty(0, dtype=IntDType)
+        start = self._n_polygon_coords
+        end = start + len(new_nodes)
+        polygon_coords = self.polygon_coords
+        if end > len(polygon_coords):
+            grown = np.empty((max(2 * len(polygon_coords), end), 2), dtype=FloatDType)
+            grown[:start] = polygon_coords[:start]
+            polygon_coords = grown
+        polygon_coords[start:end] = vertices[new_nodes]
+        self._n_polygon_coords = end
+        return polygon_coords, start + new_offsets[:-1]
+
+    def remove_faces(self, face_indices: IntArray) -> None:
+        """
+        Remove faces from the tree, without rebuilding it. The faces keep their
+        indices, but are no longer found by any query. The nodes of
+        the faces are not modified.
+
+        Parameters
+        ----------
+        face_indices: ndarray of integers with shape ``(n_removed,)``
+        """
+        face_indices = np.unique(np.asarray(face_indices, dtype=IntDType))
+        _, _, contained = self._dynamic_state()
+        if face_indices.size == 0:
+            return
+        if face_indices[0] < 0 or face_indices[-1] >= self.n_face:
+            raise ValueError("face_indices contains indices beyond the faces")
+        if not contained[face_indices].all():
+            raise ValueError("face_indices contains faces not in the tree")
+        remove_bboxes(
+            self.nodes,
+            self.bb_indices,
+            self.polygon_offsets,
+            self.bb_coords,
+            face_indices,
+        )
+        contained[face_indices] = False
+        self._face_neighbors = None
+
+    def rebalance(self, rebuild_threshold: Optional[float] = None) -> bool:
+        """
+        Rebuild the tree from the faces it contains, after inserting or
+        removing faces.
+
+        Parameters
+        ----------
+        rebuild_threshold: float, optional
+            If given, the tree is rebuilt only when its cost, estimated with
+            the surface area heuristic, exceeds the cost of the tree as it was
+            built (or loaded) by this factor, e.g. 1.5.
+
+        Returns
+        -------
+        rebuilt: bool
+            Whether the tree has been rebuilt.
+        """
+        if rebuild_threshold is not None:
+            if self._reference_cost is None:
+                # Not modified since it was built or loaded.
+                return False
+            cost = self._cost(self.bb_coords)
+            if cost <= rebuild_threshold * self._reference_cost:
+                return False
+        self._rebuild(self.vertices)
+        return True
+
+    @property
+    def face_neighbors(self) -> IntArray:
+        """
+        The face-face adjacency, alongside :attr:`face_nodes`: for every edge
+        ``k`` of a face, running from ``face_nodes[k]`` to the next node of
+        the face, the index of the face on the other side of the edge, or -1
+        on the boundary. Faces removed from the tree have no neighbors, and
+        are nobody's neighbor.
+
+        Computed on first access, and after the faces have changed.
+        """
+        if self._face_neighbors is None:
+            self._face_neighbors = face_neighbors(
+                self.face_nodes,
+                self.face_offsets,
+                len(self.vertices),
+                self._contained_faces(),
+            )
+        return self._face_neighbors
 
-    def locate_points(self, points: FloatArray) -> IntArray:
+    def _cast_hint(self, hint: IntArray, n_point: int) -> IntArray:
+        hint = cast_indices(hint, copy=False)
+        if hint.shape != (n_point,):
+            raise ValueError(f"hint must have shape ({n_point},)")
+        if ((hint < -1) | (hint >= self.n_face)).any():
+            raise ValueError("hint contains indices beyond the faces")
+        return hint
+
+    def locate_points(
+        self,
+        points: FloatArray,
+        chunk_size: Optional[int] = None,
+        memory_budget: Optional[int] = None,
+        sort: Optional[str] = None,
+        hint: Optional[IntArray] = None,
+        method: str = "tree",
+    ) -> IntArray:
         """
         Finds the index of a face that contains a point.
 
         Parameters
         ----------
         points: ndarray of floats with shape ``(n_point, 2)``
+        chunk_size: int, optional
+            Process the points in chunks of this number of points.
+        memory_budget: int, optional
+            Process the points in chunks of approximately this number of
+            bytes, see :meth:`iter_locate_points`.
+        sort: {None, "morton"}, optional, default: None
+            The order in which the points are processed. By default, the
+            order of ``points``. With "morton", the points are ordered along
+            a Morton (Z-order) curve first: nearby points are then processed
+            together, and find the nodes and faces of the tree in cache. This
+            pays off for many scattered points, e.g. in random order. The
+            result is in the order of ``points`` regardless.
+        hint: ndarray of integers with shape ``(n_point,)``, optional
+            For every point, a face it is likely to fall in, such as the face
+            found for a slowly moving particle in the previous time step, or
+            -1. The hinted face and its neighbors (see
+            :attr:`face_neighbors`) are tested first; the tree is searched
+            only if the point falls in neither. With ``method="walk"``, the
+            walk starts from the hinted face.
+        method: {"tree", "walk"}, optional, default: "tree"
+            How the points are found. With "tree", every point is searched
+            for in the tree. With "walk", the tree is only searched for the
+            first point (of every thread); every next point is found by
+            walking from the face of the previous point to neighboring faces
+            across the edges in between (see :attr:`face_neighbors`). This is
+            much cheaper for spatially coherent points, such as points along a
+            line or a path, or points ordered with ``sort="morton"``. A walk
+            leaving the mesh, or taking many steps, falls back to the tree.
 
         Returns
         -------
@@ -165,10 +992,281 @@ class CellTree2d:
             For every point, the index of the face it falls in. Points not
             falling in any faces are marked with a value of ``-1``.
         """
+        check_locate_arguments(sort, method)
+        if chunk_size is None and memory_budget is None:
+            points = cast_vertices(points)
+            if hint is not None:
+                hint = self._cast_hint(hint, len(points))
+            return self._locate_points(points, sort, hint, method)
+        chunks = self.iter_locate_points(
+            points, chunk_size, memory_budget, sort, hint, method
+        )
+        return np.concatenate(list(chunks))
+
+    def _locate_points(
+        self,
+        points: FloatArray,
+        sort: Optional[str],
+        hint: Optional[IntArray],
+        method: str,
+    ) -> IntArray:
+        if sort is None:
+            if hint is None and method == "tree":
+                return locate_points(points, self.celltree_data)
+            order = np.arange(len(points), dtype=IntDType)
+        else:
+            order = morton_order(points, self.bbox)
+            if hint is None and method == "tree":
+                return locate_points_ordered(points, self.celltree_data, order)
+        if method == "walk":
+            if hint is None:
+                hint = np.full(len(points), -1, dtype=IntDType)
+            return locate_points_walk(
+                points,
+                self.celltree_data,
+                hint,
+                self.face_neighbors,
+                self._contained_faces(),
+                order,
+                nb.get_num_threads(),
+            )
+        return locate_points_hinted(
+            points,
+            self.celltree_data,
+            hint,
+            self.face_neighbors,
+            self._contained_faces(),
+            order,
+        )
+
+    def iter_locate_points(
+        self,
+        points: FloatArray,
+        chunk_size: Optional[int] = None,
+        memory_budget: Optional[int] = None,
+        sort: Optional[str] = None,
+        hint: Optional[IntArray] = None,
+        method: str = "tree",
+    ) -> Iterator[IntArray]:
+        """
+        Finds the index of a face that contains a point, a chunk of points at
+        a time. See :meth:`locate_points`.
+
+        Only a chunk of the points is held in memory at a time: ``points`` may
+        be a memory mapped array. With a ``memory_budget``, the number of
+        points per chunk is chosen such that a chunk and its results take
+        approximately ``memory_budget`` bytes. Without either argument, all
+        points form a single chunk.
+
+        Parameters
+        ----------
+        points: ndarray of floats with shape ``(n_point, 2)``
+        chunk_size: int, optional
+            The number of points per chunk.
+        memory_budget: int, optional
+            The number of bytes per chunk.
+        sort: {None, "morton"}, optional, default: None
+            The order in which the points of a chunk are processed, see
+            :meth:`locate_points`.
+        hint: ndarray of integers with shape ``(n_point,)``, optional
+            For every point, a face it is likely to fall in, see
+            :meth:`locate_points`.
+        method: {"tree", "walk"}, optional, default: "tree"
+            How the points are found, see :meth:`locate_points`. Every chunk
+            starts a new walk.
+
+        Yields
+        ------
+        tree_face_indices: ndarray of integers with shape ``(n_chunk,)``
+            For every point of the chunk, the index of the face it falls in,
+            or ``-1``.
+        """
+        check_locate_arguments(sort, method)
+        aligned = () if hint is None else (self._cast_hint(hint, len(points)),)
+
+        def query(chunk, chunk_hint=None):
+            return (self._locate_points(chunk, sort, chunk_hint, method),)
+
+        chunks = iter_chunks(
+            query,
+            points,
+            cast_vertices,
+            chunk_size,
+            memory_budget,
+            pairs=False,
+            aligned=aligned,
+        )
+        return (face_indices for (face_indices,) in chunks)
+
+    def count_points_per_face(self, points: FloatArray) -> IntArray:
+        """
+        Counts the points falling in every face, without storing the face of
+        every point: see :meth:`locate_points`.
+
+        Parameters
+        ----------
+        points: ndarray of floats with shape ``(n_point, 2)``
+
+        Returns
+        -------
+        counts: ndarray of integers with shape ``(n_face,)``
+            For every face, the number of points falling in it. Points not
+            falling in any face are not counted.
+        """
         points = cast_vertices(points)
-        return locate_points(points, self.celltree_data)
+        return count_points_per_face(points, self.celltree_data, self.n_face)
+
+    def locate_trajectories(
+        self, points: FloatArray, hint: Optional[IntArray] = None
+    ) -> IntArray:
+        """
+        Finds the index of the face that contains a point, for every step of
+        the trajectories of particles. The face found in a step is the hint
+        for the next step, see :meth:`locate_points`: for slowly moving
+        particles, the tree is rarely searched.
+
+        Parameters
+        ----------
+        points: ndarray of floats with shape ``(n_step, n_point, 2)``
+            For every step, the location of every particle.
+        hint: ndarray of integers with shape ``(n_point,)``, optional
+            For every particle, a face it is likely to fall in at the first
+            step, or -1.
+
+        Returns
+        -------
+        tree_face_indices: ndarray of integers with shape ``(n_step, n_point)``
+            For every step and particle, the index of the face it falls in.
+            Points not falling in any faces are marked with a value of ``-1``.
+        """
+        points = np.ascontiguousarray(points, dtype=FloatDType)
+        if points.ndim != 3 or points.shape[2] != 2:
+            raise ValueError("points must have shape (n_step, n_point, 2)")
+        if hint is None:
+            hint = np.full(points.shape[1], -1, dtype=IntDType)
+        else:
+            hint = self._cast_hint(hint, points.shape[1])
+        return locate_trajectories(
+            points,
+            self.celltree_data,
+            hint,
+            self.face_neighbors,
+            self._contained_faces(),
+        )
 
-    def locate_boxes(self, bbox_coords: FloatArray) -> Tuple[IntArray, IntArray]:
+    def locate_nearest_faces(
+        self, points: FloatArray, max_distance: float = np.inf
+    ) -> Tuple[IntArray, FloatArray]:
+        """
+        Finds the index of the face nearest to a point. For a point inside of
+        a face, this is the face that contains it, at distance zero: found at
+        the cost of :meth:`locate_points`. For a point outside of the mesh,
+        it is the face with the nearest edge.
+
+        Parameters
+        ----------
+        points: ndarray of floats with shape ``(n_point, 2)``
+        max_distance: float, optional, default: inf
+            Faces further away are not considered. A small value limits the
+            search, and speeds it up.
+
+        Returns
+        -------
+        tree_face_indices: ndarray of integers with shape ``(n_point,)``
+            For every point, the index of the nearest face. Points without a
+            face within ``max_distance`` are marked with a value of ``-1``.
+        distances: ndarray of floats with shape ``(n_point,)``
+            For every point, the distance to the nearest face; NaN if no face
+            is found.
+        """
+        points = cast_vertices(points)
+        if max_distance < 0:
+            raise ValueError("max_distance must be >= 0")
+        return locate_nearest_faces(points, self.celltree_data, float(max_distance))
+
+    def locate_k_nearest(
+        self, points: FloatArray, k: int, max_distance: float = np.inf
+    ) -> Tuple[IntArray, FloatArray]:
+        """
+        Finds the indices of the ``k`` faces nearest to a point. The distance
+        to a face is zero inside of it, otherwise the distance to its nearest
+        edge.
+
+        Parameters
+        ----------
+        points: ndarray of floats with shape ``(n_point, 2)``
+        k: int
+            The number of faces to find per point.
+        max_distance: float, optional, default: inf
+            Faces further away are not considered.
+
+        Returns
+        -------
+        tree_face_indices: ndarray of integers with shape ``(n_point, k)``
+            For every point, the indices of the nearest faces, nearest first.
+            When fewer than ``k`` faces are found within ``max_distance``, the
+            remainder is marked with a value of ``-1``.
+        distances: ndarray of floats with shape ``(n_point, k)``
+            For every point, the distances to the nearest faces; NaN where no
+            face is found.
+        """
+        points = cast_vertices(points)
+        if k < 1:
+            raise ValueError("k must be >= 1")
+        if max_distance < 0:
+            raise ValueError("max_distance must be >= 0")
+        return locate_k_nearest(points, self.celltree_data, int(k), float(max_distance))
+
+    def locate_within_distance(
+        self,
+        points: FloatArray,
+        radius: Union[float, FloatArray],
+        single_pass: bool = False,
+    ) -> Tuple[IntArray, IntArray, FloatArray]:
+        """
+        Finds the indices of all faces within a distance of a point. The
+        distance to a face is zero inside of it, otherwise the distance to its
+        nearest edge.
+
+        Parameters
+        ----------
+        points: ndarray of floats with shape ``(n_point, 2)``
+        radius: float or ndarray of floats with shape ``(n_point,)``
+            The distance, for all points or per point.
+        single_pass: bool, optional, default: False
+            Search the tree once per point, storing the faces as they are
+            found in a buffer with room for a few faces per point, rather than
+            twice: once to count, and once to store. See ``locate_boxes``.
+
+        Returns
+        -------
+        offsets: ndarray of integers with shape ``(n_point + 1,)``
+            The faces of point ``i`` are found in
+            ``tree_face_indices[offsets[i]:offsets[i + 1]]``.
+        tree_face_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the faces, in no particular order.
+        distances: ndarray of floats with shape ``(n_found,)``
+            Distances to the faces.
+        """
+        points = cast_vertices(points)
+        radii = np.broadcast_to(np.asarray(radius, dtype=FloatDType), len(points))
+        if radii.size > 0 and not (radii.min() >= 0):
+            raise ValueError("radius must be >= 0")
+        if single_pass:
+            return locate_within_distance_single_pass(
+                points, np.ascontiguousarray(radii), self.celltree_data
+            )
+        return locate_within_distance(
+            points, np.ascontiguousarray(radii), self.celltree_data
+        )
+
+    def locate_boxes(
+        self,
+        bbox_coords: FloatArray,
+        chunk_size: Optional[int] = None,
+        memory_budget: Optional[int] = None,
+        single_pass: bool = False,
+    ) -> Tuple[IntArray, IntArray]:
         """
         Finds the index of a face intersecting with a bounding box.
 
@@ -176,6 +1274,17 @@ class CellTree2d:
         ----------
         bbox_coords: ndarray of floats with shape ``(n_box, 4)``
             Every row containing ``(xmin, xmax, ymin, ymax)``.
+        chunk_size: int, optional
+            Process the boxes in chunks of this number of boxes.
+        memory_budget: int, optional
+            Process the boxes in chunks of approximately this number of
+            bytes, see :meth:`iter_locate_boxes`.
+        single_pass: bool, optional, default: False
+            Search the tree once per box, storing the faces as they are found
+            in a buffer with room for a few faces per box, rather than twice:
+            once to count, and once to store. This is faster for boxes
+            intersecting few faces, at the cost of the memory of the buffer.
+            Boxes for which the buffer runs out of room are searched twice.
 
         Returns
         -------
@@ -184,10 +1293,71 @@ class CellTree2d:
         tree_face_indices: ndarray of integers with shape ``(n_found,)``
             Indices of the face.
         """
-        bbox_coords = cast_bboxes(bbox_coords)
+        if chunk_size is None and memory_budget is None:
+            bbox_coords = cast_bboxes(bbox_coords)
+            return self._locate_boxes(bbox_coords, single_pass)
+        return gather(
+            self.iter_locate_boxes(bbox_coords, chunk_size, memory_budget, single_pass)
+        )
+
+    def _locate_boxes(
+        self, bbox_coords: FloatArray, single_pass: bool
+    ) -> Tuple[IntArray, IntArray]:
+        if single_pass:
+            return locate_boxes_single_pass(bbox_coords, self.celltree_data)
         return locate_boxes(bbox_coords, self.celltree_data)
 
-    def intersect_boxes(self, bbox_coords: FloatArray) -> Tuple[IntArray, IntArray]:
+    def iter_locate_boxes(
+        self,
+        bbox_coords: FloatArray,
+        chunk_size: Optional[int] = None,
+        memory_budget: Optional[int] = None,
+        single_pass: bool = False,
+    ) -> Iterator[Tuple[IntArray, IntArray]]:
+        """
+        Finds the index of a face intersecting with a bounding box, a chunk of
+        boxes at a time. See :meth:`locate_boxes`, and
+        :meth:`iter_locate_points` for the chunking.
+
+        Yields
+        ------
+        bbox_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the bounding box, in the entire ``bbox_coords``.
+        tree_face_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the face.
+        """
+        return iter_chunks(
+            lambda chunk: self._locate_boxes(chunk, single_pass),
+            bbox_coords,
+            cast_bboxes,
+            chunk_size,
+            memory_budget,
+        )
+
+    def count_boxes(self, bbox_coords: FloatArray) -> IntArray:
+        """
+        Counts the faces intersecting with every bounding box, without
+        storing them: see :meth:`locate_boxes`.
+
+        Parameters
+        ----------
+        bbox_coords: ndarray of floats with shape ``(n_box, 4)``
+            Every row containing ``(xmin, xmax, ymin, ymax)``.
+
+        Returns
+        -------
+        counts: ndarray of integers with shape ``(n_box,)``
+            For every bounding box, the number of faces.
+        """
+        bbox_coords = cast_bboxes(bbox_coords)
+        return count_boxes(bbox_coords, self.celltree_data)
+
+    def intersect_boxes(
+        self,
+        bbox_coords: FloatArray,
+        chunk_size: Optional[int] = None,
+        memory_budget: Optional[int] = None,
+    ) -> Tuple[IntArray, IntArray, FloatArray]:
         """
         Finds the index of a box intersecting with a face, and the area
         of intersection.
@@ -196,6 +1366,11 @@ class CellTree2d:
         ----------
         bbox_coords: ndarray of floats with shape ``(n_box, 4)``
             Every row containing ``(xmin, xmax, ymin, ymax)``.
+        chunk_size: int, optional
+            Process the boxes in chunks of this number of boxes.
+        memory_budget: int, optional
+            Process the boxes in chunks of approximately this number of
+            bytes, see :meth:`iter_locate_points`.
 
         Returns
         -------
@@ -206,12 +1381,17 @@ class CellTree2d:
         area: ndarray of floats with shape ``(n_found,)``
             Area of intersection between the two intersecting faces.
         """
-        bbox_coords = cast_bboxes(bbox_coords)
+        return gather(self.iter_intersect_boxes(bbox_coords, chunk_size, memory_budget))
+
+    def _intersect_boxes(
+        self, bbox_coords: FloatArray
+    ) -> Tuple[IntArray, IntArray, FloatArray]:
         i, j = locate_boxes(bbox_coords, self.celltree_data)
         area = box_area_of_intersection(
             bbox_coords=bbox_coords,
             vertices=self.vertices,
-            faces=self.faces,
+            face_nodes=self.face_nodes,
+            face_offsets=self.face_offsets,
             indices_bbox=i,
             indices_face=j,
         )
@@ -220,24 +1400,55 @@ class CellTree2d:
         actual = area > 0
         return i[actual], j[actual], area[actual]
 
+    def iter_intersect_boxes(
+        self,
+        bbox_coords: FloatArray,
+        chunk_size: Optional[int] = None,
+        memory_budget: Optional[int] = None,
+    ) -> Iterator[Tuple[IntArray, IntArray, FloatArray]]:
+        """
+        Finds the index of a box intersecting with a face, and the area of
+        intersection, a chunk of boxes at a time. See :meth:`intersect_boxes`,
+        and :meth:`iter_locate_points` for the chunking.
+
+        Yields
+        ------
+        bbox_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the bounding box, in the entire ``bbox_coords``.
+        tree_face_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the tree faces.
+        area: ndarray of floats with shape ``(n_found,)``
+            Area of intersection between the two intersecting faces.
+        """
+        return iter_chunks(
+            self._intersect_boxes, bbox_coords, cast_bboxes, chunk_size, memory_budget
+        )
+
     def _locate_faces(
-        self, vertices: FloatArray, faces: IntArray
+        self, vertices: FloatArray, face_nodes: IntArray, face_offsets: IntArray
     ) -> Tuple[IntArray, IntArray]:
-        counter_clockwise(vertices, faces)
-        bbox_coords = build_bboxes(faces, vertices)
+        counter_clockwise(vertices, face_nodes, face_offsets)
+        bbox_coords = build_bboxes(face_nodes, face_offsets, vertices)
         shortlist_i, shortlist_j = locate_boxes(bbox_coords, self.celltree_data)
         intersects = polygons_intersect(
             vertices_a=vertices,
             vertices_b=self.vertices,
-            faces_a=faces,
-            faces_b=self.faces,
+            face_nodes_a=face_nodes,
+            face_offsets_a=face_offsets,
+            face_nodes_b=self.face_nodes,
+            face_offsets_b=self.face_offsets,
             indices_a=shortlist_i,
             indices_b=shortlist_j,
         )
         return shortlist_i[intersects], shortlist_j[intersects]
 
     def intersect_faces(
-        self, vertices: FloatArray, faces: IntArray, fill_value: int
+        self,
+        vertices: FloatArray,
+        faces: IntArray,
+        fill_value: int,
+        chunk_size: Optional[int] = None,
+        memory_budget: Optional[int] = None,
     ) -> Tuple[IntArray, IntArray, FloatArray]:
         """
         Finds the index of a face intersecting with another face, and the area
@@ -253,6 +1464,11 @@ class CellTree2d:
             should be equal to ``fill_value``.
         fill_value: int, optional, default: -1
             Fill value marking empty nodes in ``faces``.
+        chunk_size: int, optional
+            Process the faces in chunks of this number of faces.
+        memory_budget: int, optional
+            Process the faces in chunks of approximately this number of
+            bytes, see :meth:`iter_locate_points`.
 
         Returns
         -------
@@ -263,14 +1479,24 @@ class CellTree2d:
         area: ndarray of floats with shape ``(n_found,)``
             Area of intersection between the two intersecting faces.
         """
-        vertices = cast_vertices(vertices)
-        faces = cast_faces(faces, fill_value)
-        i, j = self._locate_faces(vertices, faces)
+        return gather(
+            self.iter_intersect_faces(
+                vertices, faces, fill_value, chunk_size, memory_budget
+            )
+        )
+
+    def _intersect_faces(
+        self, vertices: FloatArray, faces: IntArray
+    ) -> Tuple[IntArray, IntArray, FloatArray]:
+        face_nodes, face_offsets = faces_to_csr(faces)
+        i, j = self._locate_faces(vertices, face_nodes, face_offsets)
         area = area_of_intersection(
             vertices_a=vertices,
             vertices_b=self.vertices,
-            faces_a=faces,
-            faces_b=self.faces,
+            face_nodes_a=face_nodes,
+            face_offsets_a=face_offsets,
+            face_nodes_b=self.face_nodes,
+            face_offsets_b=self.face_offsets,
             indices_a=i,
             indices_b=j,
         )
@@ -279,8 +1505,44 @@ class CellTree2d:
         actual = area > 0
         return i[actual], j[actual], area[actual]
 
+    def iter_intersect_faces(
+        self,
+        vertices: FloatArray,
+        faces: IntArray,
+        fill_value: int,
+        chunk_size: Optional[int] = None,
+        memory_budget: Optional[int] = None,
+    ) -> Iterator[Tuple[IntArray, IntArray, FloatArray]]:
+        """
+        Finds the index of a face intersecting with another face, and the area
+        of intersection, a chunk of faces at a time. See
+        :meth:`intersect_faces`, and :meth:`iter_locate_points` for the
+        chunking. The faces are chunked; the vertices are used as a whole.
+
+        Yields
+        ------
+        face_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the faces, in the entire ``faces``.
+        tree_face_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the tree faces.
+        area: ndarray of floats with shape ``(n_found,)``
+            Area of intersection between the two intersecting faces.
+        """
+        vertices = cast_vertices(vertices)
+        return iter_chunks(
+            lambda chunk: self._intersect_faces(vertices, chunk),
+            faces,
+            lambda chunk: cast_faces(chunk, fill_value),
+            chunk_size,
+            memory_budget,
+        )
+
     def intersect_edges(
-        self, edge_coords: FloatArray
+        self,
+        edge_coords: FloatArray,
+        chunk_size: Optional[int] = None,
+        memory_budget: Optional[int] = None,
+        single_pass: bool = False,
     ) -> Tuple[IntArray, IntArray, FloatArray]:
         """
         Finds the index of a face intersecting with an edge.
@@ -289,19 +1551,88 @@ class CellTree2d:
         ----------
         edge_coords: ndarray of floats with shape ``(n_edge, 2, 2)``
             Every row containing ``((x0, y0), (x1, y1))``.
+        chunk_size: int, optional
+            Process the edges in chunks of this number of edges.
+        memory_budget: int, optional
+            Process the edges in chunks of approximately this number of
+            bytes, see :meth:`iter_locate_points`.
+        single_pass: bool, optional, default: False
+            Search the tree once per edge, rather than twice: see
+            :meth:`locate_boxes`. This saves computing the intersections of
+            every edge twice.
 
         Returns
         -------
         edge_indices: ndarray of integers with shape ``(n_found,)``
-            Indices of the bounding box.
+            Indices of the edge.
         tree_face_indices: ndarray of integers with shape ``(n_found,)``
             Indices of the face.
-        length: ndarray of floats with shape ``(n_found,)``
-            Length of intersection of the edge inside of the face.
+        intersection_edges: ndarray of floats with shape ``(n_found, 2, 2)``
+            The part of the edge inside of the face.
         """
-        edge_coords = cast_edges(edge_coords)
+        if chunk_size is None and memory_budget is None:
+            edge_coords = cast_edges(edge_coords)
+            return self._intersect_edges(edge_coords, single_pass)
+        return gather(
+            self.iter_intersect_edges(
+                edge_coords, chunk_size, memory_budget, single_pass
+            )
+        )
+
+    def _intersect_edges(
+        self, edge_coords: FloatArray, single_pass: bool
+    ) -> Tuple[IntArray, IntArray, FloatArray]:
+        if single_pass:
+            return locate_edges_single_pass(edge_coords, self.celltree_data)
         return locate_edges(edge_coords, self.celltree_data)
 
+    def iter_intersect_edges(
+        self,
+        edge_coords: FloatArray,
+        chunk_size: Optional[int] = None,
+        memory_budget: Optional[int] = None,
+        single_pass: bool = False,
+    ) -> Iterator[Tuple[IntArray, IntArray, FloatArray]]:
+        """
+        Finds the index of a face intersecting with an edge, a chunk of edges
+        at a time. See :meth:`intersect_edges`, and :meth:`iter_locate_points`
+        for the chunking.
+
+        Yields
+        ------
+        edge_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the edge, in the entire ``edge_coords``.
+        tree_face_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the face.
+        intersection_edges: ndarray of floats with shape ``(n_found, 2, 2)``
+            The part of the edge inside of the face.
+        """
+        return iter_chunks(
+            lambda chunk: self._intersect_edges(chunk, single_pass),
+            edge_coords,
+            cast_edges,
+            chunk_size,
+            memory_budget,
+        )
+
+    def count_edges(self, edge_coords: FloatArray) -> IntArray:
+        """
+        Counts the faces intersecting with every edge, without storing them
+        or the intersections: see :meth:`intersect_edges`.
+
+        Parameters
+        ----------
+        edge_coords: ndarray of floats with shape ``(n_edge, 2, 2)``
+            Every row containing ``((x0, y0), (x1, y1))``.
+
+        Returns
+        -------
+        counts: ndarray of integers with shape ``(n_edge,)``
+            For every edge, the number of faces.
+        """
+        edge_coords = cast_edges(edge_coords)
+        return count_edges(edge_coords, self.celltree_data)
+
     def compute_barycentric_weights(
         self,
         points: FloatArray,
@@ -324,18 +1655,23 @@ class CellTree2d:
             faces, the weight of all vertices is 0.
         """
         face_indices = self.locate_points(points)
-        n_max_vert = self.faces.shape[1]
-        if n_max_vert > 3:
-            f = barycentric_wachspress_weights
+        if self.n_max_vert > 3:
+            weights = barycentric_wachspress_weights(
+                points,
+                face_indices,
+                self.face_nodes,
+                self.face_offsets,
+                self.vertices,
+                self.n_max_vert,
+            )
         else:
-            f = barycentric_triangle_weights
-
-        weights = f(
-            points,
-            face_indices,
-            self.faces,
-            self.vertices,
-        )
+            weights = barycentric_triangle_weights(
+                points,
+                face_indices,
+                self.face_nodes,
+                self.face_offsets,
+                self.vertices,
+            )
         return face_indices, weights
 
     @property
@@ -386,10 +1722,11 @@ class CellTree2d:
         """
         dict_of_lists = {}
         for parent_index, node in enumerate(self.celltree_data.nodes):
-            left_child = node["child"]
-            if left_child == -1:
+            child = node["child"]
+            if child == LEAF:
                 dict_of_lists[parent_index] = []
             else:
+                left_child = child >> 1
                 right_child = left_child + 1
                 dict_of_lists[parent_index] = [left_child, right_child]
 
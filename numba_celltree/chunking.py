@@ -0,0 +1,92 @@
+"""
+Running a bulk query over its input a chunk at a time, so that the memory
+used for the candidates and results of a single chunk is bounded, rather than
+proportional to the size of the input.
+
+The input is only sliced, never copied as a whole: it may be a memory mapped
+array (``np.memmap``, or ``np.load(..., mmap_mode="r")``).
+"""
+from typing import Callable, Iterator, Optional, Tuple
+
+import numpy as np
+
+Query = Callable[[np.ndarray], Tuple[np.ndarray, ...]]
+
+
+def check_chunk_arguments(
+    chunk_size: Optional[int], memory_budget: Optional[int]
+) -> None:
+    if chunk_size is not None and memory_budget is not None:
+        raise ValueError("Provide either chunk_size or memory_budget, not both")
+    if chunk_size is not None and chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+    if memory_budget is not None and memory_budget < 1:
+        raise ValueError("memory_budget must be >= 1")
+
+
+def iter_chunks(
+    query: Query,
+    data: np.ndarray,
+    cast: Callable[[np.ndarray], np.ndarray],
+    chunk_size: Optional[int],
+    memory_budget: Optional[int],
+    pairs: bool = True,
+    aligned: Tuple[np.ndarray, ...] = (),
+) -> Iterator[Tuple[np.ndarray, ...]]:
+    """
+    Validate the arguments, and return a generator running the query on
+    consecutive chunks of data.
+
+    The query receives a chunk, cast by ``cast``, followed by the matching
+    chunks of the aligned arrays, and returns a tuple of arrays. For pairs,
+    the first array contains indices into the chunk; these are offset to
+    index into the entire data.
+
+    With a memory budget, the chunk size is chosen such that the cast chunk
+    and its results take approximately ``memory_budget`` bytes. The size of
+    the results is only known afterwards: the first chunk assumes results as
+    large as the chunk, every next chunk the largest size per item observed so
+    far.
+    """
+    check_chunk_arguments(chunk_size, memory_budget)
+    if not isinstance(data, np.ndarray):
+        data = np.asarray(data)
+    # Cast an empty chunk to raise errors on invalid input immediately.
+    item_bytes = cast(data[:0]).itemsize * int(np.prod(data.shape[1:]))
+    item_bytes += sum(array[:1].nbytes for array in aligned)
+    return _iter_chunks(
+        query, data, cast, item_bytes, chunk_size, memory_budget, pairs, aligned
+    )
+
+
+def _iter_chunks(
+    query, data, cast, item_bytes, chunk_size, memory_budget, pairs, aligned
+):
+    n = len(data)
+    if chunk_size is None and memory_budget is None:
+        chunk_size = max(n, 1)
+    result_bytes = float(item_bytes)
+    start = 0
+    while True:
+        if memory_budget is not None:
+            size = int(memory_budget // (item_bytes + result_bytes))
+        else:
+            size = chunk_size
+        end = min(start + max(size, 1), n)
+        result = query(cast(data[start:end]), *(array[start:end] for array in aligned))
+        if end > start:
+            nbytes = sum(array.nbytes for array in result)
+            result_bytes = max(result_bytes, nbytes / (end - start))
+        if pairs:
+            result = (result[0] + start,) + tuple(result[1:])
+        yield result
+        start = end
+        if start >= n:
+            return
+
+
+def gather(chunks: Iterator[Tuple[np.ndarray, ...]]) -> Tuple[np.ndarray, ...]:
+    """
+    Concatenate the results of all chunks.
+    """
+    return tuple(np.concatenate(arrays) for arrays in zip(*chunks))
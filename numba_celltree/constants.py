@@ -19,6 +19,7 @@ an integer type of ``np.intp``. If IntDType == np.int32, the BucketDType array
 will expect a 32-bit integer for its index and size fields, yet receive a
 64-bit integer (intp), and error during type inferencing.
 """
+
 import math
 from typing import NamedTuple
 
@@ -72,26 +73,30 @@ class Node(NamedTuple):
     dim: bool
 
 
-class Bucket(NamedTuple):
-    Max: FloatDType
-    Min: FloatDType
-    Rmin: FloatDType
-    Lmax: FloatDType
-    index: IntDType
-    size: IntDType
-
-
 class CellTreeData(NamedTuple):
-    faces: IntArray
+    # The faces in compressed sparse row layout: the nodes of face i are
+    # face_nodes[face_offsets[i] : face_offsets[i + 1]].
+    face_nodes: IntArray
+    face_offsets: IntArray
+    # The number of nodes of every face, if all faces have the same number of
+    # nodes; 0 otherwise. The offset of face i is then face_stride * i:
+    # queries skip reading face_offsets.
+    face_stride: int
     vertices: FloatArray
     nodes: NodeArray
     bb_indices: IntArray
     bb_coords: FloatArray
     bbox: FloatArray
     cells_per_leaf: int
+    # Optional: the coordinates of the polygons in the order of bb_indices,
+    # and for every entry of bb_indices the offset of its polygon. Empty if
+    # the polygons are not packed.
+    polygon_coords: FloatArray
+    polygon_offsets: IntArray
 
 
-NodeDType = np.dtype(
+# The nodes are created with this layout during construction.
+BuildNodeDType = np.dtype(
     [
         # Index of left child. Right child is child + 1.
         ("child", IntDType),
@@ -107,6 +112,21 @@ NodeDType = np.dtype(
     ]
 )
 
+# The nodes of a built tree are packed into 24 bytes. A leaf requires only
+# ptr and size, an internal node only Lmax and Rmin: these fields overlap.
+NodeDType = np.dtype(
+    {
+        "names": ["Lmax", "ptr", "Rmin", "size", "child"],
+        "formats": [FloatDType, IntDType, FloatDType, IntDType, IntDType],
+        "offsets": [0, 0, 8, 8, 16],
+        "itemsize": 24,
+    }
+)
+# The child field of the packed nodes stores the index of the left child
+# shifted by one bit, and dim in the lowest bit. It is equal to LEAF for a
+# leaf.
+LEAF = -1
+
 
 BucketDType = np.dtype(
     [
@@ -133,6 +153,8 @@ STACK_ALLOCATE_STATIC_ARRAYS = True
 # 2D is still rather hard-baked in, so changing this alone to 3 will NOT
 # suffice to generalize it to a 3D CellTree.
 NDIM = 2
+# The work arrays for faces with up to MAX_N_VERTEX vertices are stack
+# allocated. Larger faces are supported, but use heap allocated arrays.
 MAX_N_VERTEX = 32
 FILL_VALUE = -1
 # Recursion in numba is somewhat slow (in case of querying), or unsupported for
@@ -144,6 +166,18 @@ MAX_N_FACE = 2e9  # 2e9 results in a depth of 32
 MAX_TREE_DEPTH = int(math.ceil(math.log(MAX_N_FACE, 2))) + 1
 # Floating point slack
 TOLERANCE_ON_EDGE = 1e-9
+# A walk across the faces of the mesh may cycle, or cover a long distance; it
+# is abandoned for a search of the tree after this number of faces.
+MAX_WALK_STEPS = 64
+# Single pass bulk queries process their input in chunks of this many
+# queries, every chunk storing its results in a region of a buffer of its own:
+# small enough to balance the load over the threads. The region has room for
+# SINGLE_PASS_CAPACITY results per query.
+QUERY_CHUNK_SIZE = 256
+SINGLE_PASS_CAPACITY = 8
+# Counting the points per face locates this many points at a time, so that the
+# memory used does not grow with the number of points.
+COUNT_BLOCK_SIZE = 65536
 
 # Derived types & constants
 NumbaFloatDType = nb.from_dtype(FloatDType)
@@ -153,13 +187,17 @@ NumbaBucketDType = nb.from_dtype(BucketDType)
 
 NumbaCellTreeData = nbtypes.NamedTuple(
     (
-        NumbaIntDType[:, :],  # faces
+        NumbaIntDType[:],  # face_nodes
+        NumbaIntDType[:],  # face_offsets
+        NumbaIntDType,  # face_stride
         NumbaFloatDType[:, :],  # vertices
         NumbaNodeDType[:],  # nodes
         NumbaIntDType[:],  # bb_indices
         NumbaFloatDType[:, :],  # bb_coords
         NumbaFloatDType[:],  # bbox
         NumbaIntDType,  # cells_per_leaf
+        NumbaFloatDType[:, :],  # polygon_coords
+        NumbaIntDType[:],  # polygon_offsets
     ),
     CellTreeData,
 )
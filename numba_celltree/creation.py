@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import Optional, Tuple
 
 import numba as nb
 import numpy as np
@@ -7,17 +7,22 @@ from .constants import (
     FLOAT_MAX,
     FLOAT_MIN,
     INT_MAX,
-    Bucket,
+    LEAF,
+    PARALLEL,
+    BoolArray,
     BucketArray,
     BucketDType,
+    BuildNodeDType,
     FloatArray,
+    FloatDType,
     IntArray,
     IntDType,
     Node,
     NodeArray,
     NodeDType,
 )
-from .geometry_utils import build_bboxes
+from .geometry_utils import build_bboxes, get_face
+from .lbvh import morton_codes, morton_split, radix_sort
 from .utils import allocate_stack, pop, push
 
 
@@ -41,111 +46,103 @@ def push_node(nodes: NodeArray, node: Node, index: int) -> int:
 
 
 @nb.njit(inline="always")
-def centroid_test(bucket: np.void, box: FloatArray, dim: int):
-    """
-    Tests whether the centroid of the bounding box in the selected dimension falls
-    within this bucket.
-    """
-    centroid = box[2 * dim] + 0.5 * (box[2 * dim + 1] - box[2 * dim])
-    return (centroid >= bucket.Min) and (centroid < bucket.Max)
+def centroid(box: FloatArray, dim: int) -> float:
+    return box[2 * dim] + 0.5 * (box[2 * dim + 1] - box[2 * dim])
 
 
-@nb.njit(inline="never", cache=True)
-def stable_partition(
-    bb_indices: IntArray,
-    bb_coords: FloatArray,
-    begin: int,
-    end: int,
-    bucket: BucketDType,
-    dim: int,
+@nb.njit(inline="always")
+def bucket_index(
+    buckets: BucketArray, value: float, range_Rmin: float, bucket_length: float
 ) -> int:
     """
-    Rearranges the elements in the range(begin, end), in such a way that all
-    the elements for which a predicate returns True precede all those for which it
-    returns False. The relative order in each group is maintained.
-    In this case, the predicate is a `centroid_test`.
-
-    Parameters
-    ----------
-    bb_indices: np.ndarray of ints
-        Array to sort.
-    bb_coords: np.ndarray of floats
-        Coordinates of bounding boxes.
-    begin, end: int
-        Defines the range of arr in which to sort.
-    bucket: np.void
-        Element of BucketArray, contains data for a single bucket.
-    dim: int
-        Dimension number (0: x, 1: y, etc.)
-    Returns
-    -------
-    current: int
-        Points to the first element of the second group for which predicate is True.
-    """
-    # Allocates a temporary buffer, ands fill from front and back: O(N)
-    # A swapping algorithm can be found here, O(N log(N)):
-    # https://csjobinterview.wordpress.com/2012/03/30/array-stable-partition/
-    # via: https://stackoverflow.com/questions/21554635/how-is-stable-partition-an-adaptive-algorithm
-    temp = np.empty(end - begin, dtype=bb_indices.dtype)
-    # TODO: add statically allocated work-array? Then use views for size?
-
-    count_true = 0
-    count_false = -1
-    for i in bb_indices[begin:end]:
-        box = bb_coords[i]
-        if centroid_test(bucket, box, dim):
-            temp[count_true] = i
-            count_true += 1
-        else:
-            temp[count_false] = i
-            count_false -= 1
-
-    for i in range(count_true):
-        bb_indices[begin + i] = temp[i]
-
-    start_second = begin + count_true
-    for i in range(-1 - count_false):
-        bb_indices[start_second + i] = temp[-i - 1]
-
-    return start_second
+    Find the bucket whose range (Min <= centroid < Max) contains the centroid.
+    Centroids beyond the last bucket, due to rounding, are placed in the last
+    bucket; all centroids are placed in the first bucket if the range has no
+    length.
+    """
+    n_buckets = len(buckets)
+    if not bucket_length > 0:
+        return 0
+    i = int((value - range_Rmin) / bucket_length)
+    if i < 0:
+        i = 0
+    elif i >= n_buckets:
+        i = n_buckets - 1
+    # Correct for rounding: the bucket ranges are decisive. These are
+    # computed exactly as in split, which is cheaper than loading them.
+    while i > 0 and value < i * bucket_length + range_Rmin:
+        i -= 1
+    while i < n_buckets - 1 and value >= (i + 1) * bucket_length + range_Rmin:
+        i += 1
+    return i
 
 
 @nb.njit(inline="never", cache=True)
 def sort_bbox_indices(
     bb_indices: IntArray,
     bb_coords: FloatArray,
+    work: IntArray,
     buckets: BucketArray,
-    node: NodeDType,
+    node: Node,
     dim: int,
-):
-    current = node.ptr
-    end = node.ptr + node.size
+    range_Rmin: float,
+    bucket_length: float,
+) -> None:
+    """
+    Sort the bounding boxes of the node into the buckets, based on their
+    centroids. The relative order within each bucket is maintained.
 
-    b = buckets[0]
-    buckets[0] = Bucket(b.Max, b.Min, b.Rmin, b.Lmax, node.ptr, b.size)
-
-    i = 1
-    while current != end:
-        bucket = buckets[i - 1]
-        current = stable_partition(bb_indices, bb_coords, current, end, bucket, dim)
-        start = bucket.index
-
-        b = buckets[i - 1]
-        buckets[i - 1] = Bucket(b.Max, b.Min, b.Rmin, b.Lmax, b.index, current - start)
-
-        if i < len(buckets):
-            b = buckets[i]
-            buckets[i] = Bucket(
-                b.Max,
-                b.Min,
-                b.Rmin,
-                b.Lmax,
-                buckets[i - 1].index + buckets[i - 1].size,
-                b.size,
-            )
+    This is a counting sort, requiring a single pass over the bounding boxes.
+    This pass counts the number of bounding boxes per bucket, and determines
+    the range of the bounding boxes (Rmin, Lmax) in every bucket. It stores
+    the bucket number together with the index in the work array. A second
+    pass moves the indices from the work array into their bucket.
 
-        start = current
-        i += 1
+    Only the part of the work array belonging to this node (ptr to ptr +
+    size) is used.
+    """
+    n_buckets = len(buckets)
+    begin = node.ptr
+    end = node.ptr + node.size
+    # Store the bucket number in the lowest bits.
+    shift = 0
+    while (1 << shift) < n_buckets:
+        shift += 1
+    mask = (1 << shift) - 1
+
+    for i in range(n_buckets):
+        buckets[i]["Rmin"] = FLOAT_MAX
+        buckets[i]["Lmax"] = FLOAT_MIN
+
+    for i in range(begin, end):
+        bbox_index = bb_indices[i]
+        box = bb_coords[bbox_index]
+        j = bucket_index(buckets, centroid(box, dim), range_Rmin, bucket_length)
+        work[i] = (bbox_index << shift) | j
+        bucket = buckets[j]
+        bucket["size"] += 1
+        if box[2 * dim] < bucket["Rmin"]:
+            bucket["Rmin"] = box[2 * dim]
+        if box[2 * dim + 1] > bucket["Lmax"]:
+            bucket["Lmax"] = box[2 * dim + 1]
+
+    # Run a cumulative sum to find the start of every bucket. Use index as
+    # the insertion point while moving the indices.
+    current = begin
+    for i in range(n_buckets):
+        buckets[i]["index"] = current
+        current += buckets[i]["size"]
+
+    for i in range(begin, end):
+        value = work[i]
+        bucket = buckets[value & mask]
+        bb_indices[bucket["index"]] = value >> shift
+        bucket["index"] += 1
+
+    # Restore the start of every bucket.
+    for i in range(n_buckets):
+        buckets[i]["index"] -= buckets[i]["size"]
+    return
 
 
 @nb.njit(inline="never", cache=True)
@@ -171,8 +168,9 @@ def get_bounds(
 
 @nb.njit(inline="never", cache=True)
 def split_plane(
-    buckets: List[Bucket],
-    root: np.void,
+    buckets: BucketArray,
+    n_bucket: int,
+    root: Node,
     range_Lmax: float,
     range_Rmin: float,
     bucket_length: float,
@@ -185,13 +183,13 @@ def split_plane(
     # if we split here, lmax is from bucket 0, and rmin is from bucket 1 after
     # computing those, we can compute the cost to split here, and if this is the
     # minimum, we split here.
-    for i in range(1, len(buckets)):
+    for i in range(1, n_bucket):
         current_bucket = buckets[i - 1]
         next_bucket = buckets[i]
-        bbs_in_left += current_bucket.size
+        bbs_in_left += current_bucket["size"]
         bbs_in_right = root.size - bbs_in_left
-        left_volume = (current_bucket.Lmax - range_Rmin) / bucket_length
-        right_volume = (range_Lmax - next_bucket.Rmin) / bucket_length
+        left_volume = (current_bucket["Lmax"] - range_Rmin) / bucket_length
+        right_volume = (range_Lmax - next_bucket["Rmin"]) / bucket_length
         plane_cost = left_volume * bbs_in_left + right_volume * bbs_in_right
         if plane_cost < plane_min_cost:
             plane_min_cost = plane_cost
@@ -200,11 +198,11 @@ def split_plane(
     Lmax = FLOAT_MIN
     Rmin = FLOAT_MAX
     for i in range(plane):
-        bLmax = buckets[i].Lmax
+        bLmax = buckets[i]["Lmax"]
         if bLmax > Lmax:
             Lmax = bLmax
-    for i in range(plane, len(buckets)):
-        bRmin = buckets[i].Rmin
+    for i in range(plane, n_bucket):
+        bRmin = buckets[i]["Rmin"]
         if bRmin < Rmin:
             Rmin = bRmin
 
@@ -214,72 +212,57 @@ def split_plane(
 @nb.njit(cache=True)
 def pessimistic_n_nodes(n_polys: int):
     """
-    In the worst case, *all* branches end in a leaf with a single cell. Rather
-    unlikely in the case of non-trivial grids, but we need a guess to
-    pre-allocate -- overestimation is at maximum two times in case of
-    cells_per_leaf == 2.
+    Every split results in two non-empty children, so the tree is a full
+    binary tree with at most n_polys leaves: in the worst case, every leaf
+    contains a single cell. Such a tree has 2 * n_polys - 1 nodes.
     """
-    n_nodes = n_polys
-    nodes = int(np.ceil(n_polys / 2))
-    while nodes > 1:
-        n_nodes += nodes
-        nodes = int(np.ceil(nodes / 2))
-    # Return, add root.
-    return n_nodes + 1
-
-
-@nb.njit(inline="always")
-def push_both(root_stack, dim_stack, root, dim, size):
-    size_root = push(root_stack, root, size)
-    _ = push(dim_stack, dim, size)
-    return size_root
-
-
-@nb.njit(inline="always")
-def pop_both(root_stack, dim_stack, size):
-    root, size_root = pop(root_stack, size)
-    dim, _ = pop(dim_stack, size)
-    return root, dim, size_root
+    return max(1, 2 * n_polys - 1)
 
 
 @nb.njit(cache=True)
-def build(
+def split(
     nodes: NodeArray,
-    node_index: int,
+    root_index: int,
     bb_indices: IntArray,
     bb_coords: FloatArray,
-    n_buckets: int,
+    work: IntArray,
+    buckets: BucketArray,
     cells_per_leaf: int,
-):
-    # Cannot compile ahead of time with Numba and recursion
-    # Just use a stack based approach instead
-    root_stack = allocate_stack()
-    dim_stack = allocate_stack()
-    root_stack[0] = 0
-    dim_stack[0] = 0
-    size = 1
+) -> int:
+    """
+    Split a single node, by sorting its part of bb_indices into buckets and
+    selecting the cheapest split plane.
 
-    while size > 0:
-        root_index, dim, size = pop_both(root_stack, dim_stack, size)
-
-        dim_flag = dim
-        if dim < 0:
-            dim += 2
-
-        # Fetch this root node
-        root = Node(
-            nodes[root_index]["child"],
-            nodes[root_index]["Lmax"],
-            nodes[root_index]["Rmin"],
-            nodes[root_index]["ptr"],
-            nodes[root_index]["size"],
-            nodes[root_index]["dim"],
-        )
+    Only the range of bb_indices (and of the work array) belonging to this
+    node is modified, and only this node and the buckets are written to: nodes
+    of the same tree level can be split concurrently, provided they use
+    separate buckets.
 
-        # Is it a leaf? if so, we're done, otherwise split.
-        if root.size <= cells_per_leaf:
-            continue
+    Returns
+    -------
+    right_index: int
+        Index into bb_indices where the right child starts, or -1 if the
+        node is a leaf.
+    """
+    # Fetch this root node
+    root = Node(
+        nodes[root_index]["child"],
+        nodes[root_index]["Lmax"],
+        nodes[root_index]["Rmin"],
+        nodes[root_index]["ptr"],
+        nodes[root_index]["size"],
+        nodes[root_index]["dim"],
+    )
 
+    # Is it a leaf? if so, we're done, otherwise split.
+    if root.size <= cells_per_leaf:
+        return -1
+
+    n_buckets = len(buckets)
+    dim = 1 if root.dim else 0
+    # If all cells end up in a single bucket, retry once in the other
+    # dimension.
+    for attempt in range(2):
         # Find bounding range of node's entire dataset in dimension 0 (x-axis).
         range_Rmin, range_Lmax = get_bounds(
             root.ptr,
@@ -290,33 +273,27 @@ def build(
         )
         bucket_length = (range_Lmax - range_Rmin) / n_buckets
 
-        # Create buckets
-        buckets = []
         # Specify ranges on the buckets
         for i in range(n_buckets):
-            buckets.append(
-                Bucket(
-                    (i + 1) * bucket_length + range_Rmin,  # Max
-                    i * bucket_length + range_Rmin,  # Min
-                    -1.0,  # Rmin
-                    -1.0,  # Lmax
-                    -1,  # index
-                    0,  # size
-                )
-            )
-        # NOTA BENE: do not change the default size (0) given to the bucket here
-        # it is used to detect empty buckets later on.
-
-        # Now that the buckets are setup, sort them
-        sort_bbox_indices(bb_indices, bb_coords, buckets, root, dim)
-
-        # Determine Lmax and Rmin for each bucket
-        for i in range(n_buckets):
-            Rmin, Lmax = get_bounds(
-                buckets[i].index, buckets[i].size, bb_coords, bb_indices, dim
-            )
-            b = buckets[i]
-            buckets[i] = Bucket(b.Max, b.Min, Rmin, Lmax, b.index, b.size)
+            bucket = buckets[i]
+            bucket["Max"] = (i + 1) * bucket_length + range_Rmin
+            bucket["Min"] = i * bucket_length + range_Rmin
+            # NOTA BENE: do not change the default size (0) given to the bucket
+            # here it is used to detect empty buckets later on.
+            bucket["size"] = 0
+
+        # Now that the buckets are setup, sort them. This also determines
+        # Lmax and Rmin for each bucket.
+        sort_bbox_indices(
+            bb_indices,
+            bb_coords,
+            work,
+            buckets,
+            root,
+            dim,
+            range_Rmin,
+            bucket_length,
+        )
 
         # Special case: 2 bounding boxes share the same centroid, but boxes_per_leaf
         # is 1. This will break most of the usual bucketing code. Unless the grid has
@@ -325,100 +302,697 @@ def build(
         if (cells_per_leaf == 1) and (root.size == 2):
             nodes[root_index]["Lmax"] = range_Lmax
             nodes[root_index]["Rmin"] = range_Rmin
-            left_child = create_node(root.ptr, 1, not dim)
-            right_child = create_node(root.ptr + 1, 1, not dim)
-            nodes[root_index]["child"] = node_index
-            node_index = push_node(nodes, left_child, node_index)
-            node_index = push_node(nodes, right_child, node_index)
+            return root.ptr + 1
+
+        # Compact the buckets by removing the empty ones: the non-empty
+        # buckets are moved to the front, the first n_bucket are in use.
+        # Leading empty buckets are merged with the first non-empty bucket.
+        # Any other empty bucket is merged with the previous one. As long as
+        # the ranges of the merged buckets are still proper, calculating cost
+        # for empty buckets can be avoided, and the split will still happen in
+        # the right place.
+        n_bucket = 0
+        Min = buckets[0]["Min"]
+        for i in range(n_buckets):
+            if buckets[i]["size"] == 0:
+                if n_bucket > 0:
+                    buckets[n_bucket - 1]["Max"] = buckets[i]["Max"]
+                continue
+            if n_bucket > 0:
+                Min = buckets[i]["Min"]
+            if n_bucket != i:
+                buckets[n_bucket] = buckets[i]
+            buckets[n_bucket]["Min"] = Min
+            n_bucket += 1
+
+        # Check if all the cells are in one bucket. If so, switch dimension and
+        # try again.
+        if n_bucket > 1:
+            break
+        elif attempt == 0:
+            dim = 1 - dim
+            nodes[root_index]["dim"] = not root.dim
+        else:  # Already split once, convert to leaf.
+            nodes[root_index]["Lmax"] = -1
+            nodes[root_index]["Rmin"] = -1
+            return -1
+
+    # plane is the separation line to split on:
+    # 0 [bucket0] 1 [bucket1] 2 [bucket2] 3 [bucket3]
+    plane, Lmax, Rmin = split_plane(
+        buckets, n_bucket, root, range_Lmax, range_Rmin, bucket_length
+    )
+    nodes[root_index]["Lmax"] = Lmax
+    nodes[root_index]["Rmin"] = Rmin
+    return buckets[plane]["index"]
+
+
+@nb.njit(inline="always")
+def split_node(
+    nodes: NodeArray,
+    root_index: int,
+    bb_indices: IntArray,
+    bb_coords: FloatArray,
+    codes: IntArray,
+    work: IntArray,
+    buckets: BucketArray,
+    cells_per_leaf: int,
+    depth: int,
+) -> int:
+    """
+    Split with the linear builder if the Morton codes are given, with the
+    bucketed surface area heuristic otherwise.
+    """
+    if codes.size > 0:
+        return morton_split(nodes, root_index, codes, cells_per_leaf, depth)
+    return split(
+        nodes, root_index, bb_indices, bb_coords, work, buckets, cells_per_leaf
+    )
+
+
+@nb.njit(inline="always")
+def push_children(
+    nodes: NodeArray, root_index: int, right_index: int, node_index: int
+) -> int:
+    """
+    Create the two children of a node that has been split at right_index.
+    """
+    ptr = nodes[root_index]["ptr"]
+    end = ptr + nodes[root_index]["size"]
+    dim = not nodes[root_index]["dim"]
+    left_child = create_node(ptr, right_index - ptr, dim)
+    right_child = create_node(right_index, end - right_index, dim)
+    nodes[root_index]["child"] = node_index
+    node_index = push_node(nodes, left_child, node_index)
+    node_index = push_node(nodes, right_child, node_index)
+    return node_index
+
+
+@nb.njit(cache=True)
+def build_subtree(
+    nodes: NodeArray,
+    node_index: int,
+    root_index: int,
+    bb_indices: IntArray,
+    bb_coords: FloatArray,
+    codes: IntArray,
+    work: IntArray,
+    n_buckets: int,
+    cells_per_leaf: int,
+    root_depth: int,
+) -> int:
+    # The buckets are re-used for every node of the subtree.
+    buckets = np.empty(n_buckets, dtype=BucketDType)
+    # Cannot compile ahead of time with Numba and recursion
+    # Just use a stack based approach instead
+    stack = allocate_stack()
+    depth_stack = allocate_stack()
+    stack[0] = root_index
+    depth_stack[0] = root_depth
+    size = 1
+    while size > 0:
+        # Sizes are synchronized.
+        depth, _ = pop(depth_stack, size)
+        root_index, size = pop(stack, size)
+        right_index = split_node(
+            nodes,
+            root_index,
+            bb_indices,
+            bb_coords,
+            codes,
+            work,
+            buckets,
+            cells_per_leaf,
+            depth,
+        )
+        if right_index == -1:
             continue
+        child_index = node_index
+        node_index = push_children(nodes, root_index, right_index, node_index)
+        push(depth_stack, depth + 1, size)
+        size = push(stack, child_index + 1, size)
+        push(depth_stack, depth + 1, size)
+        size = push(stack, child_index, size)
+    return node_index
 
-        while buckets[0].size == 0:
-            b = buckets[1]
-            buckets[1] = Bucket(b.Max, buckets[0].Min, b.Rmin, b.Lmax, b.index, b.size)
-            buckets.pop(0)
-
-        i = 1
-        while i < len(buckets):
-            next_bucket = buckets[i]
-            # if a empty bucket is encountered, merge it with the previous one and
-            # continue as normal. As long as the ranges of the merged buckets are
-            # still proper, calculating cost for empty buckets can be avoided, and
-            # the split will still happen in the right place
-            if next_bucket.size == 0:
-                b = buckets[i - 1]
-                buckets[i - 1] = Bucket(
-                    next_bucket.Max, b.Min, b.Rmin, b.Lmax, b.index, b.size
-                )
-                buckets.pop(i)
-            else:
-                i += 1
-
-        # Check if all the cells are in one bucket. If so, restart and switch
-        # dimension.
-        needs_continue = False
-        for bucket in buckets:
-            if bucket.size == root.size:
-                needs_continue = True
-                if dim_flag >= 0:
-                    dim_flag = (not dim) - 2
-                    nodes[root_index]["dim"] = not root.dim
-                    size = push_both(root_stack, dim_stack, root_index, dim_flag, size)
-                else:  # Already split once, convert to leaf.
-                    nodes[root_index]["Lmax"] = -1
-                    nodes[root_index]["Rmin"] = -1
-                break
-        if needs_continue:
+
+@nb.njit(cache=True)
+def copy_node(nodes: NodeArray, src: int, dst: int, shift: int) -> None:
+    node = Node(
+        nodes[src]["child"],
+        nodes[src]["Lmax"],
+        nodes[src]["Rmin"],
+        nodes[src]["ptr"],
+        nodes[src]["size"],
+        nodes[src]["dim"],
+    )
+    push_node(nodes, node, dst)
+    if node.child != -1:
+        nodes[dst]["child"] = node.child + shift
+    return
+
+
+@nb.njit(cache=True)
+def depth_first_order(
+    nodes: NodeArray,
+    n_top: int,
+    frontier: IntArray,
+    starts: IntArray,
+    ends: IntArray,
+) -> int:
+    """
+    Move the nodes into the layout of a single depth-first build: the
+    descendants of every node are stored contiguously, the children directly
+    at the start.
+
+    The first n_top nodes have been created level by level; the descendants
+    of every frontier node have been built depth-first in their own block of
+    nodes, from starts[i] up to ends[i]. The blocks are separated by unused
+    space.
+
+    Returns the number of nodes.
+    """
+    # Every block ends up at or before its current location, in the same
+    # order; only the top nodes can move further back. Store those
+    # separately first.
+    top = nodes[:n_top].copy()
+    block = np.full(n_top, -1, dtype=IntDType)
+    for i in range(frontier.size):
+        block[frontier[i]] = i
+
+    # Number the nodes the way a single stack would, but skip over the
+    # blocks.
+    new_index = np.empty(n_top, dtype=IntDType)
+    new_starts = np.empty(frontier.size, dtype=IntDType)
+    new_index[0] = 0
+    next_index = 1
+    stack = allocate_stack()
+    stack[0] = 0
+    size = 1
+    while size > 0:
+        node_index, size = pop(stack, size)
+        i = block[node_index]
+        if i != -1:
+            new_starts[i] = next_index
+            next_index += ends[i] - starts[i]
+            continue
+        left_child = top[node_index]["child"]
+        if left_child == -1:
             continue
+        new_index[left_child] = next_index
+        new_index[left_child + 1] = next_index + 1
+        next_index += 2
+        size = push(stack, left_child + 1, size)
+        size = push(stack, left_child, size)
+
+    # Move the blocks forward.
+    for i in range(frontier.size):
+        shift = new_starts[i] - starts[i]
+        for j in range(starts[i], ends[i]):
+            copy_node(nodes, j, j + shift, shift)
+
+    # Place the top nodes.
+    for node_index in range(n_top):
+        new = new_index[node_index]
+        nodes[new] = top[node_index]
+        i = block[node_index]
+        if i != -1:
+            if ends[i] > starts[i]:
+                nodes[new]["child"] = new_starts[i]
+        elif top[node_index]["child"] != -1:
+            nodes[new]["child"] = new_index[top[node_index]["child"]]
+
+    return next_index
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def build(
+    nodes: NodeArray,
+    node_index: int,
+    bb_indices: IntArray,
+    bb_coords: FloatArray,
+    codes: IntArray,
+    n_buckets: int,
+    cells_per_leaf: int,
+    n_subtree: int,
+):
+    # Split the top of the tree level by level: the nodes of a single level
+    # (the frontier) cover disjoint parts of bb_indices, and can be split in
+    # parallel. Continue until there are at least n_subtree nodes.
+    frontier = np.zeros(1, dtype=IntDType)
+    # Every node of the frontier requires its own buckets. The nodes share a
+    # single work array for sorting, since they cover disjoint parts. The
+    # linear builder (given the Morton codes) does not sort.
+    buckets = np.empty((n_subtree, n_buckets), dtype=BucketDType)
+    work = np.empty(0 if codes.size > 0 else bb_indices.size, dtype=IntDType)
+    depth = 0
+    while 0 < frontier.size < n_subtree:
+        n_frontier = frontier.size
+        right_indices = np.empty(n_frontier, dtype=IntDType)
+        for i in nb.prange(n_frontier):  # pylint: disable=not-an-iterable
+            right_indices[i] = split_node(
+                nodes,
+                frontier[i],
+                bb_indices,
+                bb_coords,
+                codes,
+                work,
+                buckets[i],
+                cells_per_leaf,
+                depth,
+            )
 
-        # plane is the separation line to split on:
-        # 0 [bucket0] 1 [bucket1] 2 [bucket2] 3 [bucket3]
-        plane, Lmax, Rmin = split_plane(
-            buckets, root, range_Lmax, range_Rmin, bucket_length
+        # Hand out the node indices for the children serially. This is cheap
+        # compared to the splitting, and avoids any contention.
+        n_split = 0
+        for i in range(n_frontier):
+            if right_indices[i] != -1:
+                n_split += 1
+
+        next_frontier = np.empty(2 * n_split, dtype=IntDType)
+        count = 0
+        for i in range(n_frontier):
+            right_index = right_indices[i]
+            if right_index == -1:
+                continue
+            next_frontier[count] = node_index
+            next_frontier[count + 1] = node_index + 1
+            count += 2
+            node_index = push_children(nodes, frontier[i], right_index, node_index)
+        frontier = next_frontier
+        depth += 1
+
+    # Build the subtrees below the frontier depth-first, in parallel. Every
+    # subtree has its own block of nodes: a subtree of n cells has at most
+    # 2 * n - 2 descendants. This fits within the pre-allocated nodes.
+    n_top = node_index
+    n_frontier = frontier.size
+    starts = np.empty(n_frontier, dtype=IntDType)
+    ends = np.empty(n_frontier, dtype=IntDType)
+    for i in range(n_frontier):
+        starts[i] = node_index
+        node_index += max(0, 2 * nodes[frontier[i]]["size"] - 2)
+
+    for i in nb.prange(n_frontier):  # pylint: disable=not-an-iterable
+        ends[i] = build_subtree(
+            nodes,
+            starts[i],
+            frontier[i],
+            bb_indices,
+            bb_coords,
+            codes,
+            work,
+            n_buckets,
+            cells_per_leaf,
+            depth,
         )
-        right_index = buckets[plane].index
-        right_size = root.ptr + root.size - right_index
-        left_index = root.ptr
-        left_size = root.size - right_size
-        nodes[root_index]["Lmax"] = Lmax
-        nodes[root_index]["Rmin"] = Rmin
-        left_child = create_node(left_index, left_size, not dim)
-        right_child = create_node(right_index, right_size, not dim)
-        nodes[root_index]["child"] = node_index
-        child_ind = node_index
-        node_index = push_node(nodes, left_child, node_index)
-        node_index = push_node(nodes, right_child, node_index)
-
-        size = push_both(root_stack, dim_stack, child_ind + 1, right_child.dim, size)
-        size = push_both(root_stack, dim_stack, child_ind, left_child.dim, size)
 
-    return node_index
+    return depth_first_order(nodes, n_top, frontier, starts, ends)
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def pack_nodes(build_nodes: NodeArray, n_nodes: int) -> NodeArray:
+    """
+    Convert the first n_nodes of the nodes created during construction to the
+    packed layout of NodeDType.
+    """
+    nodes = np.empty(n_nodes, dtype=NodeDType)
+    for i in nb.prange(n_nodes):  # pylint: disable=not-an-iterable
+        node = build_nodes[i]
+        packed = nodes[i]
+        child = node["child"]
+        if child == -1:
+            packed["ptr"] = node["ptr"]
+            packed["size"] = node["size"]
+            packed["child"] = LEAF
+        else:
+            packed["Lmax"] = node["Lmax"]
+            packed["Rmin"] = node["Rmin"]
+            packed["child"] = (child << 1) | (1 if node["dim"] else 0)
+    return nodes
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def fit_node_bounds(
+    nodes: NodeArray, bb_indices: IntArray, bb_coords: FloatArray
+) -> FloatArray:
+    """
+    Compute the tightest bounds (xmin, xmax, ymin, ymax) of every node, given
+    the bounding boxes.
+
+    The children of a node are stored after it: visiting the nodes in reverse
+    order, the bounds of the children are known before those of their parent.
+    """
+    n_nodes = len(nodes)
+    node_bounds = np.empty((n_nodes, 4), dtype=FloatDType)
+    for i in nb.prange(n_nodes):  # pylint: disable=not-an-iterable
+        node = nodes[i]
+        if node["child"] != LEAF:
+            continue
+        node_bounds[i, 0] = FLOAT_MAX
+        node_bounds[i, 1] = FLOAT_MIN
+        node_bounds[i, 2] = FLOAT_MAX
+        node_bounds[i, 3] = FLOAT_MIN
+        for j in range(node["ptr"], node["ptr"] + node["size"]):
+            box = bb_coords[bb_indices[j]]
+            node_bounds[i, 0] = min(node_bounds[i, 0], box[0])
+            node_bounds[i, 1] = max(node_bounds[i, 1], box[1])
+            node_bounds[i, 2] = min(node_bounds[i, 2], box[2])
+            node_bounds[i, 3] = max(node_bounds[i, 3], box[3])
+
+    for i in range(n_nodes - 1, -1, -1):
+        child = nodes[i]["child"]
+        if child == LEAF:
+            continue
+        left_child = child >> 1
+        right_child = left_child + 1
+        node_bounds[i, 0] = min(node_bounds[left_child, 0], node_bounds[right_child, 0])
+        node_bounds[i, 1] = max(node_bounds[left_child, 1], node_bounds[right_child, 1])
+        node_bounds[i, 2] = min(node_bounds[left_child, 2], node_bounds[right_child, 2])
+        node_bounds[i, 3] = max(node_bounds[left_child, 3], node_bounds[right_child, 3])
+    return node_bounds
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def refit(nodes: NodeArray, node_bounds: FloatArray) -> None:
+    """
+    Set Lmax and Rmin of every internal node to the bounds of its children,
+    without changing the structure of the tree.
+    """
+    for i in nb.prange(len(nodes)):  # pylint: disable=not-an-iterable
+        child = nodes[i]["child"]
+        if child == LEAF:
+            continue
+        dim = child & 1
+        left_child = child >> 1
+        right_child = left_child + 1
+        nodes[i]["Lmax"] = node_bounds[left_child, 2 * dim + 1]
+        nodes[i]["Rmin"] = node_bounds[right_child, 2 * dim]
+    return
 
 
 @nb.njit(cache=True)
-def initialize(
-    vertices: FloatArray, faces: IntArray, n_buckets: int = 4, cells_per_leaf: int = 2
+def tree_cost(nodes: NodeArray, node_bounds: FloatArray) -> float:
+    """
+    Estimate the cost of a query, following the surface area heuristic: the
+    probability of visiting a node is proportional to its perimeter; visiting
+    a leaf requires testing all of its cells. The cost is relative to the
+    perimeter of the root.
+    """
+    total = 0.0
+    for i in range(len(nodes)):
+        if node_bounds[i, 0] > node_bounds[i, 1]:
+            # Empty, after removing faces: the bounds are inverted, and
+            # subtracting them would overflow.
+            continue
+        perimeter = (node_bounds[i, 1] - node_bounds[i, 0]) + (
+            node_bounds[i, 3] - node_bounds[i, 2]
+        )
+        if nodes[i]["child"] == LEAF:
+            total += perimeter * nodes[i]["size"]
+        else:
+            total += perimeter
+    if total == 0.0:
+        # All faces removed, or all of zero extent.
+        return total
+    root = (node_bounds[0, 1] - node_bounds[0, 0]) + (
+        node_bounds[0, 3] - node_bounds[0, 2]
+    )
+    return total / root
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def pack_polygons(
+    nodes: NodeArray,
+    bb_indices: IntArray,
+    face_nodes: IntArray,
+    face_offsets: IntArray,
+    vertices: FloatArray,
+) -> Tuple[FloatArray, IntArray]:
+    """
+    Copy the vertex coordinates of the polygons, in the order of bb_indices,
+    into a single contiguous array. The polygon of bb_indices[i] starts at
+    coords[offsets[i]], and is coords[offsets[i] : offsets[i + 1]].
+
+    Entries of bb_indices outside of the leaves (spare capacity after
+    inserting faces) get a polygon of length zero.
+    """
+    n = bb_indices.size
+    offsets = np.zeros(n + 1, dtype=IntDType)
+    for i in nb.prange(len(nodes)):  # pylint: disable=not-an-iterable
+        node = nodes[i]
+        if node["child"] != LEAF:
+            continue
+        for j in range(node["ptr"], node["ptr"] + node["size"]):
+            face_index = bb_indices[j]
+            offsets[j + 1] = face_offsets[face_index + 1] - face_offsets[face_index]
+
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+
+    coords = np.empty((offsets[n], 2), dtype=FloatDType)
+    for i in nb.prange(n):  # pylint: disable=not-an-iterable
+        start = offsets[i]
+        length = offsets[i + 1] - start
+        if length == 0:
+            continue
+        face = get_face(face_nodes, face_offsets, bb_indices[i])
+        for k in range(length):
+            coords[start + k, 0] = vertices[face[k], 0]
+            coords[start + k, 1] = vertices[face[k], 1]
+    return coords, offsets
+
+
+@nb.njit(cache=True)
+def leaf_capacity(nodes: NodeArray) -> IntArray:
+    """
+    Number of slots in bb_indices available to every leaf, without moving it.
+    Zero for internal nodes.
+    """
+    capacity = np.zeros(len(nodes), dtype=IntDType)
+    for i in range(len(nodes)):
+        if nodes[i]["child"] == LEAF:
+            capacity[i] = nodes[i]["size"]
+    return capacity
+
+
+@nb.njit(cache=True)
+def collect_faces(nodes: NodeArray, bb_indices: IntArray, n_face: int) -> BoolArray:
+    """
+    Mark the faces contained by the leaves of the tree.
+    """
+    contained = np.zeros(n_face, dtype=np.bool_)
+    for i in range(len(nodes)):
+        node = nodes[i]
+        if node["child"] != LEAF:
+            continue
+        for j in range(node["ptr"], node["ptr"] + node["size"]):
+            contained[bb_indices[j]] = True
+    return contained
+
+
+@nb.njit(cache=True)
+def insert_bboxes(
+    nodes: NodeArray,
+    bb_indices: IntArray,
+    polygon_starts: IntArray,
+    n_used: int,
+    capacity: IntArray,
+    bb_coords: FloatArray,
+    indices: IntArray,
+    new_starts: IntArray,
+) -> Tuple[IntArray, IntArray, int]:
+    """
+    Add the bounding boxes to the leaves of an existing tree.
+
+    Every bounding box descends into the child whose bound has to be extended
+    the least, extending the bounds along the way. When a leaf is full, it is
+    moved to the end of the used part of bb_indices, with twice its capacity.
+    bb_indices is grown when required, and returned together with the number
+    of used entries.
+
+    With packed polygons, polygon_starts holds the start of the packed
+    coordinates of every entry of bb_indices, and is moved and grown
+    alongside it; new_starts holds the starts of the new faces. Otherwise,
+    both are empty.
+    """
+    packed = polygon_starts.size > 0
+    for k in range(len(indices)):
+        f = indices[k]
+        box = bb_coords[f]
+        node_index = 0
+        child = nodes[node_index]["child"]
+        while child != LEAF:
+            dim = child & 1
+            lower = box[2 * dim]
+            upper = box[2 * dim + 1]
+            Lmax = nodes[node_index]["Lmax"]
+            Rmin = nodes[node_index]["Rmin"]
+            grow_left = max(0.0, upper - Lmax)
+            grow_right = max(0.0, Rmin - lower)
+            if grow_left < grow_right or (
+                grow_left == grow_right
+                and centroid(box, dim) <= Lmax + 0.5 * (Rmin - Lmax)
+            ):
+                nodes[node_index]["Lmax"] = max(Lmax, upper)
+                node_index = child >> 1
+            else:
+                nodes[node_index]["Rmin"] = min(Rmin, lower)
+                node_index = (child >> 1) + 1
+            child = nodes[node_index]["child"]
+
+        ptr = nodes[node_index]["ptr"]
+        size = nodes[node_index]["size"]
+        if size == capacity[node_index]:
+            new_capacity = max(2 * size, 1)
+            if n_used + new_capacity > bb_indices.size:
+                n_grown = max(2 * bb_indices.size, n_used + new_capacity)
+                grown = np.empty(n_grown, dtype=IntDType)
+                grown[:n_used] = bb_indices[:n_used]
+                bb_indices = grown
+            if packed and n_used + new_capacity > polygon_starts.size:
+                grown = np.empty(bb_indices.size, dtype=IntDType)
+                grown[:n_used] = polygon_starts[:n_used]
+                polygon_starts = grown
+            bb_indices[n_used : n_used + size] = bb_indices[ptr : ptr + size]
+            if packed:
+                polygon_starts[n_used : n_used + size] = polygon_starts[
+                    ptr : ptr + size
+                ]
+            ptr = n_used
+            n_used += new_capacity
+            nodes[node_index]["ptr"] = ptr
+            capacity[node_index] = new_capacity
+
+        bb_indices[ptr + size] = f
+        if packed:
+            polygon_starts[ptr + size] = new_starts[k]
+        nodes[node_index]["size"] = size + 1
+    return bb_indices, polygon_starts, n_used
+
+
+@nb.njit(cache=True)
+def remove_bboxes(
+    nodes: NodeArray,
+    bb_indices: IntArray,
+    polygon_starts: IntArray,
+    bb_coords: FloatArray,
+    indices: IntArray,
+) -> None:
+    """
+    Remove the bounding boxes from the leaves of the tree. The bounds of the
+    nodes are left as is: they remain valid.
+
+    Every bounding box is found by traversing the tree with its own bounds;
+    it is replaced by the last bounding box of its leaf. With packed
+    polygons, the start of its packed coordinates in polygon_starts is
+    replaced alike; the coordinates themselves are not moved.
+    """
+    packed = polygon_starts.size > 0
+    stack = allocate_stack()
+    for f in indices:
+        box = bb_coords[f]
+        stack[0] = 0
+        size = 1
+        found = False
+        while size > 0 and not found:
+            node_index, size = pop(stack, size)
+            node = nodes[node_index]
+            child = node["child"]
+            if child == LEAF:
+                end = node["ptr"] + node["size"]
+                for i in range(node["ptr"], end):
+                    if bb_indices[i] == f:
+                        bb_indices[i] = bb_indices[end - 1]
+                        if packed:
+                            polygon_starts[i] = polygon_starts[end - 1]
+                        nodes[node_index]["size"] = node["size"] - 1
+                        found = True
+                        break
+                continue
+
+            dim = child & 1
+            if box[2 * dim + 1] >= node["Rmin"]:
+                size = push(stack, (child >> 1) + 1, size)
+            if box[2 * dim] <= node["Lmax"]:
+                size = push(stack, child >> 1, size)
+    return
+
+
+# Not compiled: the number of threads cannot be retrieved in a cached function.
+def initialize_bboxes(
+    bb_coords: FloatArray,
+    n_buckets: int = 4,
+    cells_per_leaf: int = 2,
+    bb_indices: Optional[IntArray] = None,
+    builder: str = "sah",
 ) -> Tuple[NodeArray, IntArray]:
-    # Prepare bounding boxes for tree building.
-    bb_coords = build_bboxes(faces, vertices)
-    bb_indices = np.arange(len(faces), dtype=IntDType)
+    """
+    Build the tree for the bounding boxes with indices bb_indices, by default
+    all bounding boxes.
+
+    The "sah" builder splits nodes with a bucketed surface area heuristic.
+    The "lbvh" builder sorts the bounding boxes along a Morton curve instead,
+    and splits nodes in the sorted order: this is faster, but results in a
+    tree of lower quality.
+    """
+    if bb_indices is None:
+        bb_indices = np.arange(len(bb_coords), dtype=IntDType)
+    n_threads = nb.get_num_threads()
+    if builder == "lbvh":
+        codes, bb_indices = radix_sort(
+            morton_codes(bb_coords, bb_indices), bb_indices, n_threads
+        )
+    else:
+        codes = np.empty(0, dtype=IntDType)
 
     # Pre-allocate the space for the tree.
-    n_polys, _ = faces.shape
+    n_polys = bb_indices.size
     n_nodes = pessimistic_n_nodes(n_polys)
-    nodes = np.empty(n_nodes, dtype=NodeDType)
+    nodes = np.empty(n_nodes, dtype=BuildNodeDType)
 
     # Insert first node
     node = create_node(0, bb_indices.size, False)
     node_index = push_node(nodes, node, 0)
 
+    # With a single thread, build depth-first straight away. Otherwise, aim
+    # for a few subtrees per thread to balance the load.
+    n_subtree = 1 if n_threads == 1 else 4 * n_threads
     node_index = build(
         nodes,
         node_index,
         bb_indices,
         bb_coords,
+        codes,
         n_buckets,
         cells_per_leaf,
+        n_subtree,
     )
 
-    # Remove the unused part in nodes.
-    return nodes[:node_index], bb_indices, bb_coords
+    # Pack the used part of nodes into an array of exact size: a slice would
+    # keep the entire pre-allocated array alive.
+    nodes = pack_nodes(nodes, node_index)
+    if builder == "lbvh":
+        refit(nodes, fit_node_bounds(nodes, bb_indices, bb_coords))
+    return nodes, bb_indices
+
+
+def initialize(
+    vertices: FloatArray,
+    face_nodes: IntArray,
+    face_offsets: IntArray,
+    n_buckets: int = 4,
+    cells_per_leaf: int = 2,
+    bb_indices: Optional[IntArray] = None,
+    builder: str = "sah",
+) -> Tuple[NodeArray, IntArray, FloatArray]:
+    """
+    Build the tree for the faces with indices bb_indices, by default all
+    faces. See initialize_bboxes.
+    """
+    # Prepare bounding boxes for tree building.
+    bb_coords = build_bboxes(face_nodes, face_offsets, vertices)
+    nodes, bb_indices = initialize_bboxes(
+        bb_coords, n_buckets, cells_per_leaf, bb_indices, builder
+    )
+    return nodes, bb_indices, bb_coords
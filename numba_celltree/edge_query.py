@@ -0,0 +1,218 @@
+"""
+Queries on a tree of line segments (edges) rather than faces. The faces of
+the CellTreeData consist of the two vertex indices of every edge.
+"""
+import numba as nb
+import numpy as np
+
+from .algorithms import cohen_sutherland_line_box_clip, segment_segment_intersection
+from .constants import (
+    LEAF,
+    PARALLEL,
+    BoolArray,
+    CellTreeData,
+    FloatArray,
+    FloatDType,
+    IntArray,
+    IntDType,
+)
+from .geometry_utils import (
+    Point,
+    as_box,
+    as_point,
+    point_box_distance_squared,
+    point_box_gaps,
+    point_segment_distance_squared,
+    to_vector,
+)
+from .query import face_range, push_children_by_gap, segment_children
+from .utils import allocate_float_stack, allocate_stack, pop, push
+
+
+@nb.njit(inline="always")
+def locate_segment(
+    a: Point,
+    b: Point,
+    tree: CellTreeData,
+    indices: IntArray,
+    intersections: FloatArray,
+    store_intersection: bool,
+):
+    # Check if the line segment intersects with the tree at all
+    tree_bbox = as_box(tree.bbox)
+    tree_intersects, _, _ = cohen_sutherland_line_box_clip(a, b, tree_bbox)
+    if not tree_intersects:
+        return 0
+
+    V = to_vector(a, b)
+    stack = allocate_stack()
+    stack[0] = 0
+    size = 1
+    count = 0
+
+    while size > 0:
+        node_index, size = pop(stack, size)
+        node = tree.nodes[node_index]
+        child = node["child"]
+
+        # Check if it's a leaf
+        if child == LEAF:
+            for i in range(node["ptr"], node["ptr"] + node["size"]):
+                edge_index = tree.bb_indices[i]
+                start, _ = face_range(tree, edge_index)
+                c = as_point(tree.vertices[tree.face_nodes[start]])
+                d = as_point(tree.vertices[tree.face_nodes[start + 1]])
+                edge_intersects, p = segment_segment_intersection(a, b, c, d)
+                if edge_intersects:
+                    if store_intersection:
+                        indices[count] = edge_index
+                        intersections[count, 0] = p.x
+                        intersections[count, 1] = p.y
+                    count += 1
+            continue
+
+        left, right = segment_children(a, b, V, node["Lmax"], node["Rmin"], child & 1)
+        left_child = child >> 1
+        right_child = left_child + 1
+
+        if left and right:
+            size = push(stack, left_child, size)
+            size = push(stack, right_child, size)
+        elif left:
+            size = push(stack, left_child, size)
+        elif right:
+            size = push(stack, right_child, size)
+
+    return count
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def locate_segments(
+    edge_coords: FloatArray,
+    tree: CellTreeData,
+):
+    # Count first, then allocate and store: see locate_edges.
+    n_edge = edge_coords.shape[0]
+    counts = np.empty(n_edge + 1, dtype=IntDType)
+    int_dummy = np.empty((0,), dtype=IntDType)
+    float_dummy = np.empty((0, 0), dtype=FloatDType)
+    counts[0] = 0
+    for i in nb.prange(n_edge):  # pylint: disable=not-an-iterable
+        a = as_point(edge_coords[i, 0])
+        b = as_point(edge_coords[i, 1])
+        counts[i + 1] = locate_segment(a, b, tree, int_dummy, float_dummy, False)
+
+    # Run a cumulative sum
+    total = 0
+    for i in range(1, n_edge + 1):
+        total += counts[i]
+        counts[i] = total
+
+    # Now allocate appropriately
+    ii = np.empty(total, dtype=IntDType)
+    jj = np.empty(total, dtype=IntDType)
+    xy = np.empty((total, 2), dtype=FloatDType)
+    for i in nb.prange(n_edge):  # pylint: disable=not-an-iterable
+        start = counts[i]
+        end = counts[i + 1]
+        ii[start:end] = i
+        indices = jj[start:end]
+        intersections = xy[start:end]
+        a = as_point(edge_coords[i, 0])
+        b = as_point(edge_coords[i, 1])
+        locate_segment(a, b, tree, indices, intersections, True)
+
+    return ii, jj, xy
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def edges_intersect_boxes(
+    bbox_coords: FloatArray,
+    vertices: FloatArray,
+    edges: IntArray,
+    indices_bbox: IntArray,
+    indices_edge: IntArray,
+) -> BoolArray:
+    n_shortlist = indices_bbox.size
+    intersects = np.empty(n_shortlist, dtype=np.bool_)
+    for i in nb.prange(n_shortlist):  # pylint: disable=not-an-iterable
+        box = as_box(bbox_coords[indices_bbox[i]])
+        edge = edges[indices_edge[i]]
+        a = as_point(vertices[edge[0]])
+        b = as_point(vertices[edge[1]])
+        if a.x == b.x and a.y == b.y:
+            # A segment of zero length is clipped as no intersection.
+            intersects[i] = box.xmin <= a.x <= box.xmax and box.ymin <= a.y <= box.ymax
+        else:
+            intersects[i], _, _ = cohen_sutherland_line_box_clip(a, b, box)
+    return intersects
+
+
+@nb.njit(inline="always")
+def nearest_edge(point: Point, tree: CellTreeData, max_distance_squared: float):
+    """
+    Branch and bound search: children are visited nearest first, and skipped
+    if their lower bound on the distance exceeds the nearest distance found so
+    far. The lower bound is the distance to the box formed by the splits above
+    a node, as in nearest_faces.
+    """
+    nearest = -1
+    nearest_squared = max_distance_squared
+    gap_x, gap_y = point_box_gaps(point, as_box(tree.bbox))
+    if gap_x * gap_x + gap_y * gap_y > nearest_squared:
+        return nearest, nearest_squared
+
+    stack = allocate_stack()
+    gap_x_stack = allocate_float_stack()
+    gap_y_stack = allocate_float_stack()
+    stack[0] = 0
+    gap_x_stack[0] = gap_x
+    gap_y_stack[0] = gap_y
+    size = 1
+
+    while size > 0:
+        gap_x, _ = pop(gap_x_stack, size)
+        gap_y, _ = pop(gap_y_stack, size)
+        node_index, size = pop(stack, size)
+        if gap_x * gap_x + gap_y * gap_y > nearest_squared:
+            continue
+
+        node = tree.nodes[node_index]
+        if node["child"] == LEAF:
+            for i in range(node["ptr"], node["ptr"] + node["size"]):
+                edge_index = tree.bb_indices[i]
+                box = as_box(tree.bb_coords[edge_index])
+                if point_box_distance_squared(point, box) > nearest_squared:
+                    continue
+                start, _ = face_range(tree, edge_index)
+                a = as_point(tree.vertices[tree.face_nodes[start]])
+                b = as_point(tree.vertices[tree.face_nodes[start + 1]])
+                distance_squared = point_segment_distance_squared(point, a, b)
+                if distance_squared <= nearest_squared:
+                    nearest = edge_index
+                    nearest_squared = distance_squared
+            continue
+
+        size = push_children_by_gap(
+            point, node, gap_x, gap_y, stack, gap_x_stack, gap_y_stack, size
+        )
+
+    return nearest, nearest_squared
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def locate_nearest_edges(
+    points: FloatArray,
+    tree: CellTreeData,
+    max_distance: float,
+):
+    n_points = len(points)
+    indices = np.empty(n_points, dtype=IntDType)
+    distances = np.empty(n_points, dtype=FloatDType)
+    max_distance_squared = max_distance * max_distance
+    for i in nb.prange(n_points):  # pylint: disable=not-an-iterable
+        point = as_point(points[i])
+        index, distance_squared = nearest_edge(point, tree, max_distance_squared)
+        indices[i] = index
+        distances[i] = np.sqrt(distance_squared) if index != -1 else np.nan
+    return indices, distances
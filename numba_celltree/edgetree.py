@@ -0,0 +1,229 @@
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from .celltree import (
+    bbox_tree,
+    cast_bboxes,
+    cast_edges,
+    cast_vertices,
+    check_build_arguments,
+)
+from .constants import (
+    MAX_N_FACE,
+    BoolArray,
+    CellTreeData,
+    FloatArray,
+    FloatDType,
+    IntArray,
+    IntDType,
+)
+from .creation import initialize
+from .edge_query import edges_intersect_boxes, locate_nearest_edges, locate_segments
+from .query import collect_node_bounds, locate_boxes, validate_node_bounds
+from .statistics import tree_statistics
+
+
+def cast_edge_nodes(edge_nodes: IntArray, n_vertex: int) -> IntArray:
+    edge_nodes = np.ascontiguousarray(edge_nodes, dtype=IntDType)
+    if edge_nodes.ndim != 2 or edge_nodes.shape[1] != 2:
+        raise ValueError("edge_nodes must have shape (n_edge, 2)")
+    n_edge = len(edge_nodes)
+    if n_edge > MAX_N_FACE:
+        raise ValueError(
+            f"edge_nodes contains {n_edge} edges. "
+            f"numba_celltree supports a maximum of {MAX_N_FACE} edges."
+        )
+    if ((edge_nodes < 0) | (edge_nodes >= n_vertex)).any():
+        raise ValueError("edge_nodes contains indices beyond the vertices")
+    return edge_nodes
+
+
+class EdgeTree2d:
+    """
+    Construct a tree from 2D vertices and an edge nodes indexing array, to
+    search for line segments, such as the edges of a mesh or the reaches of a
+    one dimensional network.
+
+    Parameters
+    ----------
+    vertices: ndarray of floats with shape ``(n_point, 2)``
+        Coordinates (x, y) of the vertices.
+    edge_nodes: ndarray of integers with shape ``(n_edge, 2)``
+        Index identifying for every edge the indices of its two vertices.
+    n_buckets: int, optional, default: 4
+        The number of "buckets" used in tree construction. Must be higher
+        or equal to 2. Values over 8 provide diminishing returns.
+    cells_per_leaf: int, optional, default: 2
+        The number of edges in the leaf nodes of the tree.
+    builder: str, optional, default: "sah"
+        The tree construction strategy, see :class:`CellTree2d`.
+    """
+
+    def __init__(
+        self,
+        vertices: FloatArray,
+        edge_nodes: IntArray,
+        n_buckets: int = 4,
+        cells_per_leaf: int = 2,
+        builder: str = "sah",
+    ):
+        check_build_arguments(n_buckets, cells_per_leaf, builder)
+        vertices = cast_vertices(vertices, copy=True)
+        edge_nodes = cast_edge_nodes(edge_nodes, len(vertices))
+        # The edges are stored as faces of two nodes.
+        face_nodes = edge_nodes.ravel()
+        face_offsets = np.arange(0, face_nodes.size + 1, 2, dtype=IntDType)
+        nodes, bb_indices, bb_coords = initialize(
+            vertices,
+            face_nodes,
+            face_offsets,
+            n_buckets,
+            cells_per_leaf,
+            builder=builder,
+        )
+        self.vertices = vertices
+        self.edge_nodes = edge_nodes
+        self.n_buckets = n_buckets
+        self.cells_per_leaf = cells_per_leaf
+        self.builder = builder
+        self.nodes = nodes
+        self.bb_indices = bb_indices
+        self.bb_coords = bb_coords
+        self.bbox = bbox_tree(bb_coords)
+        self.celltree_data = CellTreeData(
+            face_nodes,
+            face_offsets,
+            2,
+            self.vertices,
+            self.nodes,
+            self.bb_indices,
+            self.bb_coords,
+            self.bbox,
+            self.cells_per_leaf,
+            np.empty((0, 2), dtype=FloatDType),
+            np.empty(0, dtype=IntDType),
+        )
+
+    def locate_boxes(self, bbox_coords: FloatArray) -> Tuple[IntArray, IntArray]:
+        """
+        Finds the index of an edge intersecting with a bounding box. Edges
+        touching the boundary of the box are included.
+
+        Parameters
+        ----------
+        bbox_coords: ndarray of floats with shape ``(n_box, 4)``
+            Every row containing ``(xmin, xmax, ymin, ymax)``.
+
+        Returns
+        -------
+        bbox_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the bounding box.
+        tree_edge_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the edge.
+        """
+        bbox_coords = cast_bboxes(bbox_coords)
+        # The bounding box of a horizontal or vertical edge has zero size.
+        shortlist_i, shortlist_j = locate_boxes(bbox_coords, self.celltree_data, True)
+        intersects = edges_intersect_boxes(
+            bbox_coords, self.vertices, self.edge_nodes, shortlist_i, shortlist_j
+        )
+        return shortlist_i[intersects], shortlist_j[intersects]
+
+    def intersect_edges(
+        self, edge_coords: FloatArray
+    ) -> Tuple[IntArray, IntArray, FloatArray]:
+        """
+        Finds the index of an edge crossing another edge, and the point of
+        intersection. Edges touching at an end point intersect. For collinear
+        overlapping edges, the intersection is the point of the overlap
+        nearest to the start ``(x0, y0)`` of the edge.
+
+        Parameters
+        ----------
+        edge_coords: ndarray of floats with shape ``(n_edge, 2, 2)``
+            Every row containing ``((x0, y0), (x1, y1))``.
+
+        Returns
+        -------
+        edge_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the edge.
+        tree_edge_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the tree edge.
+        intersections: ndarray of floats with shape ``(n_found, 2)``
+            Coordinates (x, y) of the intersection.
+        """
+        edge_coords = cast_edges(edge_coords)
+        return locate_segments(edge_coords, self.celltree_data)
+
+    def locate_nearest_edges(
+        self, points: FloatArray, max_distance: float = np.inf
+    ) -> Tuple[IntArray, FloatArray]:
+        """
+        Finds the index of the edge nearest to a point.
+
+        Parameters
+        ----------
+        points: ndarray of floats with shape ``(n_point, 2)``
+        max_distance: float, optional, default: inf
+            Edges further away are not considered. A small value limits the
+            search, and speeds it up.
+
+        Returns
+        -------
+        tree_edge_indices: ndarray of integers with shape ``(n_point,)``
+            For every point, the index of the nearest edge. Points without an
+            edge within ``max_distance`` are marked with a value of ``-1``.
+        distances: ndarray of floats with shape ``(n_point,)``
+            For every point, the distance to the nearest edge; NaN if no edge
+            is found.
+        """
+        points = cast_vertices(points)
+        if max_distance < 0:
+            raise ValueError("max_distance must be >= 0")
+        return locate_nearest_edges(points, self.celltree_data, float(max_distance))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Compute statistics describing the quality of the tree. See
+        :meth:`CellTree2d.stats`; the leaf sizes count edges rather than
+        faces.
+
+        Returns
+        -------
+        stats: dict
+        """
+        return tree_statistics(
+            self.nodes,
+            self.bb_indices,
+            self.bb_coords,
+            {
+                "vertices": self.vertices,
+                "edge_nodes": self.edge_nodes,
+                "nodes": self.nodes,
+                "bb_indices": self.bb_indices,
+                "bb_coords": self.bb_coords,
+            },
+        )
+
+    @property
+    def node_bounds(self) -> FloatArray:
+        """
+        Return the bounds (xmin, xmax, ymin, ymax) for every node of the tree.
+        """
+        return collect_node_bounds(self.celltree_data)
+
+    def validate_node_bounds(self) -> BoolArray:
+        """
+        Traverse the tree. Check whether all children are contained in the bounding
+        box.
+
+        For the leaf nodes, check whether the bounding boxes are contained.
+
+        Returns
+        -------
+        node_validity: np.array of bool
+            For each node, whether all children are fully contained by its
+            bounds.
+        """
+        return validate_node_bounds(self.celltree_data, self.node_bounds)
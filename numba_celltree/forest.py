@@ -0,0 +1,440 @@
+"""
+A forest of cell trees: the mesh is split into spatial partitions, with a
+tree stored on disk for every partition. The partitions are loaded, memory
+mapped, only when a query requires them.
+
+The layout of the forest directory is:
+
+* ``forest.bin``: the bounding box of every partition, and the indices of the
+  faces of the mesh, in the order of the partitions.
+* ``partition_{k}.bin``: the cell tree of partition k, see
+  :meth:`CellTree2d.save`.
+"""
+import os
+import pathlib
+from collections import OrderedDict
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from .aabbtree import AABBTree2d
+from .celltree import (
+    CellTree2d,
+    cast_bboxes,
+    cast_edges,
+    cast_faces,
+    cast_vertices,
+    check_build_arguments,
+)
+from .constants import FloatArray, FloatDType, IntArray, IntDType
+from .geometry_utils import build_bboxes, faces_to_csr
+from .serialization import PathLike, load_arrays, save_arrays
+
+FOREST_FILE = "forest.bin"
+
+
+def partition_path(path: pathlib.Path, k: int) -> pathlib.Path:
+    return path / f"partition_{k}.bin"
+
+
+def face_centers(
+    vertices: FloatArray, faces: IntArray, fill_value: int, chunk_size: int
+) -> FloatArray:
+    """
+    Compute the centers of the bounding boxes of the faces, a chunk of faces
+    at a time.
+    """
+    n_face = len(faces)
+    centers = np.empty((n_face, 2), dtype=FloatDType)
+    for start in range(0, n_face, chunk_size):
+        end = min(start + chunk_size, n_face)
+        chunk = cast_faces(faces[start:end], fill_value)
+        bb_coords = build_bboxes(*faces_to_csr(chunk), vertices)
+        centers[start:end, 0] = 0.5 * (bb_coords[:, 0] + bb_coords[:, 1])
+        centers[start:end, 1] = 0.5 * (bb_coords[:, 2] + bb_coords[:, 3])
+    return centers
+
+
+def partition_faces(centers: FloatArray, max_size: int) -> List[IntArray]:
+    """
+    Split the faces at the median of their centers, along the dimension of
+    largest extent, until every partition contains at most max_size faces.
+    The partitions are returned in depth-first order, so that consecutive
+    partitions are near each other.
+    """
+    stack = [np.arange(len(centers), dtype=IntDType)]
+    partitions = []
+    while stack:
+        indices = stack.pop()
+        if indices.size <= max_size:
+            partitions.append(np.sort(indices))
+            continue
+        coords = centers[indices]
+        dim = int(np.argmax(np.ptp(coords, axis=0)))
+        half = indices.size // 2
+        order = np.argpartition(coords[:, dim], half)
+        stack.append(indices[order[half:]])
+        stack.append(indices[order[:half]])
+    return partitions
+
+
+def group_by_partition(
+    query_indices: IntArray, partitions: IntArray
+) -> Iterator[Tuple[int, IntArray]]:
+    """
+    Yield for every partition the indices of the queries routed to it.
+    """
+    order = np.argsort(partitions, kind="stable")
+    query_indices = query_indices[order]
+    partitions = partitions[order]
+    unique, starts = np.unique(partitions, return_index=True)
+    for k, indices in zip(unique, np.split(query_indices, starts[1:])):
+        yield int(k), indices
+
+
+def edge_bboxes(edge_coords: FloatArray) -> FloatArray:
+    x = edge_coords[..., 0]
+    y = edge_coords[..., 1]
+    return np.column_stack([x.min(axis=1), x.max(axis=1), y.min(axis=1), y.max(axis=1)])
+
+
+def sort_by_query(*arrays: List[np.ndarray]) -> Tuple[np.ndarray, ...]:
+    """
+    Concatenate the per partition results, and order them by the index of
+    the query (the first array).
+    """
+    concatenated = [np.concatenate(a) for a in arrays]
+    order = np.argsort(concatenated[0], kind="stable")
+    return tuple(a[order] for a in concatenated)
+
+
+def empty_results(*shapes: Tuple[int, ...]) -> Tuple[List[np.ndarray], ...]:
+    """
+    Lists to collect the per partition results, containing an empty array so
+    that the result is well defined when no partition is queried.
+    """
+    ii = [np.empty(0, dtype=IntDType)]
+    jj = [np.empty(0, dtype=IntDType)]
+    rest = tuple([np.empty((0,) + shape, dtype=FloatDType)] for shape in shapes)
+    return (ii, jj) + rest
+
+
+class CellTreeForest:
+    """
+    Open a forest of cell trees, built by :meth:`CellTreeForest.build`.
+
+    The mesh is split into spatial partitions, and a :class:`CellTree2d` is
+    stored for every partition. A small tree of the bounding boxes of the
+    partitions routes the queries to the partitions. A partition is loaded,
+    memory mapped, when a query first requires it; at most ``max_resident``
+    partitions are kept loaded, the least recently used partition is dropped
+    first.
+
+    The queries return the same results as the queries of a single
+    :class:`CellTree2d` of the entire mesh, with the face indices of the
+    entire mesh.
+
+    Parameters
+    ----------
+    path: str or os.PathLike
+        The directory of the forest.
+    max_resident: int, optional, default: 8
+        The maximum number of partitions kept loaded.
+    """
+
+    def __init__(self, path: PathLike, max_resident: int = 8):
+        if max_resident < 1:
+            raise ValueError("max_resident must be >= 1")
+        self.path = pathlib.Path(path)
+        arrays, _ = load_arrays(self.path / FOREST_FILE, mmap=True)
+        if "partition_bboxes" not in arrays:
+            raise ValueError(f"{self.path} does not contain a forest")
+        self.partition_bboxes = np.array(arrays["partition_bboxes"])
+        self.partition_offsets = np.array(arrays["partition_offsets"])
+        # Memory mapped: the size of the mesh.
+        self.face_indices = arrays["face_indices"]
+        self.max_resident = max_resident
+        self._top = AABBTree2d(self.partition_bboxes, cells_per_leaf=1)
+        self._resident = OrderedDict()
+
+    @classmethod
+    def build(
+        cls,
+        path: PathLike,
+        vertices: FloatArray,
+        faces: IntArray,
+        fill_value: int,
+        max_faces_per_partition: int = 1_000_000,
+        n_buckets: int = 4,
+        cells_per_leaf: int = 2,
+        builder: str = "sah",
+        pack_polygons: bool = False,
+        max_resident: int = 8,
+    ) -> "CellTreeForest":
+        """
+        Partition the mesh, build and store the tree of every partition, and
+        open the forest.
+
+        Only the faces of a single partition are held in memory at a time:
+        ``vertices`` and ``faces`` may be memory mapped arrays, e.g. opened
+        with ``np.load(..., mmap_mode="r")``.
+
+        Parameters
+        ----------
+        path: str or os.PathLike
+            The directory of the forest. Created if it does not exist.
+        vertices: ndarray of floats with shape ``(n_point, 2)``
+            Corner coordinates (x, y) of the cells.
+        faces: ndarray of integers with shape ``(n_face, n_max_vert)``
+            Index identifying for every face the indices of its corner nodes.
+            If a face has less corner nodes than ``n_max_vert``, its last
+            indices should be equal to ``fill_value``.
+        fill_value: int
+            Fill value marking empty nodes in ``faces``.
+        max_faces_per_partition: int, optional, default: 1000000
+            The mesh is split until every partition contains at most this
+            number of faces.
+        max_resident: int, optional, default: 8
+            The maximum number of partitions kept loaded.
+
+        The other parameters are those of :class:`CellTree2d`, and apply to
+        the tree of every partition.
+
+        Returns
+        -------
+        forest: CellTreeForest
+        """
+        check_build_arguments(n_buckets, cells_per_leaf, builder)
+        if max_faces_per_partition < 1:
+            raise ValueError("max_faces_per_partition must be >= 1")
+        vertices = cast_vertices(vertices)
+        if np.ndim(faces) != 2:
+            raise ValueError("faces must have shape (n_face, n_max_vert)")
+        if len(faces) == 0:
+            raise ValueError("faces must contain at least one face")
+        path = pathlib.Path(path)
+        os.makedirs(path, exist_ok=True)
+
+        centers = face_centers(vertices, faces, fill_value, max_faces_per_partition)
+        partitions = partition_faces(centers, max_faces_per_partition)
+        del centers
+
+        n_partition = len(partitions)
+        partition_bboxes = np.empty((n_partition, 4), dtype=FloatDType)
+        partition_offsets = np.zeros(n_partition + 1, dtype=IntDType)
+        for k, indices in enumerate(partitions):
+            face_nodes, face_offsets = faces_to_csr(
+                cast_faces(faces[indices], fill_value)
+            )
+            # Number the vertices of the partition.
+            used, local_nodes = np.unique(face_nodes, return_inverse=True)
+            tree = CellTree2d.from_csr(
+                vertices[used],
+                local_nodes.astype(IntDType),
+                face_offsets,
+                n_buckets=n_buckets,
+                cells_per_leaf=cells_per_leaf,
+                builder=builder,
+                pack_polygons=pack_polygons,
+            )
+            tree.save(partition_path(path, k))
+            partition_bboxes[k] = tree.bbox
+            partition_offsets[k + 1] = partition_offsets[k] + indices.size
+
+        save_arrays(
+            path / FOREST_FILE,
+            {
+                "partition_bboxes": partition_bboxes,
+                "partition_offsets": partition_offsets,
+                "face_indices": np.concatenate(partitions),
+            },
+            {},
+        )
+        return cls(path, max_resident)
+
+    @property
+    def n_partition(self) -> int:
+        return len(self.partition_bboxes)
+
+    @property
+    def n_face(self) -> int:
+        return int(self.partition_offsets[-1])
+
+    @property
+    def resident_partitions(self) -> Tuple[int, ...]:
+        """
+        The partitions currently loaded, from least to most recently used.
+        """
+        return tuple(self._resident)
+
+    def partition(self, k: int) -> CellTree2d:
+        """
+        Return the tree of partition k, loading it if required. Its face
+        indices are local to the partition.
+        """
+        tree = self._resident.pop(k, None)
+        if tree is None:
+            tree = CellTree2d.load(partition_path(self.path, k), mmap=True)
+            if len(self._resident) >= self.max_resident:
+                self._resident.popitem(last=False)
+        self._resident[k] = tree
+        return tree
+
+    def _global_indices(self, k: int, local_indices: IntArray) -> IntArray:
+        start = self.partition_offsets[k]
+        return np.asarray(self.face_indices[start + local_indices], dtype=IntDType)
+
+    def _route(self, bbox_coords: FloatArray) -> Iterator[Tuple[int, IntArray]]:
+        i, k = self._top.locate_boxes(bbox_coords)
+        return group_by_partition(i, k)
+
+    def locate_points(self, points: FloatArray) -> IntArray:
+        """
+        Finds the index of a face that contains a point.
+
+        Parameters
+        ----------
+        points: ndarray of floats with shape ``(n_point, 2)``
+
+        Returns
+        -------
+        tree_face_indices: ndarray of integers with shape ``(n_point,)``
+            For every point, the index of the face it falls in. Points not
+            falling in any faces are marked with a value of ``-1``.
+        """
+        points = cast_vertices(points)
+        result = np.full(len(points), -1, dtype=IntDType)
+        i, k = self._top.locate_points(points)
+        for partition, indices in group_by_partition(i, k):
+            # A point on the boundary of two partitions may be found in both.
+            indices = indices[result[indices] == -1]
+            if indices.size == 0:
+                continue
+            local = self.partition(partition).locate_points(points[indices])
+            found = local != -1
+            result[indices[found]] = self._global_indices(partition, local[found])
+        return result
+
+    def locate_boxes(self, bbox_coords: FloatArray) -> Tuple[IntArray, IntArray]:
+        """
+        Finds the index of a face intersecting with a bounding box.
+
+        Parameters
+        ----------
+        bbox_coords: ndarray of floats with shape ``(n_box, 4)``
+            Every row containing ``(xmin, xmax, ymin, ymax)``.
+
+        Returns
+        -------
+        bbox_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the bounding box.
+        tree_face_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the face.
+        """
+        bbox_coords = cast_bboxes(bbox_coords)
+        ii, jj = empty_results()
+        for partition, indices in self._route(bbox_coords):
+            i, j = self.partition(partition).locate_boxes(bbox_coords[indices])
+            ii.append(indices[i])
+            jj.append(self._global_indices(partition, j))
+        return sort_by_query(ii, jj)
+
+    def intersect_boxes(
+        self, bbox_coords: FloatArray
+    ) -> Tuple[IntArray, IntArray, FloatArray]:
+        """
+        Finds the index of a box intersecting with a face, and the area
+        of intersection.
+
+        Parameters
+        ----------
+        bbox_coords: ndarray of floats with shape ``(n_box, 4)``
+            Every row containing ``(xmin, xmax, ymin, ymax)``.
+
+        Returns
+        -------
+        bbox_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the bounding box.
+        tree_face_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the tree faces.
+        area: ndarray of floats with shape ``(n_found,)``
+            Area of intersection between the two intersecting faces.
+        """
+        bbox_coords = cast_bboxes(bbox_coords)
+        ii, jj, areas = empty_results(())
+        for partition, indices in self._route(bbox_coords):
+            i, j, area = self.partition(partition).intersect_boxes(bbox_coords[indices])
+            ii.append(indices[i])
+            jj.append(self._global_indices(partition, j))
+            areas.append(area)
+        return sort_by_query(ii, jj, areas)
+
+    def intersect_faces(
+        self, vertices: FloatArray, faces: IntArray, fill_value: int
+    ) -> Tuple[IntArray, IntArray, FloatArray]:
+        """
+        Finds the index of a face intersecting with another face, and the area
+        of intersection.
+
+        Parameters
+        ----------
+        vertices: ndarray of floats with shape ``(n_point, 2)``
+            Corner coordinates (x, y) of the cells.
+        faces: ndarray of integers with shape ``(n_face, n_max_vert)``
+            Index identifying for every face the indices of its corner nodes.
+            If a face has less corner nodes than n_max_vert, its last indices
+            should be equal to ``fill_value``.
+        fill_value: int
+            Fill value marking empty nodes in ``faces``.
+
+        Returns
+        -------
+        face_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the faces.
+        tree_face_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the tree faces.
+        area: ndarray of floats with shape ``(n_found,)``
+            Area of intersection between the two intersecting faces.
+        """
+        vertices = cast_vertices(vertices)
+        faces = cast_faces(faces, fill_value)
+        bbox_coords = build_bboxes(*faces_to_csr(faces), vertices)
+        ii, jj, areas = empty_results(())
+        for partition, indices in self._route(bbox_coords):
+            i, j, area = self.partition(partition).intersect_faces(
+                vertices, faces[indices], -1
+            )
+            ii.append(indices[i])
+            jj.append(self._global_indices(partition, j))
+            areas.append(area)
+        return sort_by_query(ii, jj, areas)
+
+    def intersect_edges(
+        self, edge_coords: FloatArray
+    ) -> Tuple[IntArray, IntArray, FloatArray]:
+        """
+        Finds the index of a face intersecting with an edge.
+
+        Parameters
+        ----------
+        edge_coords: ndarray of floats with shape ``(n_edge, 2, 2)``
+            Every row containing ``((x0, y0), (x1, y1))``.
+
+        Returns
+        -------
+        edge_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the edge.
+        tree_face_indices: ndarray of integers with shape ``(n_found,)``
+            Indices of the face.
+        intersection_edges: ndarray of floats with shape ``(n_found, 2, 2)``
+            The part of the edge inside of the face: every row containing
+            ``((x0, y0), (x1, y1))``.
+        """
+        edge_coords = cast_edges(edge_coords)
+        ii, jj, segments = empty_results((2, 2))
+        for partition, indices in self._route(edge_bboxes(edge_coords)):
+            i, j, xy = self.partition(partition).intersect_edges(edge_coords[indices])
+            ii.append(indices[i])
+            jj.append(self._global_indices(partition, j))
+            segments.append(xy)
+        return sort_by_query(ii, jj, segments)
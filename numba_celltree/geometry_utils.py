@@ -5,6 +5,7 @@ import numpy as np
 
 from .constants import (
     FILL_VALUE,
+    MAX_N_VERTEX,
     NDIM,
     PARALLEL,
     TOLERANCE_ON_EDGE,
@@ -12,6 +13,7 @@ from .constants import (
     FloatArray,
     FloatDType,
     IntArray,
+    IntDType,
     Point,
     Triangle,
     Vector,
@@ -184,6 +186,22 @@ def boxes_intersect(a: Box, b: Box) -> bool:
     return a.xmin < b.xmax and b.xmin < a.xmax and a.ymin < b.ymax and b.ymin < a.ymax
 
 
+@nb.njit(inline="always")
+def boxes_touch(a: Box, b: Box) -> bool:
+    """
+    Like boxes_intersect, but boxes sharing only an edge or a corner are
+    considered intersecting as well.
+
+    Parameters
+    ----------
+    a: (xmin, xmax, ymin, ymax)
+    b: (xmin, xmax, ymin, ymax)
+    """
+    return (
+        a.xmin <= b.xmax and b.xmin <= a.xmax and a.ymin <= b.ymax and b.ymin <= a.ymax
+    )
+
+
 @nb.njit(inline="always")
 def box_contained(a: Box, b: Box) -> bool:
     """
@@ -199,19 +217,58 @@ def box_contained(a: Box, b: Box) -> bool:
     )
 
 
+@nb.njit(inline="always")
+def get_face(face_nodes: IntArray, face_offsets: IntArray, i: int) -> IntArray:
+    return face_nodes[face_offsets[i] : face_offsets[i + 1]]
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def faces_to_csr(faces: IntArray) -> Tuple[IntArray, IntArray]:
+    """
+    Convert faces padded with FILL_VALUE to the compressed sparse row layout:
+    the nodes of all faces in a single array, and for every face the offset
+    of its first node.
+    """
+    n_face = len(faces)
+    face_offsets = np.empty(n_face + 1, dtype=IntDType)
+    face_offsets[0] = 0
+    for i in range(n_face):
+        face_offsets[i + 1] = face_offsets[i] + polygon_length(faces[i])
+
+    face_nodes = np.empty(face_offsets[n_face], dtype=IntDType)
+    for i in nb.prange(n_face):  # pylint: disable=not-an-iterable
+        start = face_offsets[i]
+        for j in range(face_offsets[i + 1] - start):
+            face_nodes[start + j] = faces[i, j]
+    return face_nodes, face_offsets
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def csr_to_faces(
+    face_nodes: IntArray, face_offsets: IntArray, n_max_vert: int
+) -> IntArray:
+    """
+    Convert faces in the compressed sparse row layout to faces padded with
+    FILL_VALUE, with n_max_vert columns.
+    """
+    n_face = len(face_offsets) - 1
+    faces = np.full((n_face, n_max_vert), FILL_VALUE, dtype=IntDType)
+    for i in nb.prange(n_face):  # pylint: disable=not-an-iterable
+        face = get_face(face_nodes, face_offsets, i)
+        for j in range(len(face)):
+            faces[i, j] = face[j]
+    return faces
+
+
 @nb.njit(inline="always")
 def bounding_box(
     polygon: IntArray, vertices: FloatArray
 ) -> Tuple[float, float, float, float]:
-    max_n_verts = len(polygon)
     first_vertex = vertices[polygon[0]]
     xmin = xmax = first_vertex[0]
     ymin = ymax = first_vertex[1]
-    for i in range(1, max_n_verts):
-        index = polygon[i]
-        if index == FILL_VALUE:
-            break
-        vertex = vertices[index]
+    for i in range(1, len(polygon)):
+        vertex = vertices[polygon[i]]
         x = vertex[0]
         y = vertex[1]
         xmin = min(xmin, x)
@@ -221,17 +278,18 @@ def bounding_box(
     return (xmin, xmax, ymin, ymax)
 
 
-@nb.njit(cache=True)
+@nb.njit(parallel=PARALLEL, cache=True)
 def build_bboxes(
-    faces: IntArray,
+    face_nodes: IntArray,
+    face_offsets: IntArray,
     vertices: FloatArray,
 ) -> Tuple[FloatArray, IntArray]:
     # Make room for the bounding box of every polygon.
-    n_polys = len(faces)
+    n_polys = len(face_offsets) - 1
     bbox_coords = np.empty((n_polys, NDIM * 2), FloatDType)
 
     for i in nb.prange(n_polys):  # pylint: disable=not-an-iterable
-        polygon = faces[i]
+        polygon = get_face(face_nodes, face_offsets, i)
         bbox_coords[i] = bounding_box(polygon, vertices)
 
     return bbox_coords
@@ -239,8 +297,12 @@ def build_bboxes(
 
 @nb.njit(inline="always")
 def copy_vertices(vertices: FloatArray, face: IntArray) -> FloatArray:
-    length = polygon_length(face)
-    out = allocate_polygon()
+    length = len(face)
+    if length > MAX_N_VERTEX:
+        # Too large for the stack allocated array.
+        out = np.empty((length, NDIM), dtype=FloatDType)
+    else:
+        out = allocate_polygon()
     for i in range(length):
         v = vertices[face[i]]
         out[i, 0] = v[0]
@@ -252,7 +314,7 @@ def copy_vertices(vertices: FloatArray, face: IntArray) -> FloatArray:
 def copy_vertices_into(
     vertices: FloatArray, face: IntArray, out: FloatArray
 ) -> FloatArray:
-    length = polygon_length(face)
+    length = len(face)
     for i in range(length):
         v = vertices[face[i]]
         out[i, 0] = v[0]
@@ -279,6 +341,57 @@ def point_inside_box(a: Point, box: Box):
     return box.xmin < a.x and a.x < box.xmax and box.ymin < a.y and a.y < box.ymax
 
 
+@nb.njit(inline="always")
+def point_box_gaps(p: Point, box: Box) -> Tuple[float, float]:
+    dx = max(box.xmin - p.x, 0.0, p.x - box.xmax)
+    dy = max(box.ymin - p.y, 0.0, p.y - box.ymax)
+    return dx, dy
+
+
+@nb.njit(inline="always")
+def point_box_distance_squared(p: Point, box: Box) -> float:
+    dx, dy = point_box_gaps(p, box)
+    return dx * dx + dy * dy
+
+
+@nb.njit(inline="always")
+def point_segment_distance_squared(p: Point, a: Point, b: Point) -> float:
+    V = to_vector(a, b)
+    U = to_vector(a, p)
+    length_squared = dot_product(V, V)
+    t = 0.0
+    if length_squared > 0.0:
+        t = min(max(dot_product(U, V) / length_squared, 0.0), 1.0)
+    dx = p.x - (a.x + t * V.x)
+    dy = p.y - (a.y + t * V.y)
+    return dx * dx + dy * dy
+
+
+@nb.njit(inline="always")
+def point_polygon_boundary_distance_squared(p: Point, poly: FloatArray) -> float:
+    """
+    Squared distance from the point to the nearest edge of the polygon.
+    """
+    length = len(poly)
+    a = as_point(poly[length - 1])
+    nearest = np.inf
+    for i in range(length):
+        b = as_point(poly[i])
+        nearest = min(nearest, point_segment_distance_squared(p, a, b))
+        a = b
+    return nearest
+
+
+@nb.njit(inline="always")
+def point_polygon_distance_squared(p: Point, poly: FloatArray) -> float:
+    """
+    Squared distance from the point to the polygon: zero inside of it.
+    """
+    if point_in_polygon(p, poly):
+        return 0.0
+    return point_polygon_boundary_distance_squared(p, poly)
+
+
 @nb.njit(inline="always")
 def flip(face: IntArray, length: int) -> None:
     end = length - 1
@@ -289,11 +402,13 @@ def flip(face: IntArray, length: int) -> None:
 
 
 @nb.njit(parallel=PARALLEL, cache=True)
-def counter_clockwise(vertices: FloatArray, faces: IntArray) -> None:
-    n_face = len(faces)
+def counter_clockwise(
+    vertices: FloatArray, face_nodes: IntArray, face_offsets: IntArray
+) -> None:
+    n_face = len(face_offsets) - 1
     for i_face in nb.prange(n_face):
-        face = faces[i_face]
-        length = polygon_length(face)
+        face = get_face(face_nodes, face_offsets, i_face)
+        length = len(face)
         a = as_point(vertices[face[length - 2]])
         b = as_point(vertices[face[length - 1]])
         for i in range(length):
@@ -309,3 +424,35 @@ def counter_clockwise(vertices: FloatArray, faces: IntArray) -> None:
             else:
                 break
     return
+
+
+@nb.njit(inline="always")
+def is_clockwise(vertices: FloatArray, face: IntArray) -> bool:
+    # Find the first corner that is not collinear, like counter_clockwise.
+    length = len(face)
+    a = as_point(vertices[face[length - 2]])
+    b = as_point(vertices[face[length - 1]])
+    for i in range(length):
+        c = as_point(vertices[face[i]])
+        product = cross_product(to_vector(a, b), to_vector(a, c))
+        if product == 0:
+            a = b
+            b = c
+        else:
+            return product < 0
+    return False
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def is_counter_clockwise(
+    vertices: FloatArray, face_nodes: IntArray, face_offsets: IntArray
+) -> bool:
+    """
+    Check whether all faces are counter-clockwise, without modifying them.
+    """
+    n_face = len(face_offsets) - 1
+    n_clockwise = 0
+    for i_face in nb.prange(n_face):
+        if is_clockwise(vertices, get_face(face_nodes, face_offsets, i_face)):
+            n_clockwise += 1
+    return n_clockwise == 0
@@ -0,0 +1,243 @@
+"""
+Linear bounding volume hierarchy (LBVH) construction.
+
+The bounding boxes are ordered along a Morton (Z-order) curve through their
+centroids, with a parallel radix sort. Every node then covers a contiguous
+range of the sorted bounding boxes, so splitting a node only requires
+choosing an index in its range: no bounding boxes are moved. The bounds of
+the nodes (Lmax, Rmin) are computed afterwards, bottom-up.
+
+See:
+
+Karras, T. (2012). Maximizing parallelism in the construction of BVHs,
+octrees, and k-d trees. Proceedings of the Fourth ACM SIGGRAPH/Eurographics
+conference on High-Performance Graphics, 33-37.
+"""
+import numba as nb
+import numpy as np
+
+from .constants import (
+    MAX_TREE_DEPTH,
+    PARALLEL,
+    FloatArray,
+    IntArray,
+    IntDType,
+    NodeArray,
+)
+
+# Number of bits per dimension: the codes of both dimensions are interleaved
+# into a single non-negative 64-bit integer.
+MORTON_BITS = 31
+# Number of bits per dimension for ordering query points: the radix sort skips
+# the passes over the (zero) high bits.
+POINT_MORTON_BITS = 16
+RADIX_BITS = 8
+N_RADIX = 1 << RADIX_BITS
+
+
+@nb.njit(inline="always")
+def spread_bits(v: int) -> int:
+    """
+    Insert a zero bit before every bit of v.
+    """
+    v &= 0x7FFFFFFF
+    v = (v | (v << 16)) & 0x0000FFFF0000FFFF
+    v = (v | (v << 8)) & 0x00FF00FF00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v << 2)) & 0x3333333333333333
+    v = (v | (v << 1)) & 0x5555555555555555
+    return v
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def morton_codes(bb_coords: FloatArray, bb_indices: IntArray) -> IntArray:
+    """
+    Compute the Morton code of the centroid of every bounding box. The x bits
+    are stored in the even, the y bits in the odd bit positions.
+    """
+    n = bb_indices.size
+    codes = np.empty(n, dtype=IntDType)
+    if n == 0:
+        return codes
+    xmin = np.inf
+    xmax = -np.inf
+    ymin = np.inf
+    ymax = -np.inf
+    for i in range(n):
+        box = bb_coords[bb_indices[i]]
+        x = 0.5 * (box[0] + box[1])
+        y = 0.5 * (box[2] + box[3])
+        xmin = min(xmin, x)
+        xmax = max(xmax, x)
+        ymin = min(ymin, y)
+        ymax = max(ymax, y)
+
+    scale = float((1 << MORTON_BITS) - 1)
+    dx = scale / (xmax - xmin) if xmax > xmin else 0.0
+    dy = scale / (ymax - ymin) if ymax > ymin else 0.0
+    for i in nb.prange(n):  # pylint: disable=not-an-iterable
+        box = bb_coords[bb_indices[i]]
+        x = int((0.5 * (box[0] + box[1]) - xmin) * dx)
+        y = int((0.5 * (box[2] + box[3]) - ymin) * dy)
+        codes[i] = spread_bits(x) | (spread_bits(y) << 1)
+    return codes
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def point_morton_codes(points: FloatArray, bbox: FloatArray) -> IntArray:
+    """
+    Compute the Morton code of every point, relative to the bounding box
+    (xmin, xmax, ymin, ymax) of the tree. Points outside of the bounding box
+    are clamped to it.
+    """
+    n = len(points)
+    codes = np.empty(n, dtype=IntDType)
+    scale = float((1 << POINT_MORTON_BITS) - 1)
+    dx = scale / (bbox[1] - bbox[0]) if bbox[1] > bbox[0] else 0.0
+    dy = scale / (bbox[3] - bbox[2]) if bbox[3] > bbox[2] else 0.0
+    for i in nb.prange(n):  # pylint: disable=not-an-iterable
+        x = min(max((points[i, 0] - bbox[0]) * dx, 0.0), scale)
+        y = min(max((points[i, 1] - bbox[2]) * dy, 0.0), scale)
+        codes[i] = spread_bits(int(x)) | (spread_bits(int(y)) << 1)
+    return codes
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def radix_sort(keys: IntArray, values: IntArray, n_chunks: int):
+    """
+    Sort the non-negative keys, and the values alongside, with a least
+    significant digit radix sort.
+
+    Every pass counts the digits per chunk of the keys in parallel, computes
+    the location of every chunk's digits serially, then scatters the chunks in
+    parallel. Passes in which all keys share the same digit are skipped.
+
+    Returns the sorted copies of keys and values.
+    """
+    n = keys.size
+    keys = keys.copy()
+    values = values.copy()
+    keys_out = np.empty_like(keys)
+    values_out = np.empty_like(values)
+    chunk_size = max(1, -(-n // n_chunks))
+    counts = np.empty((n_chunks, N_RADIX), dtype=IntDType)
+
+    for shift in range(0, 64, RADIX_BITS):
+        for c in nb.prange(n_chunks):  # pylint: disable=not-an-iterable
+            counts[c, :] = 0
+            for i in range(c * chunk_size, min(n, (c + 1) * chunk_size)):
+                counts[c, (keys[i] >> shift) & (N_RADIX - 1)] += 1
+
+        # Turn the counts into the insertion point per chunk and digit.
+        skip = False
+        total = 0
+        for d in range(N_RADIX):
+            start = total
+            for c in range(n_chunks):
+                count = counts[c, d]
+                counts[c, d] = total
+                total += count
+            if total - start == n:
+                skip = True
+                break
+        if skip:
+            continue
+
+        for c in nb.prange(n_chunks):  # pylint: disable=not-an-iterable
+            for i in range(c * chunk_size, min(n, (c + 1) * chunk_size)):
+                d = (keys[i] >> shift) & (N_RADIX - 1)
+                j = counts[c, d]
+                keys_out[j] = keys[i]
+                values_out[j] = values[i]
+                counts[c, d] = j + 1
+
+        keys, keys_out = keys_out, keys
+        values, values_out = values_out, values
+
+    return keys, values
+
+
+def morton_order(points: FloatArray, bbox: FloatArray) -> IntArray:
+    """
+    Return the indices that order the points along a Morton curve.
+    """
+    n_threads = nb.get_num_threads()
+    indices = np.arange(len(points), dtype=IntDType)
+    _, order = radix_sort(point_morton_codes(points, bbox), indices, n_threads)
+    return order
+
+
+@nb.njit(inline="always")
+def highest_bit(v: int) -> int:
+    position = -1
+    while v > 0:
+        v >>= 1
+        position += 1
+    return position
+
+
+@nb.njit(inline="always")
+def required_depth(size: int, cells_per_leaf: int) -> int:
+    """
+    Minimum depth of a tree with leaves of at most cells_per_leaf cells.
+    """
+    depth = 0
+    capacity = cells_per_leaf
+    while capacity < size:
+        capacity *= 2
+        depth += 1
+    return depth
+
+
+@nb.njit(cache=True)
+def morton_split(
+    nodes: NodeArray,
+    root_index: int,
+    codes: IntArray,
+    cells_per_leaf: int,
+    depth: int,
+) -> int:
+    """
+    Split a single node at the highest bit in which the Morton codes of its
+    range of sorted bounding boxes differ. The split dimension follows from
+    the position of the bit.
+
+    Such splits may result in a deep tree, for meshes with local refinement.
+    The traversal stacks hold MAX_TREE_DEPTH nodes: if the larger child would
+    not fit in the depth that remains, or if all codes are equal, the node is
+    split in the middle of its range instead.
+
+    Only this node is written to. Lmax and Rmin are not set.
+
+    Returns
+    -------
+    right_index: int
+        Index into bb_indices where the right child starts, or -1 if the
+        node is a leaf.
+    """
+    ptr = nodes[root_index]["ptr"]
+    size = nodes[root_index]["size"]
+    if size <= cells_per_leaf:
+        return -1
+    end = ptr + size
+    middle = ptr + size // 2
+    bit = highest_bit(codes[ptr] ^ codes[end - 1])
+    if bit < 0:
+        return middle
+
+    # Binary search for the first code with the bit set.
+    lower = ptr
+    upper = end - 1
+    while lower < upper:
+        i = (lower + upper) // 2
+        if (codes[i] >> bit) & 1:
+            upper = i
+        else:
+            lower = i + 1
+
+    remaining = MAX_TREE_DEPTH - 1 - (depth + 1)
+    larger = max(lower - ptr, end - lower)
+    if required_depth(larger, cells_per_leaf) > remaining:
+        return middle
+    nodes[root_index]["dim"] = (bit & 1) == 1
+    return lower
@@ -1,9 +1,16 @@
+from typing import Tuple
+
 import numba as nb
 import numpy as np
 
 from .algorithms import cohen_sutherland_line_box_clip, cyrus_beck_line_polygon_clip
 from .constants import (
+    COUNT_BLOCK_SIZE,
+    LEAF,
+    MAX_WALK_STEPS,
     PARALLEL,
+    QUERY_CHUNK_SIZE,
+    SINGLE_PASS_CAPACITY,
     BoolArray,
     CellTreeData,
     FloatArray,
@@ -14,15 +21,64 @@ from .constants import (
 from .geometry_utils import (
     Box,
     Point,
+    Vector,
     as_box,
     as_point,
     box_contained,
     boxes_intersect,
+    boxes_touch,
+    copy_vertices,
     copy_vertices_into,
+    cross_product,
+    point_box_distance_squared,
+    point_box_gaps,
     point_in_polygon,
+    point_polygon_distance_squared,
     to_vector,
 )
-from .utils import allocate_polygon, allocate_stack, pop, push
+from .utils import (
+    allocate_float_stack,
+    allocate_polygon,
+    allocate_stack,
+    pop,
+    push,
+)
+
+
+@nb.njit(inline="always")
+def face_range(tree: CellTreeData, i: int) -> Tuple[int, int]:
+    """
+    Return the offset into face_nodes and the number of nodes of face i.
+    """
+    if tree.face_stride > 0:
+        return i * tree.face_stride, tree.face_stride
+    start = tree.face_offsets[i]
+    return start, tree.face_offsets[i + 1] - start
+
+
+@nb.njit(inline="always")
+def leaf_polygon(
+    tree: CellTreeData, i: int, bbox_index: int, work_array: FloatArray
+) -> FloatArray:
+    """
+    Return the polygon of entry i of bb_indices: a view of the packed
+    coordinates if present, otherwise a copy into the (stack allocated) work
+    array, or into a heap allocated array if the face does not fit.
+
+    The packed coordinates of entry i start at polygon_offsets[i]: after
+    inserting and removing faces, they are no longer in the order of the
+    entries.
+    """
+    start, length = face_range(tree, bbox_index)
+    if tree.polygon_offsets.size > 0:
+        packed_start = tree.polygon_offsets[i]
+        return tree.polygon_coords[packed_start : packed_start + length]
+    # Make sure polygons to test is contiguous (stack allocated) array
+    # This saves about 40-50% runtime
+    face = tree.face_nodes[start : start + length]
+    if length > len(work_array):
+        return copy_vertices(tree.vertices, face)
+    return copy_vertices_into(tree.vertices, face, work_array)
 
 
 # Inlining saves about 15% runtime
@@ -37,23 +93,21 @@ def locate_point(point: Point, tree: CellTreeData):
     while size > 0:
         node_index, size = pop(stack, size)
         node = tree.nodes[node_index]
+        child = node["child"]
 
         # Check if it's a leaf
-        if node["child"] == -1:
+        if child == LEAF:
             for i in range(node["ptr"], node["ptr"] + node["size"]):
                 bbox_index = tree.bb_indices[i]
-                face = tree.faces[bbox_index]
-                # Make sure polygons to test is contiguous (stack allocated) array
-                # This saves about 40-50% runtime
-                poly = copy_vertices_into(tree.vertices, face, polygon_work_array)
+                poly = leaf_polygon(tree, i, bbox_index, polygon_work_array)
                 if point_in_polygon(point, poly):
                     return bbox_index
             continue
 
-        dim = 1 if node["dim"] else 0
+        dim = child & 1
         left = point[dim] <= node["Lmax"]
         right = point[dim] >= node["Rmin"]
-        left_child = node["child"]
+        left_child = child >> 1
         right_child = left_child + 1
 
         if left and right:
@@ -86,37 +140,612 @@ def locate_points(
     return result
 
 
+@nb.njit(parallel=PARALLEL, cache=True)
+def count_points_per_face(
+    points: FloatArray,
+    tree: CellTreeData,
+    n_face: int,
+):
+    # Locate a block of points in parallel, then count them per face.
+    n_points = len(points)
+    counts = np.zeros(n_face, dtype=IntDType)
+    block = np.empty(min(n_points, COUNT_BLOCK_SIZE), dtype=IntDType)
+    for start in range(0, n_points, COUNT_BLOCK_SIZE):
+        n = min(n_points - start, COUNT_BLOCK_SIZE)
+        for i in nb.prange(n):  # pylint: disable=not-an-iterable
+            point = as_point(points[start + i])
+            block[i] = locate_point(point, tree)
+        for i in range(n):
+            if block[i] != -1:
+                counts[block[i]] += 1
+    return counts
+
+
+@nb.njit(inline="always")
+def point_in_face(point: Point, tree: CellTreeData, i: int, work_array: FloatArray):
+    start, length = face_range(tree, i)
+    face = tree.face_nodes[start : start + length]
+    if length > len(work_array):
+        polygon = copy_vertices(tree.vertices, face)
+    else:
+        polygon = copy_vertices_into(tree.vertices, face, work_array)
+    return point_in_polygon(point, polygon)
+
+
+@nb.njit(inline="always")
+def locate_point_hinted(
+    point: Point,
+    tree: CellTreeData,
+    hint: int,
+    neighbors: IntArray,
+    contained: BoolArray,
+    work_array: FloatArray,
+):
+    """
+    Test the hinted face and its neighbors first; descend the tree only if the
+    point falls in neither.
+    """
+    if hint >= 0 and contained[hint]:
+        if point_in_face(point, tree, hint, work_array):
+            return hint
+        start, length = face_range(tree, hint)
+        for k in range(start, start + length):
+            neighbor = neighbors[k]
+            if neighbor != -1 and point_in_face(point, tree, neighbor, work_array):
+                return neighbor
+    return locate_point(point, tree)
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def locate_points_hinted(
+    points: FloatArray,
+    tree: CellTreeData,
+    hints: IntArray,
+    neighbors: IntArray,
+    contained: BoolArray,
+    order: IntArray,
+):
+    n_points = len(points)
+    result = np.empty(n_points, dtype=IntDType)
+    for k in nb.prange(n_points):  # pylint: disable=not-an-iterable
+        i = order[k]
+        work_array = allocate_polygon()
+        point = as_point(points[i])
+        result[i] = locate_point_hinted(
+            point, tree, hints[i], neighbors, contained, work_array
+        )
+    return result
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def locate_trajectories(
+    points: FloatArray,
+    tree: CellTreeData,
+    hints: IntArray,
+    neighbors: IntArray,
+    contained: BoolArray,
+):
+    """
+    Locate every point of a trajectory, with the face of the previous step as
+    the hint for the next.
+    """
+    n_step, n_points, _ = points.shape
+    result = np.empty((n_step, n_points), dtype=IntDType)
+    for i in nb.prange(n_points):  # pylint: disable=not-an-iterable
+        work_array = allocate_polygon()
+        hint = hints[i]
+        for t in range(n_step):
+            point = as_point(points[t, i])
+            face = locate_point_hinted(
+                point, tree, hint, neighbors, contained, work_array
+            )
+            result[t, i] = face
+            if face != -1:
+                hint = face
+    return result
+
+
+@nb.njit(inline="always")
+def walk_to_point(
+    point: Point,
+    tree: CellTreeData,
+    face: int,
+    neighbors: IntArray,
+    contained: BoolArray,
+    work_array: FloatArray,
+):
+    """
+    Walk from face to face towards the point: from a counter-clockwise face,
+    cross the first edge that has the point on its right-hand side. The point
+    is in the face once it is on the left of (or on) every edge.
+
+    Search the tree instead when starting without a face, when the point is
+    far from the face, when the walk would leave the mesh, when it takes more
+    than MAX_WALK_STEPS steps, or when the point is not in the final face (a
+    concave face, or a point on an edge).
+    """
+    if face == -1 or not contained[face]:
+        return locate_point(point, tree)
+    # Estimate the number of steps by the distance to the bounding box of the
+    # face, relative to its size: a walk crosses at least a face per size.
+    box = as_box(tree.bb_coords[face])
+    dx = box.xmax - box.xmin
+    dy = box.ymax - box.ymin
+    distance = max(
+        box.xmin - point.x, point.x - box.xmax, box.ymin - point.y, point.y - box.ymax
+    )
+    if distance > 0.5 * MAX_WALK_STEPS * max(dx, dy):
+        return locate_point(point, tree)
+    for _ in range(MAX_WALK_STEPS):
+        start, length = face_range(tree, face)
+        nodes = tree.face_nodes[start : start + length]
+        if length > len(work_array):
+            polygon = copy_vertices(tree.vertices, nodes)
+        else:
+            polygon = copy_vertices_into(tree.vertices, nodes, work_array)
+        next_face = -1
+        outside = False
+        for k in range(length):
+            a = as_point(polygon[k])
+            b = as_point(polygon[k + 1 if k + 1 < length else 0])
+            if cross_product(to_vector(a, b), to_vector(a, point)) < 0.0:
+                outside = True
+                next_face = neighbors[start + k]
+                if next_face != -1:
+                    break
+        if not outside:
+            if point_in_polygon(point, polygon):
+                return face
+            break
+        if next_face == -1:
+            break
+        face = next_face
+    return locate_point(point, tree)
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def locate_points_walk(
+    points: FloatArray,
+    tree: CellTreeData,
+    hints: IntArray,
+    neighbors: IntArray,
+    contained: BoolArray,
+    order: IntArray,
+    n_chunks: int,
+):
+    """
+    Locate the points in the given order by walking across the mesh, from the
+    hinted face, or else from the face of the previous point. Every chunk of
+    points is processed in parallel; its first point seeds the walk with a
+    search of the tree.
+    """
+    n_points = len(points)
+    result = np.empty(n_points, dtype=IntDType)
+    chunk_size = max(1, -(-n_points // n_chunks))
+    for c in nb.prange(n_chunks):  # pylint: disable=not-an-iterable
+        work_array = allocate_polygon()
+        face = -1
+        for k in range(c * chunk_size, min(n_points, (c + 1) * chunk_size)):
+            i = order[k]
+            if hints[i] != -1:
+                face = hints[i]
+            point = as_point(points[i])
+            face = walk_to_point(point, tree, face, neighbors, contained, work_array)
+            result[i] = face
+    return result
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def locate_points_ordered(points: FloatArray, tree: CellTreeData, order: IntArray):
+    """
+    Locate the points in the given order, e.g. along a space filling curve,
+    so that consecutive points visit the same nodes and faces of the tree.
+    The result is in the original order of the points.
+    """
+    n_points = len(points)
+    result = np.empty(n_points, dtype=IntDType)
+    for k in nb.prange(n_points):  # pylint: disable=not-an-iterable
+        i = order[k]
+        point = as_point(points[i])
+        result[i] = locate_point(point, tree)
+    return result
+
+
+@nb.njit(inline="always")
+def insert_nearest(
+    indices: IntArray, distances_squared: FloatArray, index: int, distance: float
+) -> None:
+    """
+    Insert a face into the list of nearest faces, sorted by distance, dropping
+    the farthest.
+    """
+    j = len(indices) - 1
+    while j > 0 and distances_squared[j - 1] > distance:
+        indices[j] = indices[j - 1]
+        distances_squared[j] = distances_squared[j - 1]
+        j -= 1
+    indices[j] = index
+    distances_squared[j] = distance
+
+
+@nb.njit(inline="always")
+def push_children_by_gap(
+    point: Point,
+    node,
+    gap_x: float,
+    gap_y: float,
+    stack: IntArray,
+    gap_x_stack: FloatArray,
+    gap_y_stack: FloatArray,
+    size: int,
+) -> int:
+    """
+    Push the children of a node for a nearest neighbor search, with their gaps
+    in x and y to the box formed by the splits above them: the distance to a
+    child is at least the length of its gaps. The nearer child is pushed last,
+    so that it is visited first.
+    """
+    # The gap to a child is at least the gap to its parent, and at least
+    # the gap to its bound along the split dimension.
+    child = node["child"]
+    dim = child & 1
+    left_gap = max(point[dim] - node["Lmax"], 0.0)
+    right_gap = max(node["Rmin"] - point[dim], 0.0)
+    if dim == 0:
+        left_x = max(gap_x, left_gap)
+        right_x = max(gap_x, right_gap)
+        left_y = gap_y
+        right_y = gap_y
+    else:
+        left_x = gap_x
+        right_x = gap_x
+        left_y = max(gap_y, left_gap)
+        right_y = max(gap_y, right_gap)
+    left_child = child >> 1
+    right_child = left_child + 1
+
+    if left_gap <= right_gap:
+        push(gap_x_stack, right_x, size)
+        push(gap_y_stack, right_y, size)
+        size = push(stack, right_child, size)
+        push(gap_x_stack, left_x, size)
+        push(gap_y_stack, left_y, size)
+        size = push(stack, left_child, size)
+    else:
+        push(gap_x_stack, left_x, size)
+        push(gap_y_stack, left_y, size)
+        size = push(stack, left_child, size)
+        push(gap_x_stack, right_x, size)
+        push(gap_y_stack, right_y, size)
+        size = push(stack, right_child, size)
+    return size
+
+
+@nb.njit(inline="always")
+def nearest_faces(
+    point: Point,
+    tree: CellTreeData,
+    indices: IntArray,
+    distances_squared: FloatArray,
+) -> None:
+    """
+    Branch and bound search for the k faces nearest to a point, k being the
+    length of indices: children are visited nearest first, and skipped if
+    their lower bound on the distance exceeds the distance of the k-th
+    nearest face found so far. The distance to a face is zero inside of it,
+    otherwise the distance to its nearest edge.
+
+    The lower bound of a node is the distance to the box formed by the splits
+    above it: the gaps to the box in x and y are kept for every node on the
+    stack.
+
+    The indices must be initialized to -1, and the squared distances to the
+    squared maximum distance. They are filled with the nearest faces, sorted
+    by distance.
+    """
+    k = len(indices) - 1
+    gap_x, gap_y = point_box_gaps(point, as_box(tree.bbox))
+    if gap_x * gap_x + gap_y * gap_y > distances_squared[k]:
+        return
+
+    stack = allocate_stack()
+    gap_x_stack = allocate_float_stack()
+    gap_y_stack = allocate_float_stack()
+    polygon_work_array = allocate_polygon()
+    stack[0] = 0
+    gap_x_stack[0] = gap_x
+    gap_y_stack[0] = gap_y
+    size = 1
+
+    while size > 0:
+        gap_x, _ = pop(gap_x_stack, size)
+        gap_y, _ = pop(gap_y_stack, size)
+        node_index, size = pop(stack, size)
+        if gap_x * gap_x + gap_y * gap_y > distances_squared[k]:
+            continue
+
+        node = tree.nodes[node_index]
+        child = node["child"]
+        if child == LEAF:
+            for i in range(node["ptr"], node["ptr"] + node["size"]):
+                bbox_index = tree.bb_indices[i]
+                box = as_box(tree.bb_coords[bbox_index])
+                if point_box_distance_squared(point, box) > distances_squared[k]:
+                    continue
+                poly = leaf_polygon(tree, i, bbox_index, polygon_work_array)
+                distance_squared = point_polygon_distance_squared(point, poly)
+                if distance_squared <= distances_squared[k]:
+                    insert_nearest(
+                        indices, distances_squared, bbox_index, distance_squared
+                    )
+            continue
+
+        size = push_children_by_gap(
+            point, node, gap_x, gap_y, stack, gap_x_stack, gap_y_stack, size
+        )
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def locate_nearest_faces(
+    points: FloatArray,
+    tree: CellTreeData,
+    max_distance: float,
+):
+    n_points = len(points)
+    indices = np.full(n_points, -1, dtype=IntDType)
+    distances = np.full(n_points, max_distance * max_distance, dtype=FloatDType)
+    for i in nb.prange(n_points):  # pylint: disable=not-an-iterable
+        point = as_point(points[i])
+        # Points inside of a face cost as much as in locate_points.
+        index = locate_point(point, tree)
+        if index != -1:
+            indices[i] = index
+            distances[i] = 0.0
+            continue
+        nearest_faces(point, tree, indices[i : i + 1], distances[i : i + 1])
+        distances[i] = np.sqrt(distances[i]) if indices[i] != -1 else np.nan
+    return indices, distances
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def locate_k_nearest(
+    points: FloatArray,
+    tree: CellTreeData,
+    k: int,
+    max_distance: float,
+):
+    n_points = len(points)
+    indices = np.full((n_points, k), -1, dtype=IntDType)
+    distances = np.full((n_points, k), max_distance * max_distance, dtype=FloatDType)
+    for i in nb.prange(n_points):  # pylint: disable=not-an-iterable
+        point = as_point(points[i])
+        nearest_faces(point, tree, indices[i], distances[i])
+        for j in range(k):
+            if indices[i, j] == -1:
+                distances[i, j] = np.nan
+            else:
+                distances[i, j] = np.sqrt(distances[i, j])
+    return indices, distances
+
+
+@nb.njit(inline="always")
+def chunk_range(c: int, n: int) -> Tuple[int, int]:
+    start = c * QUERY_CHUNK_SIZE
+    return start, min(start + QUERY_CHUNK_SIZE, n)
+
+
+@nb.njit(inline="always")
+def cumulative_counts(counts: IntArray) -> int:
+    total = 0
+    for i in range(1, len(counts)):
+        total += counts[i]
+        counts[i] = total
+    return total
+
+
 @nb.njit(inline="always")
-def locate_box(box: Box, tree: CellTreeData, indices: IntArray, store_indices: bool):
+def fill_query_indices(ii: IntArray, counts: IntArray, start: int, end: int) -> None:
+    for i in range(start, end):
+        ii[counts[i] : counts[i + 1]] = i
+
+
+@nb.njit(inline="always")
+def faces_within_distance(
+    point: Point,
+    radius: float,
+    tree: CellTreeData,
+    indices: IntArray,
+    distances: FloatArray,
+    n_found: int,
+    store: bool,
+) -> int:
+    """
+    Find the faces within radius of the point: the nodes are pruned by the
+    box of the point and radius, the faces by their bounding boxes, then by
+    their distance. With store, the faces and distances are stored from
+    n_found onwards, as far as indices has room. Returns n_found incremented
+    by the number of faces.
+    """
+    radius_squared = radius * radius
+    if point_box_distance_squared(point, as_box(tree.bbox)) > radius_squared:
+        return n_found
+    stack = allocate_stack()
+    polygon_work_array = allocate_polygon()
+    stack[0] = 0
+    size = 1
+
+    while size > 0:
+        node_index, size = pop(stack, size)
+        node = tree.nodes[node_index]
+        child = node["child"]
+        if child == LEAF:
+            for i in range(node["ptr"], node["ptr"] + node["size"]):
+                bbox_index = tree.bb_indices[i]
+                box = as_box(tree.bb_coords[bbox_index])
+                if point_box_distance_squared(point, box) > radius_squared:
+                    continue
+                poly = leaf_polygon(tree, i, bbox_index, polygon_work_array)
+                distance_squared = point_polygon_distance_squared(point, poly)
+                if distance_squared <= radius_squared:
+                    if store and n_found < len(indices):
+                        indices[n_found] = bbox_index
+                        distances[n_found] = np.sqrt(distance_squared)
+                    n_found += 1
+            continue
+
+        dim = child & 1
+        left = point[dim] - radius <= node["Lmax"]
+        right = point[dim] + radius >= node["Rmin"]
+        left_child = child >> 1
+        right_child = left_child + 1
+        if left:
+            size = push(stack, left_child, size)
+        if right:
+            size = push(stack, right_child, size)
+
+    return n_found
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def locate_within_distance(points: FloatArray, radii: FloatArray, tree: CellTreeData):
+    # Count, allocate, and fill: see locate_boxes.
+    n_points = len(points)
+    offsets = np.empty(n_points + 1, dtype=IntDType)
+    int_dummy = np.empty((0,), dtype=IntDType)
+    float_dummy = np.empty((0,), dtype=FloatDType)
+    offsets[0] = 0
+    for i in nb.prange(n_points):  # pylint: disable=not-an-iterable
+        point = as_point(points[i])
+        offsets[i + 1] = faces_within_distance(
+            point, radii[i], tree, int_dummy, float_dummy, 0, False
+        )
+
+    total = cumulative_counts(offsets)
+    indices = np.empty(total, dtype=IntDType)
+    distances = np.empty(total, dtype=FloatDType)
+    for i in nb.prange(n_points):  # pylint: disable=not-an-iterable
+        start = offsets[i]
+        end = offsets[i + 1]
+        point = as_point(points[i])
+        faces_within_distance(
+            point, radii[i], tree, indices[start:end], distances[start:end], 0, True
+        )
+    return offsets, indices, distances
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def locate_within_distance_single_pass(
+    points: FloatArray, radii: FloatArray, tree: CellTreeData
+):
+    # Count and store in a single traversal: see locate_boxes_single_pass.
+    n_points = len(points)
+    n_chunks = -(-n_points // QUERY_CHUNK_SIZE)
+    capacity = QUERY_CHUNK_SIZE * SINGLE_PASS_CAPACITY
+    index_buffer = np.empty(n_chunks * capacity, dtype=IntDType)
+    distance_buffer = np.empty(n_chunks * capacity, dtype=FloatDType)
+    stored = np.empty(n_chunks, dtype=IntDType)
+    offsets = np.empty(n_points + 1, dtype=IntDType)
+    offsets[0] = 0
+    for c in nb.prange(n_chunks):  # pylint: disable=not-an-iterable
+        start, end = chunk_range(c, n_points)
+        index_region = index_buffer[c * capacity : (c + 1) * capacity]
+        distance_region = distance_buffer[c * capacity : (c + 1) * capacity]
+        n_found = 0
+        stored_end = end
+        for i in range(start, end):
+            point = as_point(points[i])
+            if stored_end == end:
+                n = faces_within_distance(
+                    point, radii[i], tree, index_region, distance_region, n_found, True
+                )
+                if n > capacity:
+                    stored_end = i
+                offsets[i + 1] = n - n_found
+                n_found = n
+            else:
+                offsets[i + 1] = faces_within_distance(
+                    point, radii[i], tree, index_region, distance_region, 0, False
+                )
+        stored[c] = stored_end
+
+    total = cumulative_counts(offsets)
+    indices = np.empty(total, dtype=IntDType)
+    distances = np.empty(total, dtype=FloatDType)
+    for c in nb.prange(n_chunks):  # pylint: disable=not-an-iterable
+        start, end = chunk_range(c, n_points)
+        offset = offsets[start]
+        n_stored = offsets[stored[c]] - offset
+        region_start = c * capacity
+        indices[offset : offset + n_stored] = index_buffer[
+            region_start : region_start + n_stored
+        ]
+        distances[offset : offset + n_stored] = distance_buffer[
+            region_start : region_start + n_stored
+        ]
+        for i in range(stored[c], end):
+            point = as_point(points[i])
+            faces_within_distance(
+                point,
+                radii[i],
+                tree,
+                indices[offsets[i] : offsets[i + 1]],
+                distances[offsets[i] : offsets[i + 1]],
+                0,
+                True,
+            )
+    return offsets, indices, distances
+
+
+@nb.njit(inline="always")
+def intersects(a: Box, b: Box, closed: bool) -> bool:
+    if closed:
+        return boxes_touch(a, b)
+    return boxes_intersect(a, b)
+
+
+@nb.njit(inline="always")
+def locate_box(
+    box: Box,
+    tree: CellTreeData,
+    indices: IntArray,
+    n_found: int,
+    store_indices: bool,
+    closed: bool,
+) -> int:
+    """
+    Find the faces intersecting with the box. With store_indices, their
+    indices are stored from indices[n_found] onwards, as far as indices has
+    room. Returns n_found incremented by the number of faces.
+    """
     tree_bbox = as_box(tree.bbox)
-    if not boxes_intersect(box, tree_bbox):
-        return 0
+    if not intersects(box, tree_bbox, closed):
+        return n_found
     stack = allocate_stack()
     stack[0] = 0
     size = 1
-    count = 0
 
     while size > 0:
         node_index, size = pop(stack, size)
         node = tree.nodes[node_index]
+        child = node["child"]
         # Check if it's a leaf
-        if node["child"] == -1:
+        if child == LEAF:
             # Iterate over the bboxes in the leaf
             for i in range(node["ptr"], node["ptr"] + node["size"]):
                 bbox_index = tree.bb_indices[i]
                 # As a named tuple: saves about 15% runtime
                 leaf_box = as_box(tree.bb_coords[bbox_index])
-                if boxes_intersect(box, leaf_box):
-                    if store_indices:
-                        indices[count] = bbox_index
-                    count += 1
+                if intersects(box, leaf_box, closed):
+                    if store_indices and n_found < len(indices):
+                        indices[n_found] = bbox_index
+                    n_found += 1
         else:
-            dim = 1 if node["dim"] else 0
+            dim = child & 1
             minimum = 2 * dim
             maximum = 2 * dim + 1
             left = box[minimum] <= node["Lmax"]
             right = box[maximum] >= node["Rmin"]
-            left_child = node["child"]
+            left_child = child >> 1
             right_child = left_child + 1
 
             if left and right:
@@ -127,13 +756,14 @@ def locate_box(box: Box, tree: CellTreeData, indices: IntArray, store_indices: b
             elif right:
                 size = push(stack, right_child, size)
 
-    return count
+    return n_found
 
 
 @nb.njit(parallel=PARALLEL, cache=True)
 def locate_boxes(
     box_coords: FloatArray,
     tree: CellTreeData,
+    closed: bool = False,
 ):
     # Numba does not support a concurrent list or bag like stucture:
     # https://github.com/numba/numba/issues/5878
@@ -145,6 +775,9 @@ def locate_boxes(
     # The cost of traversing twice is roughly a factor two. Since many
     # computers can parallellize over more than two threads, counting first --
     # which enables parallelization -- should still result in a net speed up.
+    # See locate_boxes_single_pass for the alternative.
+    # If closed is True, boxes which share only an edge or a corner are
+    # included as well.
     n_box = box_coords.shape[0]
     counts = np.empty(n_box + 1, dtype=IntDType)
     dummy = np.empty((0,), dtype=IntDType)
@@ -152,13 +785,10 @@ def locate_boxes(
     # First run a count so we can allocate afterwards
     for i in nb.prange(n_box):  # pylint: disable=not-an-iterable
         box = as_box(box_coords[i])
-        counts[i + 1] = locate_box(box, tree, dummy, False)
+        counts[i + 1] = locate_box(box, tree, dummy, 0, False, closed)
 
     # Run a cumulative sum
-    total = 0
-    for i in range(1, n_box + 1):
-        total += counts[i]
-        counts[i] = total
+    total = cumulative_counts(counts)
 
     # Now allocate appropriately
     ii = np.empty(total, dtype=IntDType)
@@ -169,11 +799,131 @@ def locate_boxes(
         ii[start:end] = i
         indices = jj[start:end]
         box = as_box(box_coords[i])
-        locate_box(box, tree, indices, True)
+        locate_box(box, tree, indices, 0, True, closed)
+
+    return ii, jj
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def locate_boxes_single_pass(
+    box_coords: FloatArray,
+    tree: CellTreeData,
+    closed: bool = False,
+):
+    # Count and store in a single traversal. Every chunk of boxes is searched
+    # by a single thread, which stores the faces in its own region of a
+    # preallocated buffer, with room for SINGLE_PASS_CAPACITY faces per box.
+    # The regions are then copied into the result at the offsets given by the
+    # cumulative counts, which keeps the order of the boxes.
+    # A chunk outgrowing its region only counts the faces of its remaining
+    # boxes; these are searched a second time to store them, as in
+    # locate_boxes. The memory used besides the result is therefore bounded
+    # by the buffer.
+    n_box = box_coords.shape[0]
+    n_chunks = -(-n_box // QUERY_CHUNK_SIZE)
+    capacity = QUERY_CHUNK_SIZE * SINGLE_PASS_CAPACITY
+    buffer = np.empty(n_chunks * capacity, dtype=IntDType)
+    # For every chunk, the first box whose faces are not stored in its region.
+    stored = np.empty(n_chunks, dtype=IntDType)
+    counts = np.empty(n_box + 1, dtype=IntDType)
+    counts[0] = 0
+    for c in nb.prange(n_chunks):  # pylint: disable=not-an-iterable
+        start, end = chunk_range(c, n_box)
+        region = buffer[c * capacity : (c + 1) * capacity]
+        n_found = 0
+        stored_end = end
+        for i in range(start, end):
+            box = as_box(box_coords[i])
+            if stored_end == end:
+                n = locate_box(box, tree, region, n_found, True, closed)
+                if n > capacity:
+                    stored_end = i
+                counts[i + 1] = n - n_found
+                n_found = n
+            else:
+                counts[i + 1] = locate_box(box, tree, region, 0, False, closed)
+        stored[c] = stored_end
+
+    total = cumulative_counts(counts)
+    ii = np.empty(total, dtype=IntDType)
+    jj = np.empty(total, dtype=IntDType)
+    for c in nb.prange(n_chunks):  # pylint: disable=not-an-iterable
+        start, end = chunk_range(c, n_box)
+        offset = counts[start]
+        n_stored = counts[stored[c]] - offset
+        jj[offset : offset + n_stored] = buffer[c * capacity : c * capacity + n_stored]
+        for i in range(stored[c], end):
+            box = as_box(box_coords[i])
+            locate_box(box, tree, jj[counts[i] : counts[i + 1]], 0, True, closed)
+        fill_query_indices(ii, counts, start, end)
 
     return ii, jj
 
 
+@nb.njit(parallel=PARALLEL, cache=True)
+def count_boxes(
+    box_coords: FloatArray,
+    tree: CellTreeData,
+    closed: bool = False,
+):
+    # The traversal of locate_boxes, without storing the faces.
+    n_box = box_coords.shape[0]
+    counts = np.empty(n_box, dtype=IntDType)
+    dummy = np.empty((0,), dtype=IntDType)
+    for i in nb.prange(n_box):  # pylint: disable=not-an-iterable
+        box = as_box(box_coords[i])
+        counts[i] = locate_box(box, tree, dummy, 0, False, closed)
+    return counts
+
+
+@nb.njit(inline="always")
+def segment_children(
+    a: Point, b: Point, V: Vector, Lmax: float, Rmin: float, node_dim: int
+) -> Tuple[bool, bool]:
+    """
+    Whether the segment a -> b, with vector V, may intersect the left and the
+    right child of a node.
+    """
+    # Note, "x" is a placeholder for x, y here
+    # Contrast with t, which is along vector
+    dx = V[node_dim]
+    if dx > 0.0:
+        dx_left = Lmax - a[node_dim]
+        dx_right = Rmin - b[node_dim]
+    else:
+        dx_left = Lmax - b[node_dim]
+        dx_right = Rmin - a[node_dim]
+
+    # Check how origin (a) and end (b) are located compared to box edges
+    # (Lmax, Rmin). The box should be investigated if:
+    # * the origin is left of Lmax (dx_left >= 0)
+    # * the end is right of Rmin (dx_right <= 0)
+    left = dx_left >= 0.0
+    right = dx_right <= 0.0
+
+    # Now find the intersection coordinates. These have to occur within in
+    # the bounds of the vector. Note that if the line has no slope in this
+    # dim (dx == 0), we cannot compute the intersection, and we have to
+    # defer to the child nodes.
+    if dx > 0.0:  # TODO: abs(dx) > EPISLON?
+        if left:
+            t_left = dx_left / dx
+            left = t_left >= 0.0
+        if right:
+            t_right = dx_right / dx
+            right = t_right <= 1.0
+    elif dx < 0.0:
+        if left:
+            t_left = 1.0 - (dx_left / dx)
+            left = t_left >= 0.0
+        if right:
+            t_right = 1.0 - (dx_right / dx)
+            right = t_right <= 1.0
+    # else dx == 0.0. In this case there's no info to extract from this
+    # node. We'll fully defer to the children.
+    return left, right
+
+
 # Inlining this function drives compilation time through the roof. It's
 # probably also a rather bad idea, given its complexity: compared to looking
 # for either boxes or points, checking is more much complicated by involving
@@ -185,85 +935,52 @@ def locate_edge(
     tree: CellTreeData,
     indices: IntArray,
     intersections: FloatArray,
+    n_found: int,
     store_intersection: bool,
-):
+) -> int:
+    """
+    Find the faces intersecting with the segment a -> b: see locate_box.
+    With store_intersection, the intersections are stored alongside the
+    indices.
+    """
     # Check if the entire mesh intersects with the line segment at all
     tree_bbox = as_box(tree.bbox)
     tree_intersects, _, _ = cohen_sutherland_line_box_clip(a, b, tree_bbox)
     if not tree_intersects:
-        return 0
+        return n_found
 
     V = to_vector(a, b)
     stack = allocate_stack()
     polygon_work_array = allocate_polygon()
     stack[0] = 0
     size = 1
-    count = 0
 
     while size > 0:
         node_index, size = pop(stack, size)
         node = tree.nodes[node_index]
+        child = node["child"]
 
         # Check if it's a leaf
-        if node["child"] == -1:
+        if child == LEAF:
             for i in range(node["ptr"], node["ptr"] + node["size"]):
                 bbox_index = tree.bb_indices[i]
                 box = as_box(tree.bb_coords[bbox_index])
                 box_intersect, _, _ = cohen_sutherland_line_box_clip(a, b, box)
                 if box_intersect:
-                    polygon = copy_vertices_into(
-                        tree.vertices, tree.faces[bbox_index], polygon_work_array
-                    )
+                    polygon = leaf_polygon(tree, i, bbox_index, polygon_work_array)
                     face_intersects, c, d = cyrus_beck_line_polygon_clip(a, b, polygon)
                     if face_intersects:
-                        if store_intersection:
-                            indices[count] = bbox_index
-                            intersections[count, 0, 0] = c.x
-                            intersections[count, 0, 1] = c.y
-                            intersections[count, 1, 0] = d.x
-                            intersections[count, 1, 1] = d.y
-                        count += 1
+                        if store_intersection and n_found < len(indices):
+                            indices[n_found] = bbox_index
+                            intersections[n_found, 0, 0] = c.x
+                            intersections[n_found, 0, 1] = c.y
+                            intersections[n_found, 1, 0] = d.x
+                            intersections[n_found, 1, 1] = d.y
+                        n_found += 1
             continue
 
-        # Note, "x" is a placeholder for x, y here
-        # Contrast with t, which is along vector
-        node_dim = 1 if node["dim"] else 0
-        dx = V[node_dim]
-        if dx > 0.0:
-            dx_left = node["Lmax"] - a[node_dim]
-            dx_right = node["Rmin"] - b[node_dim]
-        else:
-            dx_left = node["Lmax"] - b[node_dim]
-            dx_right = node["Rmin"] - a[node_dim]
-
-        # Check how origin (a) and end (b) are located compared to box edges
-        # (Lmax, Rmin). The box should be investigated if:
-        # * the origin is left of Lmax (dx_left >= 0)
-        # * the end is right of Rmin (dx_right <= 0)
-        left = dx_left >= 0.0
-        right = dx_right <= 0.0
-
-        # Now find the intersection coordinates. These have to occur within in
-        # the bounds of the vector. Note that if the line has no slope in this
-        # dim (dx == 0), we cannot compute the intersection, and we have to
-        # defer to the child nodes.
-        if dx > 0.0:  # TODO: abs(dx) > EPISLON?
-            if left:
-                t_left = dx_left / dx
-                left = t_left >= 0.0
-            if right:
-                t_right = dx_right / dx
-                right = t_right <= 1.0
-        elif dx < 0.0:
-            if left:
-                t_left = 1.0 - (dx_left / dx)
-                left = t_left >= 0.0
-            if right:
-                t_right = 1.0 - (dx_right / dx)
-                right = t_right <= 1.0
-        # else dx == 0.0. In this case there's no info to extract from this
-        # node. We'll fully defer to the children.
-        left_child = node["child"]
+        left, right = segment_children(a, b, V, node["Lmax"], node["Rmin"], child & 1)
+        left_child = child >> 1
         right_child = left_child + 1
 
         if left and right:
@@ -274,7 +991,7 @@ def locate_edge(
         elif right:
             size = push(stack, right_child, size)
 
-    return count
+    return n_found
 
 
 @nb.njit(parallel=PARALLEL, cache=True)
@@ -292,6 +1009,7 @@ def locate_edges(
     # The cost of traversing twice is roughly a factor two. Since many
     # computers can parallellize over more than two threads, counting first --
     # which enables parallelization -- should still result in a net speed up.
+    # See locate_edges_single_pass for the alternative.
     n_edge = edge_coords.shape[0]
     counts = np.empty(n_edge + 1, dtype=IntDType)
     int_dummy = np.empty((0,), dtype=IntDType)
@@ -301,13 +1019,10 @@ def locate_edges(
     for i in nb.prange(n_edge):  # pylint: disable=not-an-iterable
         a = as_point(edge_coords[i, 0])
         b = as_point(edge_coords[i, 1])
-        counts[i + 1] = locate_edge(a, b, tree, int_dummy, float_dummy, False)
+        counts[i + 1] = locate_edge(a, b, tree, int_dummy, float_dummy, 0, False)
 
     # Run a cumulative sum
-    total = 0
-    for i in range(1, n_edge + 1):
-        total += counts[i]
-        counts[i] = total
+    total = cumulative_counts(counts)
 
     # Now allocate appropriately
     ii = np.empty(total, dtype=IntDType)
@@ -321,11 +1036,92 @@ def locate_edges(
         intersections = xy[start:end]
         a = as_point(edge_coords[i, 0])
         b = as_point(edge_coords[i, 1])
-        locate_edge(a, b, tree, indices, intersections, True)
+        locate_edge(a, b, tree, indices, intersections, 0, True)
+
+    return ii, jj, xy
+
+
+@nb.njit(parallel=PARALLEL, cache=True)
+def locate_edges_single_pass(
+    edge_coords: FloatArray,
+    tree: CellTreeData,
+):
+    # Count and store in a single traversal: see locate_boxes_single_pass.
+    n_edge = edge_coords.shape[0]
+    n_chunks = -(-n_edge // QUERY_CHUNK_SIZE)
+    capacity = QUERY_CHUNK_SIZE * SINGLE_PASS_CAPACITY
+    index_buffer = np.empty(n_chunks * capacity, dtype=IntDType)
+    intersection_buffer = np.empty((n_chunks * capacity, 2, 2), dtype=FloatDType)
+    stored = np.empty(n_chunks, dtype=IntDType)
+    counts = np.empty(n_edge + 1, dtype=IntDType)
+    counts[0] = 0
+    for c in nb.prange(n_chunks):  # pylint: disable=not-an-iterable
+        start, end = chunk_range(c, n_edge)
+        indices = index_buffer[c * capacity : (c + 1) * capacity]
+        intersections = intersection_buffer[c * capacity : (c + 1) * capacity]
+        n_found = 0
+        stored_end = end
+        for i in range(start, end):
+            a = as_point(edge_coords[i, 0])
+            b = as_point(edge_coords[i, 1])
+            if stored_end == end:
+                n = locate_edge(a, b, tree, indices, intersections, n_found, True)
+                if n > capacity:
+                    stored_end = i
+                counts[i + 1] = n - n_found
+                n_found = n
+            else:
+                counts[i + 1] = locate_edge(
+                    a, b, tree, indices, intersections, 0, False
+                )
+        stored[c] = stored_end
+
+    total = cumulative_counts(counts)
+    ii = np.empty(total, dtype=IntDType)
+    jj = np.empty(total, dtype=IntDType)
+    xy = np.empty((total, 2, 2), dtype=FloatDType)
+    for c in nb.prange(n_chunks):  # pylint: disable=not-an-iterable
+        start, end = chunk_range(c, n_edge)
+        offset = counts[start]
+        n_stored = counts[stored[c]] - offset
+        region = c * capacity
+        jj[offset : offset + n_stored] = index_buffer[region : region + n_stored]
+        xy[offset : offset + n_stored] = intersection_buffer[region : region + n_stored]
+        for i in range(stored[c], end):
+            a = as_point(edge_coords[i, 0])
+            b = as_point(edge_coords[i, 1])
+            locate_edge(
+                a,
+                b,
+                tree,
+                jj[counts[i] : counts[i + 1]],
+                xy[counts[i] : counts[i + 1]],
+                0,
+                True,
+            )
+        fill_query_indices(ii, counts, start, end)
 
     return ii, jj, xy
 
 
+@nb.njit(parallel=PARALLEL, cache=True)
+def count_edges(
+    edge_coords: FloatArray,
+    tree: CellTreeData,
+):
+    # The traversal of locate_edges, without storing the faces and
+    # intersections.
+    n_edge = edge_coords.shape[0]
+    counts = np.empty(n_edge, dtype=IntDType)
+    int_dummy = np.empty((0,), dtype=IntDType)
+    float_dummy = np.empty((0, 2, 2), dtype=FloatDType)
+    for i in nb.prange(n_edge):  # pylint: disable=not-an-iterable
+        a = as_point(edge_coords[i, 0])
+        b = as_point(edge_coords[i, 1])
+        counts[i] = locate_edge(a, b, tree, int_dummy, float_dummy, 0, False)
+    return counts
+
+
 @nb.njit(cache=True)
 def collect_node_bounds(tree: CellTreeData) -> FloatArray:
     # Allocate output array.
@@ -361,7 +1157,7 @@ def collect_node_bounds(tree: CellTreeData) -> FloatArray:
 
         parent = tree.nodes[parent_index]
         bbox = node_bounds[parent_index]
-        dim = 1 if parent["dim"] else 0
+        dim = parent["child"] & 1
 
         # Set parent bounding box first.
         # Then place the single new value for the child.
@@ -377,11 +1173,11 @@ def collect_node_bounds(tree: CellTreeData) -> FloatArray:
 
         node_bounds[node_index, dim * 2 + side] = bound
 
-        node = tree.nodes[node_index]
-        if node["child"] == -1:
+        child = tree.nodes[node_index]["child"]
+        if child == LEAF:
             continue
 
-        left_child = node["child"]
+        left_child = child >> 1
         right_child = left_child + 1
 
         # Right child
@@ -413,9 +1209,10 @@ def validate_node_bounds(tree: CellTreeData, node_bounds: FloatArray) -> BoolArr
         node_index, size = pop(stack, size)
         bbox = as_box(node_bounds[node_index])
         node = tree.nodes[node_index]
+        child = node["child"]
 
         # Check if it's a leaf:
-        if node["child"] == -1:
+        if child == LEAF:
             valid = True
             for i in range(node["ptr"], node["ptr"] + node["size"]):
                 bbox_index = tree.bb_indices[i]
@@ -424,7 +1221,7 @@ def validate_node_bounds(tree: CellTreeData, node_bounds: FloatArray) -> BoolArr
             node_validity[node_index] = valid
             continue
 
-        left_child = node["child"]
+        left_child = child >> 1
         right_child = left_child + 1
         left_box = as_box(node_bounds[left_child])
         right_box = as_box(node_bounds[right_child])
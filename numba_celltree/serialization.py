@@ -0,0 +1,130 @@
+"""
+Storing the arrays of a tree in a single binary file.
+
+The layout of the file is:
+
+* 8 bytes: the magic string ``b"NBCTREE\\x00"``.
+* 4 bytes: the format version, a little-endian unsigned integer.
+* 8 bytes: the length of the header, a little-endian unsigned integer.
+* The header: UTF-8 encoded JSON, containing the attributes, and for every
+  array its dtype, shape, and byte offset in the file.
+* The array data, every array starting at a multiple of ``ALIGNMENT`` bytes.
+
+The arrays are stored in C order, so that they can be memory mapped directly
+on load.
+"""
+import json
+import os
+import struct
+from typing import Any, Dict, Tuple, Union
+
+import numpy as np
+
+MAGIC = b"NBCTREE\x00"
+# Increment when the layout of the file or of the stored arrays changes.
+FORMAT_VERSION = 3
+ALIGNMENT = 64
+PREAMBLE = struct.Struct("<8sIQ")
+PathLike = Union[str, os.PathLike]
+
+
+def dtype_to_dict(dtype: np.dtype) -> Dict[str, Any]:
+    if dtype.names is None:
+        return {"descr": dtype.str}
+    return {
+        "names": list(dtype.names),
+        "formats": [dtype.fields[name][0].str for name in dtype.names],
+        "offsets": [dtype.fields[name][1] for name in dtype.names],
+        "itemsize": dtype.itemsize,
+    }
+
+
+def dict_to_dtype(d: Dict[str, Any]) -> np.dtype:
+    if "descr" in d:
+        return np.dtype(d["descr"])
+    return np.dtype(d)
+
+
+def aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_arrays(
+    path: PathLike, arrays: Dict[str, np.ndarray], attrs: Dict[str, Any]
+) -> None:
+    """
+    Write the arrays and the (JSON serializable) attributes to path.
+    """
+    arrays = {k: np.ascontiguousarray(v) for k, v in arrays.items()}
+    # The offsets depend on the header length and vice versa: compute the
+    # header with placeholder offsets of the maximum width first.
+    entries = {
+        name: {
+            "dtype": dtype_to_dict(array.dtype),
+            "shape": list(array.shape),
+            "offset": 2**63 - 1,
+        }
+        for name, array in arrays.items()
+    }
+    header = {"attrs": attrs, "arrays": entries}
+    length = len(json.dumps(header).encode("utf-8"))
+    offset = aligned(PREAMBLE.size + length)
+    for name, array in arrays.items():
+        entries[name]["offset"] = offset
+        offset = aligned(offset + array.nbytes)
+    encoded = json.dumps(header).encode("utf-8")
+    # Pad the header with whitespace, to keep the offsets valid.
+    encoded = encoded + b" " * (length - len(encoded))
+
+    with open(path, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, length))
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.write(b"\x00" * (entries[name]["offset"] - f.tell()))
+            array.tofile(f)
+    return
+
+
+def read_header(path: PathLike) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        preamble = f.read(PREAMBLE.size)
+        if len(preamble) != PREAMBLE.size:
+            raise ValueError(f"{path} is not a numba_celltree file")
+        magic, version, length = PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a numba_celltree file")
+        if version != FORMAT_VERSION:
+            raise ValueError(
+                f"{path} has format version {version}, this version of "
+                f"numba_celltree reads only format version {FORMAT_VERSION}"
+            )
+        return json.loads(f.read(length).decode("utf-8"))
+
+
+def load_arrays(
+    path: PathLike, mmap: bool = True
+) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """
+    Read the arrays and attributes written by ``save_arrays``.
+
+    If mmap is True, the arrays are read-only memory maps of the file.
+    """
+    header = read_header(path)
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = dict_to_dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        count = int(np.prod(shape))
+        if count == 0:
+            # Zero length memory maps are not supported.
+            array = np.empty(shape, dtype=dtype)
+        elif mmap:
+            array = np.memmap(
+                path, dtype=dtype, mode="r", offset=entry["offset"], shape=shape
+            )
+        else:
+            array = np.fromfile(
+                path, dtype=dtype, count=count, offset=entry["offset"]
+            ).reshape(shape)
+        arrays[name] = array
+    return arrays, header["attrs"]
@@ -0,0 +1,98 @@
+"""
+Statistics describing the quality of a built tree.
+"""
+from typing import Any, Dict
+
+import numba as nb
+import numpy as np
+
+from .constants import LEAF, FloatArray, IntArray, IntDType, NodeArray
+from .creation import fit_node_bounds, tree_cost
+
+
+@nb.njit(cache=True)
+def node_statistics(nodes: NodeArray, node_bounds: FloatArray):
+    """
+    Compute, in a single pass over the nodes:
+
+    * the number of leaves at every depth (the root has depth 0),
+    * the number of leaves of every size,
+    * the summed overlap of the children of the internal nodes: the amount by
+      which Lmax exceeds Rmin,
+    * the summed overlap relative to the extent of the node in the split
+      dimension,
+    * the number of internal nodes with overlapping children.
+
+    The children of a node are stored after it: visiting the nodes in order,
+    the depth of the parent is known before that of its children.
+    """
+    n_nodes = len(nodes)
+    depth = np.empty(n_nodes, dtype=IntDType)
+    depth[0] = 0
+    max_depth = 0
+    max_size = 0
+    overlap = 0.0
+    relative_overlap = 0.0
+    n_overlapping = 0
+    for i in range(n_nodes):
+        node = nodes[i]
+        child = node["child"]
+        if child == LEAF:
+            max_depth = max(max_depth, depth[i])
+            max_size = max(max_size, node["size"])
+            continue
+        left_child = child >> 1
+        depth[left_child] = depth[i] + 1
+        depth[left_child + 1] = depth[i] + 1
+        if node_bounds[i, 0] > node_bounds[i, 1]:
+            # Empty, after removing faces: the bounds are inverted.
+            continue
+        node_overlap = node["Lmax"] - node["Rmin"]
+        if node_overlap > 0.0:
+            dim = child & 1
+            extent = node_bounds[i, 2 * dim + 1] - node_bounds[i, 2 * dim]
+            overlap += node_overlap
+            n_overlapping += 1
+            if extent > 0.0:
+                relative_overlap += min(node_overlap / extent, 1.0)
+
+    depth_histogram = np.zeros(max_depth + 1, dtype=IntDType)
+    size_histogram = np.zeros(max_size + 1, dtype=IntDType)
+    for i in range(n_nodes):
+        node = nodes[i]
+        if node["child"] == LEAF:
+            depth_histogram[depth[i]] += 1
+            size_histogram[node["size"]] += 1
+    return depth_histogram, size_histogram, overlap, relative_overlap, n_overlapping
+
+
+def tree_statistics(
+    nodes: NodeArray,
+    bb_indices: IntArray,
+    bb_coords: FloatArray,
+    arrays: Dict[str, np.ndarray],
+) -> Dict[str, Any]:
+    node_bounds = fit_node_bounds(nodes, bb_indices, bb_coords)
+    (
+        depth_histogram,
+        size_histogram,
+        overlap,
+        relative_overlap,
+        n_overlapping,
+    ) = node_statistics(nodes, node_bounds)
+    n_leaves = int(depth_histogram.sum())
+    n_internal = len(nodes) - n_leaves
+    sizes = np.arange(len(size_histogram))
+    return {
+        "n_nodes": len(nodes),
+        "n_leaves": n_leaves,
+        "max_depth": len(depth_histogram) - 1,
+        "depth_histogram": depth_histogram,
+        "leaf_size_histogram": size_histogram,
+        "mean_leaf_size": float((sizes * size_histogram).sum() / n_leaves),
+        "overlap": overlap,
+        "mean_relative_overlap": relative_overlap / n_internal if n_internal else 0.0,
+        "n_overlapping": n_overlapping,
+        "sah_cost": tree_cost(nodes, node_bounds),
+        "nbytes": {name: array.nbytes for name, array in arrays.items()},
+    }
@@ -63,6 +63,14 @@ if STACK_ALLOCATE_STATIC_ARRAYS and os.environ.get("NUMBA_DISABLE_JIT", "0") ==
         arr = nb.carray(arr_ptr, MAX_TREE_DEPTH, dtype=IntDType)
         return arr
 
+    @nb.njit(inline="always")  # pragma: no cover
+    def allocate_float_stack():
+        arr_ptr = stack_empty(  # pylint: disable=no-value-for-parameter
+            MAX_TREE_DEPTH, FloatDType
+        )
+        arr = nb.carray(arr_ptr, MAX_TREE_DEPTH, dtype=FloatDType)
+        return arr
+
     @nb.njit(inline="always")  # pragma: no cover
     def allocate_polygon():
         arr_ptr = stack_empty(  # pylint: disable=no-value-for-parameter
@@ -91,6 +99,10 @@ else:
     def allocate_stack():
         return np.empty(MAX_TREE_DEPTH, dtype=IntDType)
 
+    @nb.njit(inline="always")
+    def allocate_float_stack():
+        return np.empty(MAX_TREE_DEPTH, dtype=FloatDType)
+
     @nb.njit(inline="always")
     def allocate_polygon():
         return np.empty((MAX_N_VERTEX, NDIM), dtype=FloatDType)
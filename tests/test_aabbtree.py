@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from numba_celltree import AABBTree2d
+
+
+def brute_force(bbox_coords, tree_coords):
+    a = bbox_coords[:, np.newaxis]
+    b = tree_coords[np.newaxis]
+    intersects = (
+        (a[..., 0] <= b[..., 1])
+        & (a[..., 1] >= b[..., 0])
+        & (a[..., 2] <= b[..., 3])
+        & (a[..., 3] >= b[..., 2])
+    )
+    return np.nonzero(intersects)
+
+
+def as_set(i, j):
+    return set(zip(i.tolist(), j.tolist()))
+
+
+@pytest.fixture
+def random_boxes():
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(0.0, 100.0, (1000, 2))
+    size = rng.uniform(0.0, 2.0, (1000, 2))
+    return np.column_stack(
+        [xy[:, 0], xy[:, 0] + size[:, 0], xy[:, 1], xy[:, 1] + size[:, 1]]
+    )
+
+
+def test_init_errors(random_boxes):
+    with pytest.raises(ValueError, match="bbox_coords must have shape"):
+        AABBTree2d(random_boxes[:, :3])
+    with pytest.raises(ValueError, match="xmin <= xmax"):
+        AABBTree2d(random_boxes[:, [1, 0, 2, 3]])
+    with pytest.raises(ValueError, match="n_buckets"):
+        AABBTree2d(random_boxes, n_buckets=1)
+    with pytest.raises(ValueError, match="builder"):
+        AABBTree2d(random_boxes, builder="octree")
+
+
+@pytest.mark.parametrize("builder", ["sah", "lbvh"])
+def test_locate_boxes(random_boxes, builder):
+    tree = AABBTree2d(random_boxes, builder=builder)
+    assert tree.validate_node_bounds().all()
+
+    rng = np.random.default_rng(1)
+    xy = rng.uniform(-5.0, 105.0, (200, 2))
+    boxes = np.column_stack([xy[:, 0], xy[:, 0] + 5.0, xy[:, 1], xy[:, 1] + 5.0])
+    actual = as_set(*tree.locate_boxes(boxes))
+    assert len(actual) > 0
+    assert actual == as_set(*brute_force(boxes, random_boxes))
+
+
+def test_locate_points():
+    # A point cloud: boxes of zero size.
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(0.0, 10.0, (500, 2))
+    tree = AABBTree2d(xy[:, [0, 0, 1, 1]], cells_per_leaf=4)
+    i, j = tree.locate_points(xy)
+    assert np.array_equal(i, np.arange(500))
+    assert np.array_equal(j, np.arange(500))
+
+    i, j = tree.locate_boxes(np.array([[2.0, 4.0, 2.0, 4.0]]))
+    inside = np.flatnonzero(((xy >= 2.0) & (xy <= 4.0)).all(axis=1))
+    assert np.array_equal(np.sort(j), inside)
+
+    i, j = tree.locate_points(np.array([[-1.0, -1.0]]))
+    assert i.size == 0
+    assert j.size == 0
+
+
+def test_touching_boxes():
+    # A raster of 4 by 4 cells.
+    x, y = np.meshgrid(np.arange(4.0), np.arange(4.0))
+    x = x.ravel()
+    y = y.ravel()
+    tree = AABBTree2d(np.column_stack([x, x + 1.0, y, y + 1.0]))
+    # The shared corner of four cells.
+    i, j = tree.locate_points(np.array([[1.0, 1.0]]))
+    assert np.array_equal(np.sort(j), [0, 1, 4, 5])
+    i, j = tree.locate_boxes(np.array([[0.25, 0.75, 1.0, 1.0]]))
+    assert np.array_equal(np.sort(j), [0, 4])
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from numba_celltree import demo
+from numba_celltree.adjacency import face_neighbors
+from numba_celltree.geometry_utils import faces_to_csr
+
+
+def brute_force(face_nodes, face_offsets, contained):
+    edges = {}
+    for i in np.flatnonzero(contained):
+        face = face_nodes[face_offsets[i] : face_offsets[i + 1]]
+        for a, b in zip(face, np.roll(face, -1)):
+            edges.setdefault(frozenset((a, b)), []).append(i)
+    neighbors = np.full(len(face_nodes), -1)
+    for i in np.flatnonzero(contained):
+        face = face_nodes[face_offsets[i] : face_offsets[i + 1]]
+        for k, (a, b) in enumerate(zip(face, np.roll(face, -1))):
+            shared = edges[frozenset((a, b))]
+            if len(shared) == 2:
+                neighbors[face_offsets[i] + k] = sum(shared) - i
+    return neighbors
+
+
+def test_face_neighbors():
+    vertices, faces = demo.generate_disk(5, 5)
+    face_nodes, face_offsets = faces_to_csr(faces.astype(np.intp))
+    contained = np.ones(len(faces), dtype=bool)
+    actual = face_neighbors(face_nodes, face_offsets, len(vertices), contained)
+    assert np.array_equal(actual, brute_force(face_nodes, face_offsets, contained))
+    # Every interior edge is shared by two faces.
+    assert (actual != -1).sum() == 2 * 175
+
+    contained[::3] = False
+    actual = face_neighbors(face_nodes, face_offsets, len(vertices), contained)
+    assert np.array_equal(actual, brute_force(face_nodes, face_offsets, contained))
+    assert not np.isin(actual, np.flatnonzero(~contained)).any()
+
+
+def test_face_neighbors_mixed():
+    # Two quadrangles and two triangles, sharing edges; and a non-manifold
+    # edge (0, 1) shared by three faces, which has no neighbors.
+    face_nodes = np.array([0, 1, 4, 3, 1, 2, 5, 4, 0, 1, 6, 1, 0, 7])
+    face_offsets = np.array([0, 4, 8, 11, 14])
+    contained = np.ones(4, dtype=bool)
+    actual = face_neighbors(face_nodes, face_offsets, 8, contained)
+    assert np.array_equal(
+        actual, [-1, 1, -1, -1, -1, -1, -1, 0, -1, -1, -1, -1, -1, -1]
+    )
+
+
+def test_face_neighbors_too_many_vertices():
+    face_nodes = np.array([0, 1, 2], dtype=np.intp)
+    face_offsets = np.array([0, 3], dtype=np.intp)
+    contained = np.ones(1, dtype=bool)
+    with pytest.raises(ValueError, match="overflow"):
+        face_neighbors(face_nodes, face_offsets, 4_000_000_000, contained)
@@ -4,6 +4,7 @@ import pytest
 from numba_celltree.algorithms import barycentric_triangle as bt
 from numba_celltree.algorithms import barycentric_wachspress as bwp
 from numba_celltree.constants import Point, Triangle, Vector
+from numba_celltree.geometry_utils import faces_to_csr
 
 
 def test_interp_edge_case():
@@ -44,10 +45,10 @@ def test_compute_weights_triangle():
 
 
 @pytest.mark.parametrize(
-    "barycentric_weights",
-    [bt.barycentric_triangle_weights, bwp.barycentric_wachspress_weights],
+    "barycentric_weights, args",
+    [(bt.barycentric_triangle_weights, ()), (bwp.barycentric_wachspress_weights, (3,))],
 )
-def test_barycentric_triangle_weights(barycentric_weights):
+def test_barycentric_triangle_weights(barycentric_weights, args):
     points = np.array(
         [
             [0.0, 0.0],
@@ -84,7 +85,10 @@ def test_barycentric_triangle_weights(barycentric_weights):
             [0.0, 0.0, 0.0],
         ]
     )
-    actual = barycentric_weights(points, face_indices, faces, vertices)
+    face_nodes, face_offsets = faces_to_csr(faces)
+    actual = barycentric_weights(
+        points, face_indices, face_nodes, face_offsets, vertices, *args
+    )
     assert np.allclose(actual, expected)
 
 
@@ -150,5 +154,8 @@ def test_barycentric_wachspress_weights():
             [0.0, 0.0, 0.0, 0.0],
         ]
     )
-    actual = bwp.barycentric_wachspress_weights(points, face_indices, faces, vertices)
+    face_nodes, face_offsets = faces_to_csr(faces)
+    actual = bwp.barycentric_wachspress_weights(
+        points, face_indices, face_nodes, face_offsets, vertices, 4
+    )
     assert np.allclose(actual, expected)
@@ -0,0 +1,60 @@
+import numpy as np
+
+from numba_celltree.algorithms import segment_segment_intersection
+from numba_celltree.constants import Point
+
+
+def test_crossing():
+    a = Point(0.0, 0.0)
+    b = Point(2.0, 2.0)
+    c = Point(0.0, 2.0)
+    d = Point(2.0, 0.0)
+    intersects, p = segment_segment_intersection(a, b, c, d)
+    assert intersects
+    assert np.allclose(p, (1.0, 1.0))
+    intersects, p = segment_segment_intersection(c, d, a, b)
+    assert intersects
+    assert np.allclose(p, (1.0, 1.0))
+
+
+def test_no_crossing():
+    a = Point(0.0, 0.0)
+    b = Point(1.0, 1.0)
+    # The lines intersect beyond the end of a -> b.
+    intersects, p = segment_segment_intersection(a, b, Point(3.0, 0.0), Point(0.0, 3.0))
+    assert not intersects
+    assert np.isnan(p).all()
+    # Parallel
+    intersects, _ = segment_segment_intersection(a, b, Point(1.0, 0.0), Point(2.0, 1.0))
+    assert not intersects
+    # Zero length
+    intersects, _ = segment_segment_intersection(a, a, a, b)
+    assert not intersects
+
+
+def test_touching():
+    a = Point(0.0, 0.0)
+    b = Point(1.0, 0.0)
+    intersects, p = segment_segment_intersection(a, b, Point(1.0, 0.0), Point(2.0, 1.0))
+    assert intersects
+    assert np.allclose(p, (1.0, 0.0))
+    intersects, p = segment_segment_intersection(a, b, Point(0.5, 0.0), Point(0.5, 1.0))
+    assert intersects
+    assert np.allclose(p, (0.5, 0.0))
+
+
+def test_collinear():
+    a = Point(0.0, 0.0)
+    b = Point(2.0, 0.0)
+    # Overlapping: the point of the overlap nearest to a.
+    intersects, p = segment_segment_intersection(a, b, Point(3.0, 0.0), Point(1.0, 0.0))
+    assert intersects
+    assert np.allclose(p, (1.0, 0.0))
+    intersects, p = segment_segment_intersection(
+        a, b, Point(-1.0, 0.0), Point(1.0, 0.0)
+    )
+    assert intersects
+    assert np.allclose(p, (0.0, 0.0))
+    # Disjoint
+    intersects, _ = segment_segment_intersection(a, b, Point(3.0, 0.0), Point(4.0, 0.0))
+    assert not intersects
@@ -4,6 +4,7 @@ from numba_celltree.algorithms.separating_axis import (
     polygons_intersect,
     separating_axes,
 )
+from numba_celltree.geometry_utils import faces_to_csr
 
 
 def test_triangles_intersect():
@@ -176,7 +177,12 @@ def test_polygons_intersect():
     indices_b = np.array([0, 1])
 
     actual = polygons_intersect(
-        vertices_a, vertices_b, faces_a, faces_b, indices_a, indices_b
+        vertices_a,
+        vertices_b,
+        *faces_to_csr(faces_a),
+        *faces_to_csr(faces_b),
+        indices_a,
+        indices_b,
     )
     expected = np.array([True, False])
     assert np.array_equal(actual, expected)
@@ -41,6 +41,7 @@ from numba_celltree.algorithms.sutherland_hodgman import (
     polygon_polygon_clip_area,
 )
 from numba_celltree.constants import FloatDType, Point, Vector
+from numba_celltree.geometry_utils import faces_to_csr
 
 A = np.array(
     [
@@ -194,7 +195,12 @@ def test_area_of_intersection():
     indices_a = np.arange(len(faces_a))
     indices_b = np.arange(len(faces_a))
     actual = area_of_intersection(
-        vertices_a, vertices_b, faces_a, faces_b, indices_a, indices_b
+        vertices_a,
+        vertices_b,
+        *faces_to_csr(faces_a),
+        *faces_to_csr(faces_b),
+        indices_a,
+        indices_b,
     )
     assert np.allclose(actual, EXPECTED)
 
@@ -226,7 +232,7 @@ def test_box_area_of_intersection():
     actual = box_area_of_intersection(
         box_coords,
         vertices,
-        faces,
+        *faces_to_csr(faces),
         indices_bbox,
         indices_face,
     )
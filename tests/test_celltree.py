@@ -5,7 +5,8 @@ import numpy as np
 import pytest
 
 from numba_celltree import CellTree2d, demo
-from numba_celltree.constants import MAX_N_VERTEX
+from numba_celltree.constants import MAX_N_VERTEX, NodeDType
+from numba_celltree.creation import pessimistic_n_nodes
 
 
 @pytest.fixture
@@ -162,11 +163,40 @@ def test_shape_errors():
     with pytest.raises(ValueError):
         tree.intersect_edges(edge_coords)
 
-    # Can't realistically test MAX_N_FACE: 2e9 faces requires enormous
-    # allocation.
-    faces = np.arange(MAX_N_VERTEX + 1).reshape((1, -1))
-    with pytest.raises(ValueError):
-        tree.intersect_faces(nodes2, faces, -1)
+
+@pytest.mark.parametrize("pack", [False, True])
+def test_large_faces(pack):
+    # A polygon with more vertices than fit the stack allocated arrays, and a
+    # triangle.
+    n = 2 * MAX_N_VERTEX
+    angle = np.linspace(0.0, 2.0 * np.pi, n, endpoint=False)
+    vertices = np.column_stack([np.cos(angle), np.sin(angle)])
+    vertices = np.concatenate([vertices, [[2.0, 0.0], [3.0, 0.0], [2.0, 1.0]]])
+    faces = np.full((2, n), -1)
+    faces[0] = np.arange(n)
+    faces[1, :3] = [n, n + 1, n + 2]
+    tree = CellTree2d(vertices, faces, -1, pack_polygons=pack)
+    expected_area = 0.5 * n * np.sin(2.0 * np.pi / n)
+
+    points = np.array([[0.0, 0.0], [0.95, 0.0], [2.2, 0.2], [1.5, 1.5]])
+    assert np.array_equal(tree.locate_points(points), [0, 0, 1, -1])
+
+    i, j, segments = tree.intersect_edges(np.array([[[-2.0, 0.0], [1.5, 0.0]]]))
+    assert np.array_equal(j, [0])
+    assert np.allclose(segments[0], [[-1.0, 0.0], [1.0, 0.0]])
+
+    i, j, area = tree.intersect_boxes(np.array([[-2.0, 2.0, -2.0, 2.0]]))
+    assert np.array_equal(j, [0])
+    assert np.allclose(area, expected_area)
+
+    i, j, area = tree.intersect_faces(vertices[:n], faces[:1], -1)
+    assert np.array_equal(j, [0])
+    assert np.allclose(area, expected_area)
+
+    face_indices, weights = tree.compute_barycentric_weights(points)
+    assert weights.shape == (4, n)
+    assert np.allclose(weights[:3].sum(axis=1), 1.0)
+    assert np.allclose(weights[0, :n], 1.0 / n)
 
 
 def test_bounds_errors():
@@ -612,3 +642,659 @@ def test_to_dict_of_lists(datadir):
     assert isinstance(d, dict)
     assert list(d.keys()) == list(range(len(tree.celltree_data.nodes)))
     assert max(len(v) for v in d.values()) == 2
+
+
+def test_borrow(tmp_path):
+    vertices, faces = disk()
+    faces = faces.astype(np.intp)
+    tree = CellTree2d(vertices, faces, -1)
+    assert tree.borrowed_arrays == ()
+    assert not np.shares_memory(tree.vertices, vertices)
+
+    # The faces of the copy have been made counter-clockwise. Padded faces
+    # are converted: only the vertices are borrowed.
+    borrowed = CellTree2d(tree.vertices, tree.faces, -1, copy=False)
+    assert borrowed.borrowed_arrays == ("vertices",)
+    assert borrowed.vertices is tree.vertices
+    assert np.array_equal(borrowed.nodes, tree.nodes)
+    borrowed = CellTree2d.from_csr(
+        tree.vertices, tree.face_nodes, tree.face_offsets, copy=False
+    )
+    assert borrowed.borrowed_arrays == ("vertices", "face_nodes", "face_offsets")
+    assert borrowed.face_nodes is tree.face_nodes
+    assert borrowed.face_offsets is tree.face_offsets
+    assert np.array_equal(borrowed.nodes, tree.nodes)
+
+    # Read-only memory mapped arrays
+    np.save(tmp_path / "vertices.npy", tree.vertices)
+    np.save(tmp_path / "faces.npy", tree.faces)
+    mapped_vertices = np.load(tmp_path / "vertices.npy", mmap_mode="r")
+    mapped_faces = np.load(tmp_path / "faces.npy", mmap_mode="r")
+    mapped = CellTree2d(mapped_vertices, mapped_faces, -1, copy=False)
+    assert mapped.vertices is mapped_vertices
+    points = np.array([[0.1, 0.1], [0.5, -0.5], [2.0, 2.0]])
+    assert np.array_equal(mapped.locate_points(points), tree.locate_points(points))
+
+    with pytest.raises(ValueError, match="C-contiguous array of dtype float64"):
+        CellTree2d(tree.vertices.astype(np.float32), tree.faces, -1, copy=False)
+    with pytest.raises(ValueError, match="C-contiguous array of dtype float64"):
+        CellTree2d(np.asfortranarray(tree.vertices), tree.faces, -1, copy=False)
+
+    # Padded faces are cast and made counter-clockwise, as when copying.
+    fill = np.full((len(tree.faces), 1), -999)
+    faces = np.column_stack([tree.faces[:, ::-1], fill]).astype(np.int32)
+    cast = CellTree2d(tree.vertices, faces, -999, copy=False)
+    assert cast.borrowed_arrays == ("vertices",)
+    assert np.array_equal(cast.locate_points(points), tree.locate_points(points))
+
+
+def test_from_csr():
+    # A mesh of triangles and quadrangles.
+    x, y = np.meshgrid(np.arange(5.0), np.arange(5.0))
+    vertices = np.column_stack([x.ravel(), y.ravel()])
+    a = (np.arange(4)[:, np.newaxis] * 5 + np.arange(4)).ravel()
+    fill = np.full(4, -1)
+    faces = np.concatenate(
+        [
+            np.column_stack([a[:4], a[:4] + 1, a[:4] + 6, fill]),
+            np.column_stack([a[:4], a[:4] + 6, a[:4] + 5, fill]),
+            np.column_stack([a[4:], a[4:] + 1, a[4:] + 6, a[4:] + 5]),
+        ]
+    )
+    tree = CellTree2d(vertices, faces, -1)
+    face_nodes = faces[faces != -1]
+    face_offsets = np.concatenate([[0], np.cumsum((faces != -1).sum(axis=1))])
+    assert np.array_equal(tree.face_nodes, face_nodes)
+    assert np.array_equal(tree.face_offsets, face_offsets)
+    assert np.array_equal(tree.faces, faces)
+    # The padded faces are created once, and read-only.
+    assert tree.faces is tree.faces
+    assert not tree.faces.flags.writeable
+    assert tree.n_face == len(faces)
+
+    csr_tree = CellTree2d.from_csr(vertices, face_nodes, face_offsets)
+    assert csr_tree.borrowed_arrays == ()
+    assert np.array_equal(csr_tree.nodes, tree.nodes)
+    assert np.array_equal(csr_tree.faces, faces)
+    points = np.random.default_rng(0).uniform(-1.0, 5.0, (100, 2))
+    assert np.array_equal(csr_tree.locate_points(points), tree.locate_points(points))
+    i, w = csr_tree.compute_barycentric_weights(points)
+    assert w.shape == (len(points), 4)
+    assert np.allclose(w[i != -1].sum(axis=1), 1.0)
+
+    with pytest.raises(ValueError, match="one dimensional"):
+        CellTree2d.from_csr(vertices, faces, face_offsets)
+    with pytest.raises(ValueError, match="must start at 0"):
+        CellTree2d.from_csr(vertices, face_nodes, face_offsets[:-1])
+    with pytest.raises(ValueError, match="at least 3 nodes"):
+        CellTree2d.from_csr(vertices, face_nodes[:5], [0, 3, 5])
+    with pytest.raises(ValueError, match="beyond the vertices"):
+        CellTree2d.from_csr(vertices, face_nodes - 1, face_offsets)
+    with pytest.raises(ValueError, match="C-contiguous array of dtype int"):
+        CellTree2d.from_csr(
+            vertices, face_nodes.astype(np.int32), face_offsets, copy=False
+        )
+
+
+def test_load_borrowed(tmp_path):
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    tree.save(tmp_path / "tree.bin")
+    assert len(CellTree2d.load(tmp_path / "tree.bin").borrowed_arrays) == 7
+    assert CellTree2d.load(tmp_path / "tree.bin", mmap=False).borrowed_arrays == ()
+
+
+def test_exact_size_nodes():
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    # The nodes do not keep the pre-allocated array alive.
+    assert not isinstance(tree.nodes.base, np.ndarray)
+    n_allocated = pessimistic_n_nodes(len(faces))
+    expected = (n_allocated - len(tree.nodes)) * NodeDType.itemsize
+    assert tree.node_bytes_saved == expected
+    assert tree.node_bytes_saved > 0
+    # With a single cell per leaf, the worst case is the exact size.
+    tree = CellTree2d(vertices, faces, -1, cells_per_leaf=1)
+    assert tree.node_bytes_saved == 0
+
+
+def test_update_vertices():
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    moved = vertices * np.array([1.5, 0.5]) + 0.1
+    expected = CellTree2d(moved, faces, -1)
+    points = np.random.default_rng(0).uniform(-1.0, 1.0, (100, 2))
+
+    assert not tree.update_vertices(moved)
+    assert np.array_equal(tree.vertices, moved)
+    assert np.array_equal(tree.bbox, expected.bbox)
+    assert tree.validate_node_bounds().all()
+    assert np.array_equal(tree.locate_points(points), expected.locate_points(points))
+
+    with pytest.raises(ValueError, match="vertices must have shape"):
+        tree.update_vertices(moved[:-1])
+
+
+def test_update_vertices_rebuild():
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    # Rotating the mesh mildly degrades the tree.
+    angle = 0.25 * np.pi
+    rotation = np.array(
+        [[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]]
+    )
+    assert not tree.update_vertices(vertices @ rotation.T, rebuild_threshold=2.0)
+    # Shuffling the vertices results in large, overlapping faces.
+    shuffled = vertices[np.random.default_rng(0).permutation(len(vertices))]
+    assert tree.update_vertices(shuffled, rebuild_threshold=2.0)
+    expected = CellTree2d(shuffled, faces, -1)
+    assert np.array_equal(tree.nodes, expected.nodes)
+
+
+def test_update_vertices_loaded(tmp_path):
+    vertices, faces = disk()
+    CellTree2d(vertices, faces, -1).save(tmp_path / "tree.bin")
+    tree = CellTree2d.load(tmp_path / "tree.bin")
+    tree.update_vertices(vertices + 1.0)
+    assert tree.borrowed_arrays == ("face_nodes", "face_offsets", "bb_indices")
+    assert tree.validate_node_bounds().all()
+
+
+def test_insert_remove_faces():
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    points = np.random.default_rng(0).uniform(-1.0, 1.0, (200, 2))
+    expected = tree.locate_points(points)
+
+    # Remove a third of the faces, then add them again as new faces.
+    removed = np.arange(0, len(faces), 3)
+    tree.remove_faces(removed)
+    actual = tree.locate_points(points)
+    inside = ~np.isin(expected, removed)
+    assert np.array_equal(actual[inside], expected[inside])
+    assert (actual[~inside] == -1).all()
+    with pytest.raises(ValueError, match="faces not in the tree"):
+        tree.remove_faces(removed[:1])
+
+    new = tree.insert_faces(np.empty((0, 2)), faces[removed], -1)
+    assert np.array_equal(new, np.arange(len(faces), len(faces) + len(removed)))
+    assert tree.validate_node_bounds().all()
+    actual = tree.locate_points(points)
+    assert np.array_equal(actual[inside], expected[inside])
+    renumbered = new[np.searchsorted(removed, expected[~inside])]
+    assert np.array_equal(actual[~inside], renumbered)
+
+    assert tree.rebalance()
+    assert tree.nodes.size == CellTree2d(vertices, faces, -1).nodes.size
+    assert np.array_equal(tree.locate_points(points)[inside], expected[inside])
+
+
+def test_insert_faces_outside():
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    square = np.array([[2.0, 2.0], [3.0, 2.0], [3.0, 3.0], [2.0, 3.0]])
+    n_vertex = len(vertices)
+    before = tree.faces
+    new = tree.insert_faces(square, [[n_vertex, n_vertex + 1, n_vertex + 2, -1]], -1)
+    assert tree.faces is not before
+    assert tree.faces.shape == (len(faces) + 1, 4)
+    assert tree.bbox[1] == 3.0
+    assert tree.locate_points(np.array([[2.8, 2.2]]))[0] == new[0]
+    assert tree.locate_points(np.array([[2.2, 2.8]]))[0] == -1
+
+
+def test_rebalance_threshold():
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    assert not tree.rebalance(rebuild_threshold=1.0)
+    # Doubling the number of faces in every leaf degrades the tree.
+    tree.insert_faces(np.empty((0, 2)), faces, -1)
+    assert not tree.rebalance(rebuild_threshold=100.0)
+    assert tree.rebalance(rebuild_threshold=1.2)
+
+
+def test_insert_remove_loaded(tmp_path):
+    vertices, faces = disk()
+    CellTree2d(vertices, faces, -1).save(tmp_path / "tree.bin")
+    tree = CellTree2d.load(tmp_path / "tree.bin")
+    tree.remove_faces([0, 1])
+    assert tree.borrowed_arrays == (
+        "vertices",
+        "face_nodes",
+        "face_offsets",
+        "bb_coords",
+        "bbox",
+    )
+    tree.insert_faces(np.empty((0, 2)), faces[:2], -1)
+    assert tree.borrowed_arrays == ()
+    assert tree.validate_node_bounds().all()
+
+
+def test_pack_polygons(tmp_path):
+    vertices, faces = disk()
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-1.0, 1.0, (200, 2))
+    edges = rng.uniform(-1.0, 1.0, (20, 2, 2))
+
+    def check(tree, packed):
+        located = tree.locate_points(points)
+        assert (located != -1).any()
+        assert np.array_equal(packed.locate_points(points), located)
+        for a, b in zip(packed.intersect_edges(edges), tree.intersect_edges(edges)):
+            assert np.array_equal(a, b)
+
+    tree = CellTree2d(vertices, faces, -1)
+    packed = CellTree2d(vertices, faces, -1, pack_polygons=True)
+    assert packed.polygon_offsets.size == packed.bb_indices.size + 1
+    assert tree.polygon_offsets.size == 0
+    check(tree, packed)
+
+    # The packed coordinates follow changes to the vertices and faces.
+    for t in (tree, packed):
+        t.update_vertices(vertices * 2.0)
+    check(tree, packed)
+    # Removing faces does not repack the coordinates; inserting faces appends
+    # theirs.
+    coords = packed.polygon_coords
+    for t in (tree, packed):
+        t.remove_faces(np.arange(0, len(faces), 4))
+    assert packed.polygon_coords is coords
+    check(tree, packed)
+    for t in (tree, packed):
+        t.insert_faces(np.empty((0, 2)), faces[:10], -1)
+        t.insert_faces(np.empty((0, 2)), faces[10:40], -1)
+        t.remove_faces(np.arange(len(faces), len(faces) + 40, 3))
+    assert np.array_equal(packed.polygon_coords[: len(coords)], coords)
+    check(tree, packed)
+    for t in (tree, packed):
+        t.rebalance()
+    assert packed.polygon_offsets.size == packed.bb_indices.size + 1
+    check(tree, packed)
+
+    path = tmp_path / "packed.bin"
+    packed.save(path)
+    loaded = CellTree2d.load(path)
+    assert loaded.pack_polygons
+    assert np.array_equal(loaded.polygon_coords, packed.polygon_coords)
+    check(tree, loaded)
+
+
+def test_single_pass_queries():
+    # Enough queries for several chunks of the single pass kernels. Small
+    # boxes and short edges fit the buffer, large and long ones outgrow it:
+    # mixed, a chunk outgrows it halfway.
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(-1.0, 1.0, (1000, 2))
+    direction = rng.uniform(-1.0, 1.0, (1000, 2))
+    for size in (0.02, 1.0, rng.choice([0.02, 1.0], 1000, p=[0.95, 0.05])):
+        boxes = np.column_stack([xy[:, 0], xy[:, 0] + size, xy[:, 1], xy[:, 1] + size])
+        edges = np.stack([xy, xy + np.atleast_1d(size)[:, np.newaxis] * direction], 1)
+        for name, data in (("locate_boxes", boxes), ("intersect_edges", edges)):
+            expected = getattr(tree, name)(data)
+            one_at_a_time = getattr(tree, name)(data, chunk_size=1)
+            actual = getattr(tree, name)(data, single_pass=True)
+            chunked = getattr(tree, name)(data, chunk_size=300, single_pass=True)
+            assert len(expected[0]) > 0
+            for a, b, c, d in zip(expected, one_at_a_time, actual, chunked):
+                assert np.array_equal(a, b)
+                assert np.array_equal(a, c)
+                assert np.array_equal(a, d)
+
+
+def test_count_queries():
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(-1.5, 1.5, (300, 2))
+    boxes = np.column_stack([xy[:, 0], xy[:, 0] + 0.5, xy[:, 1], xy[:, 1] + 0.5])
+    edges = rng.uniform(-1.5, 1.5, (300, 2, 2))
+    # Enough points for more than one block of count_points_per_face.
+    points = rng.uniform(-1.5, 1.5, (70_000, 2))
+
+    i, _ = tree.locate_boxes(boxes)
+    assert np.array_equal(tree.count_boxes(boxes), np.bincount(i, minlength=300))
+    i, _, _ = tree.intersect_edges(edges)
+    assert np.array_equal(tree.count_edges(edges), np.bincount(i, minlength=300))
+    located = tree.locate_points(points)
+    counts = tree.count_points_per_face(points)
+    assert counts.shape == (len(faces),)
+    expected = np.bincount(located[located != -1], minlength=len(faces))
+    assert np.array_equal(counts, expected)
+
+    # Removed faces are not counted.
+    tree.remove_faces(np.arange(0, len(faces), 2))
+    assert (tree.count_points_per_face(points)[::2] == 0).all()
+    i, _ = tree.locate_boxes(boxes)
+    assert np.array_equal(tree.count_boxes(boxes), np.bincount(i, minlength=300))
+
+    assert tree.count_boxes(np.empty((0, 4))).shape == (0,)
+    assert tree.count_edges(np.empty((0, 2, 2))).shape == (0,)
+    assert (tree.count_points_per_face(np.empty((0, 2))) == 0).all()
+
+
+def test_chunked_queries(tmp_path):
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-1.0, 1.0, (100, 2))
+    xy = rng.uniform(-1.0, 1.0, (50, 2))
+    boxes = np.column_stack([xy[:, 0], xy[:, 0] + 0.3, xy[:, 1], xy[:, 1] + 0.3])
+    edges = rng.uniform(-1.0, 1.0, (50, 2, 2))
+    other_vertices, other_faces = demo.generate_disk(4, 3)
+
+    # The input may be memory mapped.
+    np.save(tmp_path / "points.npy", points)
+    mapped_points = np.load(tmp_path / "points.npy", mmap_mode="r")
+
+    queries = [
+        ("locate_points", (points,)),
+        ("locate_points", (mapped_points,)),
+        ("locate_boxes", (boxes,)),
+        ("intersect_boxes", (boxes,)),
+        ("intersect_faces", (other_vertices, other_faces, -1)),
+        ("intersect_edges", (edges,)),
+    ]
+    for name, args in queries:
+        expected = getattr(tree, name)(*args)
+        for kwargs in ({"chunk_size": 7}, {"memory_budget": 500}):
+            actual = getattr(tree, name)(*args, **kwargs)
+            chunks = list(getattr(tree, f"iter_{name}")(*args, **kwargs))
+            assert len(chunks) > 1
+            if name == "locate_points":
+                assert np.array_equal(actual, expected)
+                assert np.array_equal(np.concatenate(chunks), expected)
+            else:
+                for a, b in zip(actual, expected):
+                    assert np.allclose(a, b)
+
+    # A single chunk without arguments, and for empty input.
+    assert len(list(tree.iter_locate_boxes(boxes))) == 1
+    i, j = tree.locate_boxes(np.empty((0, 4)), chunk_size=10)
+    assert i.shape == j.shape == (0,)
+
+    with pytest.raises(ValueError, match="either chunk_size or memory_budget"):
+        tree.locate_points(points, chunk_size=10, memory_budget=1000)
+    with pytest.raises(ValueError, match="chunk_size must be >= 1"):
+        tree.iter_locate_points(points, chunk_size=0)
+    with pytest.raises(ValueError, match="memory_budget must be >= 1"):
+        tree.iter_locate_boxes(boxes, memory_budget=0)
+    with pytest.raises(ValueError, match="bbox_coords must have shape"):
+        tree.iter_locate_boxes(points, chunk_size=10)
+
+
+def test_locate_points_sorted():
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    points = np.random.default_rng(0).uniform(-1.5, 1.5, (1000, 2))
+    expected = tree.locate_points(points)
+    assert (expected == -1).any()
+    assert np.array_equal(tree.locate_points(points, sort="morton"), expected)
+    assert np.array_equal(
+        tree.locate_points(points, chunk_size=300, sort="morton"), expected
+    )
+    assert tree.locate_points(np.empty((0, 2)), sort="morton").shape == (0,)
+    with pytest.raises(ValueError, match="sort must be one of"):
+        tree.locate_points(points, sort="hilbert")
+
+
+def test_locate_points_hint():
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    neighbors = tree.face_neighbors
+    assert neighbors.shape == tree.face_nodes.shape
+    assert tree.face_neighbors is neighbors
+
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-1.0, 1.0, (1000, 2))
+    expected = tree.locate_points(points)
+    moved = points + rng.uniform(-0.05, 0.05, points.shape)
+    expected_moved = tree.locate_points(moved)
+    # A good, a poor, and no hint.
+    for hint in (expected, np.roll(expected, 1), np.full(len(points), -1)):
+        assert np.array_equal(tree.locate_points(moved, hint=hint), expected_moved)
+    assert np.array_equal(
+        tree.locate_points(moved, hint=expected, sort="morton"), expected_moved
+    )
+    assert np.array_equal(
+        tree.locate_points(moved, hint=expected, chunk_size=300), expected_moved
+    )
+
+    # Moving the vertices keeps the adjacency, also when rebuilding.
+    original = tree.vertices
+    tree.update_vertices(original * 1.5)
+    assert tree.face_neighbors is neighbors
+    assert np.array_equal(
+        tree.locate_points(moved * 1.5, hint=expected), expected_moved
+    )
+    tree.update_vertices(original, rebuild_threshold=0.0)
+    assert tree.face_neighbors is neighbors
+
+    # Removed faces are not returned, also when hinted.
+    removed = np.unique(expected[expected != -1])[::2]
+    tree.remove_faces(removed)
+    assert tree.face_neighbors is not neighbors
+    actual = tree.locate_points(points, hint=expected)
+    assert np.array_equal(actual, tree.locate_points(points))
+    assert not np.isin(actual, removed).any()
+
+    with pytest.raises(ValueError, match=r"hint must have shape \(1000,\)"):
+        tree.locate_points(points, hint=expected[:10])
+    with pytest.raises(ValueError, match="hint contains indices beyond the faces"):
+        tree.locate_points(points, hint=np.full(len(points), len(faces)))
+
+
+def test_locate_trajectories():
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    rng = np.random.default_rng(0)
+    start = rng.uniform(-1.0, 1.0, (500, 2))
+    trajectories = start + np.cumsum(rng.uniform(-0.1, 0.1, (20, 500, 2)), axis=0)
+    actual = tree.locate_trajectories(trajectories)
+    assert actual.shape == (20, 500)
+    # Particles leave and enter the mesh.
+    assert (actual == -1).any()
+    for points, faces_found in zip(trajectories, actual):
+        assert np.array_equal(faces_found, tree.locate_points(points))
+    hinted = tree.locate_trajectories(trajectories, hint=actual[0])
+    assert np.array_equal(hinted, actual)
+
+    with pytest.raises(ValueError, match="points must have shape"):
+        tree.locate_trajectories(start)
+
+
+def test_locate_points_walk():
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    rng = np.random.default_rng(0)
+    t = np.linspace(0.0, 1.0, 2000)
+    transect = np.column_stack([1.2 * np.cos(8 * t), 1.2 * t * np.sin(8 * t)])
+    random_points = rng.uniform(-1.2, 1.2, (1000, 2))
+    for points in (transect, random_points):
+        expected = tree.locate_points(points)
+        assert (expected == -1).any()
+        for kwargs in (
+            {},
+            {"sort": "morton"},
+            {"chunk_size": 300},
+            {"hint": np.roll(expected, 10)},
+        ):
+            actual = tree.locate_points(points, method="walk", **kwargs)
+            assert np.array_equal(actual, expected)
+
+    # Points on edges may be found in either face.
+    points = vertices[faces[:, :2]].mean(axis=1)
+    actual = tree.locate_points(points, method="walk")
+    found = actual != -1
+    assert np.array_equal(found, tree.locate_points(points) != -1)
+    points = points[found]
+    actual = actual[found]
+    a, b, c = np.moveaxis(vertices[faces[actual]], 1, 0)
+    det = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (
+        c[:, 0] - a[:, 0]
+    )
+    for u, v in ((a, b), (b, c), (c, a)):
+        cross = (v[:, 0] - u[:, 0]) * (points[:, 1] - u[:, 1]) - (v[:, 1] - u[:, 1]) * (
+            points[:, 0] - u[:, 0]
+        )
+        assert (cross * np.sign(det) > -1e-12).all()
+
+    tree.remove_faces(np.arange(0, len(faces), 3))
+    expected = tree.locate_points(transect)
+    assert np.array_equal(tree.locate_points(transect, method="walk"), expected)
+
+    with pytest.raises(ValueError, match="method must be one of"):
+        tree.locate_points(transect, method="bfs")
+
+
+def test_locate_points_walk_mixed():
+    # A mesh of triangles, quadrangles, and a face of many nodes.
+    x, y = np.meshgrid(np.arange(6.0), np.arange(6.0))
+    vertices = np.column_stack([x.ravel(), y.ravel()])
+    quads = []
+    for i in range(5):
+        for j in range(5):
+            a = i * 6 + j
+            if i == 0:
+                continue
+            if j % 2 == 0:
+                quads.append([a, a + 1, a + 7, a + 6])
+            else:
+                quads.append([a, a + 1, a + 7, -1])
+                quads.append([a, a + 7, a + 6, -1])
+    faces = np.array(quads)
+    # The first row, as a single face.
+    bottom = [0, 1, 2, 3, 4, 5, 11, 10, 9, 8, 7, 6]
+    nodes = np.concatenate([faces[faces != -1], bottom])
+    lengths = np.concatenate([(faces != -1).sum(axis=1), [len(bottom)]])
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    tree = CellTree2d.from_csr(vertices, nodes, offsets)
+    t = np.linspace(0.0, 1.0, 500)
+    points = np.column_stack([5.0 * t, 2.5 + 2.4 * np.sin(10 * t)])
+    expected = tree.locate_points(points)
+    assert (expected == len(lengths) - 1).any()
+    assert np.array_equal(tree.locate_points(points, method="walk"), expected)
+
+
+def segment_distances(points, a, b):
+    # Distance from every point to every segment a -> b.
+    p = points[:, np.newaxis]
+    v = b - a
+    t = np.clip(((p - a) * v).sum(axis=-1) / (v * v).sum(axis=-1), 0.0, 1.0)
+    return np.linalg.norm(p - (a + t[..., np.newaxis] * v), axis=-1)
+
+
+def brute_force_face_distances(points, vertices, faces):
+    # The distance from every point to every (triangular) face.
+    distances = np.full((len(points), len(faces)), np.inf)
+    for k in range(3):
+        a = vertices[faces[:, k]]
+        b = vertices[faces[:, (k + 1) % 3]]
+        distances = np.minimum(distances, segment_distances(points, a, b))
+    a, b, c = (vertices[faces[:, k]] for k in range(3))
+    inside = np.ones(distances.shape, dtype=bool)
+    for u, v in ((a, b), (b, c), (c, a)):
+        cross = (v[:, 0] - u[:, 0]) * (points[:, 1, np.newaxis] - u[:, 1]) - (
+            v[:, 1] - u[:, 1]
+        ) * (points[:, 0, np.newaxis] - u[:, 0])
+        inside &= cross >= 0.0
+    distances[inside] = 0.0
+    return distances
+
+
+def test_locate_nearest_faces():
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    points = np.random.default_rng(0).uniform(-2.0, 2.0, (500, 2))
+    indices, distances = tree.locate_nearest_faces(points)
+    assert (indices != -1).all()
+    expected = brute_force_face_distances(points, tree.vertices, tree.faces)
+    assert np.allclose(distances, expected.min(axis=1))
+    assert np.allclose(expected[np.arange(len(points)), indices], distances)
+    # Inside the mesh, the face is the one of locate_points.
+    inside = tree.locate_points(points)
+    assert np.array_equal(indices[inside != -1], inside[inside != -1])
+    assert (distances[inside != -1] == 0.0).all()
+
+    indices, distances = tree.locate_nearest_faces(points, max_distance=0.25)
+    expected_min = expected.min(axis=1)
+    within = expected_min <= 0.25
+    assert (indices[within] != -1).all()
+    assert (indices[~within] == -1).all()
+    assert np.isnan(distances[~within]).all()
+
+    # Removed faces are not found.
+    tree.remove_faces(np.arange(0, len(faces), 2))
+    indices, distances = tree.locate_nearest_faces(points)
+    expected = expected[:, 1::2]
+    assert (indices % 2 == 1).all()
+    assert np.allclose(distances, expected.min(axis=1))
+
+    with pytest.raises(ValueError, match="max_distance"):
+        tree.locate_nearest_faces(points, max_distance=-1.0)
+
+
+def test_locate_k_nearest():
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    points = np.random.default_rng(0).uniform(-2.0, 2.0, (500, 2))
+    expected = brute_force_face_distances(points, tree.vertices, tree.faces)
+    indices, distances = tree.locate_k_nearest(points, 5)
+    assert indices.shape == distances.shape == (500, 5)
+    assert (indices != -1).all()
+    assert np.allclose(distances, np.sort(expected, axis=1)[:, :5])
+    assert np.allclose(np.take_along_axis(expected, indices, axis=1), distances)
+    assert (np.diff(distances, axis=1) >= 0.0).all()
+    # The nearest face is the one of locate_nearest_faces.
+    _, nearest = tree.locate_nearest_faces(points)
+    assert np.allclose(distances[:, 0], nearest)
+
+    # Fewer faces than k are found within max_distance.
+    indices, distances = tree.locate_k_nearest(points, 200, max_distance=0.5)
+    n_within = (expected <= 0.5).sum(axis=1)
+    assert ((indices != -1).sum(axis=1) == n_within).all()
+    assert np.array_equal(np.isnan(distances), indices == -1)
+
+    with pytest.raises(ValueError, match="k must be"):
+        tree.locate_k_nearest(points, 0)
+    with pytest.raises(ValueError, match="max_distance"):
+        tree.locate_k_nearest(points, 1, max_distance=-1.0)
+
+
+def test_locate_within_distance():
+    vertices, faces = disk()
+    tree = CellTree2d(vertices, faces, -1)
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-2.0, 2.0, (500, 2))
+    expected = brute_force_face_distances(points, tree.vertices, tree.faces)
+
+    # The large radius outgrows the buffer of the single pass.
+    for radius in (0.0, 0.3, rng.uniform(0.0, 1.0, 500), 3.0):
+        offsets, indices, distances = tree.locate_within_distance(points, radius)
+        assert offsets.shape == (501,)
+        assert offsets[-1] == len(indices) == len(distances)
+        within = expected <= np.broadcast_to(radius, 500)[:, np.newaxis]
+        assert np.array_equal(np.diff(offsets), within.sum(axis=1))
+        point_indices = np.repeat(np.arange(500), np.diff(offsets))
+        assert within[point_indices, indices].all()
+        assert np.allclose(expected[point_indices, indices], distances)
+
+        single = tree.locate_within_distance(points, radius, single_pass=True)
+        for actual, desired in zip(single, (offsets, indices, distances)):
+            assert np.array_equal(actual, desired)
+
+    # Removed faces are not found.
+    tree.remove_faces(np.arange(0, len(faces), 2))
+    _, indices, _ = tree.locate_within_distance(points, 0.5)
+    assert (indices % 2 == 1).all()
+
+    for single_pass in (False, True):
+        offsets, indices, distances = tree.locate_within_distance(
+            np.empty((0, 2)), 1.0, single_pass=single_pass
+        )
+        assert np.array_equal(offsets, [0])
+        assert indices.size == distances.size == 0
+
+    with pytest.raises(ValueError, match="radius"):
+        tree.locate_within_distance(points, -1.0)
@@ -0,0 +1,140 @@
+import numba as nb
+import numpy as np
+import pytest
+
+from numba_celltree import CellTree2d
+from numba_celltree import creation as cr
+from numba_celltree.constants import BucketDType, BuildNodeDType, IntDType
+from numba_celltree.geometry_utils import build_bboxes, faces_to_csr
+
+
+def triangle_grid(n):
+    x = np.linspace(0.0, 1.0, n + 1)
+    xx, yy = np.meshgrid(x, x, indexing="ij")
+    vertices = np.column_stack([xx.ravel(), yy.ravel()])
+    a = (np.arange(n)[:, None] * (n + 1) + np.arange(n)[None, :]).ravel()
+    lower = np.column_stack([a, a + n + 1, a + n + 2])
+    upper = np.column_stack([a, a + n + 2, a + 1])
+    return vertices, np.concatenate([lower, upper])
+
+
+def build_tree(vertices, faces, n_buckets, cells_per_leaf, n_subtree):
+    bb_coords = build_bboxes(*faces_to_csr(faces), vertices)
+    bb_indices = np.arange(len(faces), dtype=IntDType)
+    nodes = np.empty(cr.pessimistic_n_nodes(len(faces)), dtype=BuildNodeDType)
+    node_index = cr.push_node(nodes, cr.create_node(0, len(faces), False), 0)
+    n_node = cr.build(
+        nodes,
+        node_index,
+        bb_indices,
+        bb_coords,
+        np.empty(0, dtype=IntDType),
+        n_buckets,
+        cells_per_leaf,
+        n_subtree,
+    )
+    return nodes[:n_node], bb_indices
+
+
+@pytest.mark.parametrize("n_buckets, cells_per_leaf", [(2, 1), (4, 2), (8, 3)])
+def test_build_subtrees(n_buckets, cells_per_leaf):
+    # The tree should not depend on the number of subtrees built in parallel.
+    vertices, faces = triangle_grid(12)
+    faces = faces[np.random.default_rng(0).permutation(len(faces))]
+    expected_nodes, expected_indices = build_tree(
+        vertices, faces, n_buckets, cells_per_leaf, 1
+    )
+    for n_subtree in (2, 5, 16, 1000):
+        nodes, bb_indices = build_tree(
+            vertices, faces, n_buckets, cells_per_leaf, n_subtree
+        )
+        assert np.array_equal(nodes, expected_nodes)
+        assert np.array_equal(bb_indices, expected_indices)
+
+
+def test_build_thread_count_invariant():
+    vertices, faces = triangle_grid(20)
+    n_threads = nb.get_num_threads()
+    try:
+        nb.set_num_threads(1)
+        serial = CellTree2d(vertices, faces, -1)
+    finally:
+        nb.set_num_threads(n_threads)
+    parallel = CellTree2d(vertices, faces, -1)
+    assert np.array_equal(serial.nodes, parallel.nodes)
+    assert np.array_equal(serial.bb_indices, parallel.bb_indices)
+    assert parallel.validate_node_bounds().all()
+
+
+def test_sort_bbox_indices():
+    rng = np.random.default_rng(0)
+    lower = rng.uniform(0.0, 10.0, 50)
+    bb_coords = np.zeros((50, 4))
+    bb_coords[:, 0] = lower
+    bb_coords[:, 1] = lower + 1.0
+    bb_indices = np.arange(50, dtype=IntDType)
+    work = np.empty(50, dtype=IntDType)
+    buckets = np.zeros(4, dtype=BucketDType)
+    range_Rmin = bb_coords[:, 0].min() + 0.5
+    bucket_length = (bb_coords[:, 1].max() - 0.5 - range_Rmin) / 4
+    node = cr.create_node(0, 50, 0)
+    cr.sort_bbox_indices(
+        bb_indices, bb_coords, work, buckets, node, 0, range_Rmin, bucket_length
+    )
+
+    # Every bucket holds the indices of its centroids, in their original order.
+    centroids = lower + 0.5
+    expected = np.minimum(((centroids - range_Rmin) // bucket_length), 3)
+    assert np.array_equal(buckets["size"], np.bincount(expected.astype(int)))
+    assert np.array_equal(
+        buckets["index"], np.cumsum(buckets["size"]) - buckets["size"]
+    )
+    assert np.array_equal(bb_indices, np.argsort(expected, kind="stable"))
+    for bucket, j in zip(buckets, range(4)):
+        selection = expected == j
+        assert bucket["Rmin"] == bb_coords[selection, 0].min()
+        assert bucket["Lmax"] == bb_coords[selection, 1].max()
+
+
+def test_build_degenerate_range():
+    # All centroids coincide: the node cannot be split and becomes a leaf.
+    vertices = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+    faces = np.array([[0, 1, 2, 3]] * 4)
+    tree = CellTree2d(vertices, faces, -1, cells_per_leaf=1)
+    assert tree.nodes.size == 1
+    assert tree.locate_points(np.array([[0.5, 0.5]]))[0] == 0
+
+
+def test_pack_nodes():
+    vertices, faces = triangle_grid(12)
+    build_nodes, _ = build_tree(vertices, faces, 4, 2, 1)
+    nodes = cr.pack_nodes(build_nodes, build_nodes.size)
+    assert nodes.itemsize == 24
+    leaf = build_nodes["child"] == -1
+    assert (nodes["child"][leaf] == -1).all()
+    assert np.array_equal(nodes["ptr"][leaf], build_nodes["ptr"][leaf])
+    assert np.array_equal(nodes["size"][leaf], build_nodes["size"][leaf])
+    internal = ~leaf
+    assert np.array_equal(nodes["child"][internal] >> 1, build_nodes["child"][internal])
+    assert np.array_equal(nodes["child"][internal] & 1, build_nodes["dim"][internal])
+    assert np.array_equal(nodes["Lmax"][internal], build_nodes["Lmax"][internal])
+    assert np.array_equal(nodes["Rmin"][internal], build_nodes["Rmin"][internal])
+
+
+def test_pack_polygons():
+    vertices, faces = triangle_grid(6)
+    faces = np.column_stack([faces, np.full(len(faces), -1)])
+    faces[0] = [0, 1, 8, 7]
+    face_nodes, face_offsets = faces_to_csr(faces)
+    nodes, bb_indices, _ = cr.initialize(
+        vertices, face_nodes, face_offsets, cells_per_leaf=3
+    )
+    coords, offsets = cr.pack_polygons(
+        nodes, bb_indices, face_nodes, face_offsets, vertices
+    )
+    assert offsets.size == bb_indices.size + 1
+    assert coords.shape == (offsets[-1], 2)
+    for i, face_index in enumerate(bb_indices):
+        face = faces[face_index]
+        face = face[face != -1]
+        assert np.array_equal(coords[offsets[i] : offsets[i + 1]], vertices[face])
@@ -0,0 +1,149 @@
+import numpy as np
+import pytest
+
+from numba_celltree import EdgeTree2d, demo
+
+
+@pytest.fixture
+def network():
+    # The edges of a mesh: many edges share vertices, and many are horizontal
+    # or vertical.
+    vertices, faces = demo.generate_disk(5, 5)
+    edge_nodes = demo.edges(faces, -1)
+    return vertices, edge_nodes
+
+
+def distance(p, a, b):
+    V = b - a
+    t = np.clip(((p - a) * V).sum(axis=-1) / (V * V).sum(axis=-1), 0.0, 1.0)
+    return np.linalg.norm(p - (a + t[..., np.newaxis] * V), axis=-1)
+
+
+def brute_force_nearest(points, vertices, edge_nodes):
+    a = vertices[edge_nodes[:, 0]][np.newaxis]
+    b = vertices[edge_nodes[:, 1]][np.newaxis]
+    return distance(points[:, np.newaxis], a, b).min(axis=1)
+
+
+def test_init_errors(network):
+    vertices, edge_nodes = network
+    with pytest.raises(ValueError, match="edge_nodes must have shape"):
+        EdgeTree2d(vertices, edge_nodes[:, :1])
+    with pytest.raises(ValueError, match="beyond the vertices"):
+        EdgeTree2d(vertices, edge_nodes + len(vertices))
+    with pytest.raises(ValueError, match="cells_per_leaf"):
+        EdgeTree2d(vertices, edge_nodes, cells_per_leaf=0)
+
+
+@pytest.mark.parametrize("builder", ["sah", "lbvh"])
+def test_locate_boxes(network, builder):
+    vertices, edge_nodes = network
+    tree = EdgeTree2d(vertices, edge_nodes, builder=builder)
+    assert tree.validate_node_bounds().all()
+    box = np.array([[-0.25, 0.25, -0.25, 0.25], [2.0, 3.0, 2.0, 3.0]])
+    i, j = tree.locate_boxes(box)
+    assert (i == 0).all()
+    # Every found edge has a point in the box.
+    xy = vertices[edge_nodes[j]]
+    t = np.linspace(0.0, 1.0, 1001)[np.newaxis, :, np.newaxis]
+    p = xy[:, :1] + t * (xy[:, 1:] - xy[:, :1])
+    inside = (
+        (p[..., 0] >= -0.25)
+        & (p[..., 0] <= 0.25)
+        & (p[..., 1] >= -0.25)
+        & (p[..., 1] <= 0.25)
+    )
+    assert inside.any(axis=1).all()
+    # Every edge with a vertex in the box is found.
+    within = (np.abs(vertices) <= 0.25).all(axis=1)
+    expected = np.flatnonzero(within[edge_nodes].any(axis=1))
+    assert np.isin(expected, j).all()
+
+
+def test_locate_boxes_axis_parallel():
+    vertices = np.array([[0.0, 0.0], [2.0, 0.0], [2.0, 2.0]])
+    edge_nodes = np.array([[0, 1], [1, 2], [0, 2]])
+    tree = EdgeTree2d(vertices, edge_nodes)
+    i, j = tree.locate_boxes(np.array([[0.5, 1.5, -0.5, 0.2]]))
+    assert np.array_equal(j, [0])
+    i, j = tree.locate_boxes(np.array([[0.1, 1.5, -0.5, 0.2]]))
+    assert np.array_equal(np.sort(j), [0, 2])
+    # Touching the boundary of the box.
+    i, j = tree.locate_boxes(np.array([[2.0, 3.0, 0.5, 1.0]]))
+    assert np.array_equal(j, [1])
+    # Inside of the bounding box of the diagonal edge, but not on the edge.
+    i, j = tree.locate_boxes(np.array([[1.5, 1.9, 0.1, 0.5]]))
+    assert j.size == 0
+
+
+def test_intersect_edges():
+    # A river network with a confluence, crossed by a road.
+    vertices = np.array([[0.0, 0.0], [1.0, 1.0], [2.0, 0.0], [1.0, 3.0]])
+    edge_nodes = np.array([[0, 1], [2, 1], [1, 3]])
+    tree = EdgeTree2d(vertices, edge_nodes, cells_per_leaf=1)
+    edge_coords = np.array(
+        [
+            [[0.0, 0.5], [2.0, 0.5]],
+            [[0.0, 2.0], [2.0, 2.0]],
+            [[5.0, 5.0], [6.0, 6.0]],
+        ]
+    )
+    i, j, xy = tree.intersect_edges(edge_coords)
+    order = np.lexsort((j, i))
+    assert np.array_equal(i[order], [0, 0, 1])
+    assert np.array_equal(j[order], [0, 1, 2])
+    assert np.allclose(xy[order], [[0.5, 0.5], [1.5, 0.5], [1.0, 2.0]])
+
+
+def test_intersect_edges_random():
+    rng = np.random.default_rng(0)
+    tree_coords = rng.uniform(0.0, 10.0, (200, 2, 2))
+    vertices = tree_coords.reshape((-1, 2))
+    edge_nodes = np.arange(400).reshape((200, 2))
+    tree = EdgeTree2d(vertices, edge_nodes)
+    edge_coords = rng.uniform(0.0, 10.0, (50, 2, 2))
+    i, j, _ = tree.intersect_edges(edge_coords)
+
+    def orientation(p, q, r):
+        return np.sign(
+            (q[..., 0] - p[..., 0]) * (r[..., 1] - p[..., 1])
+            - (q[..., 1] - p[..., 1]) * (r[..., 0] - p[..., 0])
+        )
+
+    a = edge_coords[:, np.newaxis, 0]
+    b = edge_coords[:, np.newaxis, 1]
+    c = tree_coords[np.newaxis, :, 0]
+    d = tree_coords[np.newaxis, :, 1]
+    crosses = (orientation(a, b, c) != orientation(a, b, d)) & (
+        orientation(c, d, a) != orientation(c, d, b)
+    )
+    expected = set(zip(*np.nonzero(crosses)))
+    assert len(expected) > 0
+    assert set(zip(i.tolist(), j.tolist())) == expected
+
+
+@pytest.mark.parametrize("cells_per_leaf", [1, 4])
+def test_locate_nearest_edges(network, cells_per_leaf):
+    vertices, edge_nodes = network
+    tree = EdgeTree2d(vertices, edge_nodes, cells_per_leaf=cells_per_leaf)
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-2.0, 2.0, (500, 2))
+    indices, distances = tree.locate_nearest_edges(points)
+    assert (indices >= 0).all()
+    expected = brute_force_nearest(points, vertices, edge_nodes)
+    assert np.allclose(distances, expected)
+    found = edge_nodes[indices]
+    actual = distance(points, vertices[found[:, 0]], vertices[found[:, 1]])
+    assert np.allclose(actual, expected)
+
+
+def test_locate_nearest_edges_max_distance():
+    vertices = np.array([[0.0, 0.0], [1.0, 0.0]])
+    tree = EdgeTree2d(vertices, np.array([[0, 1]]))
+    points = np.array([[0.5, 0.5], [0.5, 2.0], [3.0, 0.0]])
+    indices, distances = tree.locate_nearest_edges(points, max_distance=1.0)
+    assert np.array_equal(indices, [0, -1, -1])
+    assert np.allclose(distances[0], 0.5)
+    assert np.isnan(distances[1:]).all()
+    with pytest.raises(ValueError, match="max_distance"):
+        tree.locate_nearest_edges(points, max_distance=-1.0)
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from numba_celltree import CellTree2d, CellTreeForest, demo
+
+
+def as_set(*arrays):
+    return set(zip(*(a.tolist() for a in arrays)))
+
+
+@pytest.fixture
+def grid():
+    vertices, faces = demo.generate_disk(5, 5)
+    return vertices, faces
+
+
+@pytest.fixture
+def forest(grid, tmp_path):
+    vertices, faces = grid
+    return CellTreeForest.build(
+        tmp_path / "forest", vertices, faces, -1, max_faces_per_partition=16
+    )
+
+
+def test_build(grid, forest):
+    vertices, faces = grid
+    assert forest.n_face == len(faces)
+    assert forest.n_partition == 8
+    assert np.array_equal(np.sort(forest.face_indices), np.arange(len(faces)))
+    assert forest.resident_partitions == ()
+    for k in range(forest.n_partition):
+        tree = forest.partition(k)
+        assert tree.n_face <= 16
+        assert tree.validate_node_bounds().all()
+
+
+def test_build_errors(grid, tmp_path):
+    vertices, faces = grid
+    with pytest.raises(ValueError, match="max_faces_per_partition"):
+        CellTreeForest.build(tmp_path, vertices, faces, -1, max_faces_per_partition=0)
+    with pytest.raises(ValueError, match="n_buckets"):
+        CellTreeForest.build(tmp_path, vertices, faces, -1, n_buckets=1)
+    with pytest.raises(ValueError, match="faces must have shape"):
+        CellTreeForest.build(tmp_path, vertices, faces.ravel(), -1)
+    with pytest.raises(ValueError, match="max_resident"):
+        CellTreeForest.build(tmp_path, vertices, faces, -1, max_resident=0)
+
+
+def test_open(grid, forest, tmp_path):
+    vertices, faces = grid
+    reopened = CellTreeForest(forest.path, max_resident=2)
+    assert reopened.n_face == forest.n_face
+    assert np.array_equal(reopened.partition_bboxes, forest.partition_bboxes)
+
+    tree = CellTree2d(vertices, faces, -1)
+    tree.save(tmp_path / "forest.bin")
+    with pytest.raises(ValueError, match="does not contain a forest"):
+        CellTreeForest(tmp_path)
+
+
+def test_locate_points(grid, forest):
+    tree = CellTree2d(*grid, -1)
+    points = np.random.default_rng(0).uniform(-1.2, 1.2, (1000, 2))
+    actual = forest.locate_points(points)
+    assert (actual != -1).any()
+    assert (actual == -1).any()
+    assert np.array_equal(actual, tree.locate_points(points))
+
+
+def test_locate_boxes(grid, forest):
+    tree = CellTree2d(*grid, -1)
+    xy = np.random.default_rng(0).uniform(-1.2, 1.2, (100, 2))
+    boxes = np.column_stack([xy[:, 0], xy[:, 0] + 0.2, xy[:, 1], xy[:, 1] + 0.2])
+    i, j = forest.locate_boxes(boxes)
+    assert len(i) > 0
+    assert (np.diff(i) >= 0).all()
+    assert as_set(i, j) == as_set(*tree.locate_boxes(boxes))
+
+    i, j, area = forest.intersect_boxes(boxes)
+    expected_i, expected_j, expected_area = tree.intersect_boxes(boxes)
+    assert (np.diff(i) >= 0).all()
+    assert as_set(i, j) == as_set(expected_i, expected_j)
+    assert np.isclose(area.sum(), expected_area.sum())
+
+
+def test_intersect_faces(grid, forest):
+    tree = CellTree2d(*grid, -1)
+    vertices, faces = demo.generate_disk(4, 3)
+    i, j, area = forest.intersect_faces(vertices, faces, -1)
+    expected_i, expected_j, expected_area = tree.intersect_faces(vertices, faces, -1)
+    assert as_set(i, j) == as_set(expected_i, expected_j)
+    assert np.isclose(area.sum(), expected_area.sum())
+
+
+def test_intersect_edges(grid, forest):
+    tree = CellTree2d(*grid, -1)
+    edges = np.random.default_rng(0).uniform(-1.2, 1.2, (50, 2, 2))
+    i, j, xy = forest.intersect_edges(edges)
+    expected_i, expected_j, expected_xy = tree.intersect_edges(edges)
+    assert as_set(i, j) == as_set(expected_i, expected_j)
+    assert xy.shape == (len(i), 2, 2)
+    length = np.linalg.norm(xy[:, 1] - xy[:, 0], axis=1)
+    expected_length = np.linalg.norm(expected_xy[:, 1] - expected_xy[:, 0], axis=1)
+    assert np.isclose(length.sum(), expected_length.sum())
+
+
+def test_no_partition_queried(forest):
+    boxes = np.array([[100.0, 101.0, 100.0, 101.0]])
+    i, j = forest.locate_boxes(boxes)
+    assert i.shape == j.shape == (0,)
+    i, j, xy = forest.intersect_edges(np.full((1, 2, 2), 100.0))
+    assert xy.shape == (0, 2, 2)
+    assert forest.resident_partitions == ()
+
+
+def test_max_resident(grid, tmp_path):
+    vertices, faces = grid
+    forest = CellTreeForest.build(
+        tmp_path, vertices, faces, -1, max_faces_per_partition=16, max_resident=2
+    )
+    points = np.random.default_rng(0).uniform(-1.0, 1.0, (1000, 2))
+    forest.locate_points(points)
+    assert len(forest.resident_partitions) == 2
+    # The least recently used partition is dropped.
+    first, second = forest.resident_partitions
+    forest.partition(first)
+    assert forest.resident_partitions == (second, first)
+    other = next(k for k in range(forest.n_partition) if k not in (first, second))
+    forest.partition(other)
+    assert forest.resident_partitions == (first, other)
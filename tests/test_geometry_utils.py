@@ -168,6 +168,26 @@ def test_boxes_intersect():
     assert gu.boxes_intersect(b, a)
 
 
+def test_boxes_touch():
+    a = Box(0.0, 1.0, 0.0, 1.0)
+    # Shared edge
+    b = Box(1.0, 2.0, 0.0, 1.0)
+    assert not gu.boxes_intersect(a, b)
+    assert gu.boxes_touch(a, b)
+    assert gu.boxes_touch(b, a)
+    # Shared corner
+    b = Box(1.0, 2.0, 1.0, 2.0)
+    assert gu.boxes_touch(a, b)
+    # Zero size
+    b = Box(0.5, 0.5, 0.5, 0.5)
+    assert gu.boxes_touch(a, b)
+    assert gu.boxes_touch(b, b)
+    # No overlap
+    b = Box(1.5, 2.5, 0.5, 1.0)
+    assert not gu.boxes_touch(a, b)
+    assert not gu.boxes_touch(b, a)
+
+
 def test_box_contained():
     a = Box(0.0, 1.0, 0.0, 1.0)
     b = Box(0.25, 0.75, 0.25, 0.75)
@@ -186,8 +206,23 @@ def test_bounding_box():
         ]
     )
     assert gu.bounding_box(face, vertices) == (0.0, 1.0, 0.0, 1.0)
-    face = np.array([0, 1, 2, -1, -1])
-    assert gu.bounding_box(face, vertices) == (0.0, 1.0, 0.0, 1.0)
+
+
+def test_faces_to_csr():
+    faces = np.array(
+        [
+            [0, 1, 2, -1],
+            [0, 1, 2, 3],
+            [4, 5, 6, -1],
+        ]
+    )
+    face_nodes, face_offsets = gu.faces_to_csr(faces)
+    assert np.array_equal(face_nodes, [0, 1, 2, 0, 1, 2, 3, 4, 5, 6])
+    assert np.array_equal(face_offsets, [0, 3, 7, 10])
+    assert np.array_equal(gu.csr_to_faces(face_nodes, face_offsets, 4), faces)
+    expected = np.full((3, 5), -1)
+    expected[:, :4] = faces
+    assert np.array_equal(gu.csr_to_faces(face_nodes, face_offsets, 5), expected)
 
 
 def test_build_bboxes():
@@ -211,7 +246,7 @@ def test_build_bboxes():
             [0.0, 5.0, 0.0, 5.0],
         ]
     )
-    actual = gu.build_bboxes(faces, vertices)
+    actual = gu.build_bboxes(*gu.faces_to_csr(faces), vertices)
     assert np.array_equal(actual, expected)
 
 
@@ -226,7 +261,7 @@ def test_copy_vertices():
 
         @nb.njit()
         def test():
-            face = np.array([0, 1, 2, -1, -1])
+            face = np.array([0, 1, 2])
             vertices = np.array(
                 [
                     [0.0, 1.0],
@@ -245,7 +280,7 @@ def test_copy_vertices():
         assert test()
 
     else:
-        face = np.array([0, 1, 2, -1, -1])
+        face = np.array([0, 1, 2])
         vertices = np.array(
             [
                 [0.0, 1.0],
@@ -261,7 +296,7 @@ def test_copy_vertices():
 
 def test_copy_vertices_into():
     out = np.empty((10, 2))
-    face = np.array([0, 1, 2, -1, -1])
+    face = np.array([0, 1, 2])
     vertices = np.array(
         [
             [0.0, 1.0],
@@ -285,6 +320,23 @@ def test_point_inside_box():
     assert not gu.point_inside_box(a, box)
 
 
+def test_point_box_distance_squared():
+    box = Box(0.0, 1.0, 0.0, 1.0)
+    assert gu.point_box_distance_squared(Point(0.5, 0.5), box) == 0.0
+    assert gu.point_box_distance_squared(Point(0.5, 3.0), box) == 4.0
+    assert gu.point_box_distance_squared(Point(-1.0, -1.0), box) == 2.0
+
+
+def test_point_segment_distance_squared():
+    a = Point(0.0, 0.0)
+    b = Point(2.0, 0.0)
+    assert gu.point_segment_distance_squared(Point(1.0, 1.0), a, b) == 1.0
+    assert gu.point_segment_distance_squared(Point(3.0, 1.0), a, b) == 2.0
+    assert gu.point_segment_distance_squared(Point(-1.0, 0.0), a, b) == 1.0
+    # Zero length
+    assert gu.point_segment_distance_squared(Point(1.0, 1.0), a, a) == 2.0
+
+
 def test_flip():
     face0 = np.array([0, 1, 2, -1, -1])
     face1 = np.array([0, 1, 2, 3, -1])
@@ -320,10 +372,16 @@ def test_counter_clockwise():
             [5, 4, 3, 2, 1, 0],
         ]
     )
-    expected = ccw_faces.copy()
+    ccw_nodes, offsets = gu.faces_to_csr(ccw_faces)
+    cw_nodes, _ = gu.faces_to_csr(cw_faces)
+    expected = ccw_nodes.copy()
+    both_nodes, both_offsets = gu.faces_to_csr(np.concatenate([ccw_faces, cw_faces]))
+    assert gu.is_counter_clockwise(vertices, ccw_nodes, offsets)
+    assert not gu.is_counter_clockwise(vertices, cw_nodes, offsets)
+    assert not gu.is_counter_clockwise(vertices, both_nodes, both_offsets)
     # already counter clockwise should not be mutated
-    gu.counter_clockwise(vertices, ccw_faces)
-    assert np.array_equal(expected, ccw_faces)
+    gu.counter_clockwise(vertices, ccw_nodes, offsets)
+    assert np.array_equal(expected, ccw_nodes)
     # clockwise should be mutated
-    gu.counter_clockwise(vertices, cw_faces)
-    assert np.array_equal(expected, cw_faces)
+    gu.counter_clockwise(vertices, cw_nodes, offsets)
+    assert np.array_equal(expected, cw_nodes)
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from numba_celltree import CellTree2d, lbvh
+from numba_celltree.constants import MAX_TREE_DEPTH
+
+
+def triangle_grid(n):
+    x = np.linspace(0.0, 1.0, n + 1)
+    xx, yy = np.meshgrid(x, x, indexing="ij")
+    vertices = np.column_stack([xx.ravel(), yy.ravel()])
+    a = (np.arange(n)[:, None] * (n + 1) + np.arange(n)[None, :]).ravel()
+    lower = np.column_stack([a, a + n + 1, a + n + 2])
+    upper = np.column_stack([a, a + n + 2, a + 1])
+    return vertices, np.concatenate([lower, upper])
+
+
+def tree_depth(tree):
+    depth = {0: 1}
+    for parent, children in tree.to_dict_of_lists().items():
+        for child in children:
+            depth[child] = depth[parent] + 1
+    return max(depth.values())
+
+
+def test_spread_bits():
+    assert lbvh.spread_bits(0) == 0
+    assert lbvh.spread_bits(0b111) == 0b10101
+    assert lbvh.spread_bits(2**31 - 1) == int("01" * 31, 2)
+
+
+@pytest.mark.parametrize("n_chunks", [1, 3, 16])
+def test_radix_sort(n_chunks):
+    rng = np.random.default_rng(0)
+    keys = rng.integers(0, 2**62, 1000)
+    # Include duplicates, to check stability.
+    keys[::2] = keys[1::2]
+    values = np.arange(1000)
+    sorted_keys, sorted_values = lbvh.radix_sort(keys, values, n_chunks)
+    order = np.argsort(keys, kind="stable")
+    assert np.array_equal(sorted_keys, keys[order])
+    assert np.array_equal(sorted_values, values[order])
+
+
+def test_morton_codes():
+    bb_coords = np.array(
+        [
+            [0.0, 0.0, 0.0, 0.0],
+            [1.0, 1.0, 0.0, 0.0],
+            [0.0, 0.0, 1.0, 1.0],
+            [1.0, 1.0, 1.0, 1.0],
+        ]
+    )
+    codes = lbvh.morton_codes(bb_coords, np.arange(4))
+    x = lbvh.spread_bits(2**31 - 1)
+    assert np.array_equal(codes, [0, x, x << 1, x | (x << 1)])
+
+
+def test_morton_order():
+    bbox = np.array([0.0, 1.0, 0.0, 1.0])
+    # Points outside of the bounding box are clamped.
+    points = np.array([[1.0, 1.0], [0.0, 1.0], [2.0, -1.0], [-1.0, -1.0]])
+    x = lbvh.spread_bits(2**lbvh.POINT_MORTON_BITS - 1)
+    codes = lbvh.point_morton_codes(points, bbox)
+    assert np.array_equal(codes, [x | (x << 1), x << 1, x, 0])
+    assert np.array_equal(lbvh.morton_order(points, bbox), [3, 2, 1, 0])
+
+
+@pytest.mark.parametrize("cells_per_leaf", [1, 2, 3])
+def test_lbvh_builder(cells_per_leaf):
+    vertices, faces = triangle_grid(20)
+    faces = faces[np.random.default_rng(0).permutation(len(faces))]
+    sah = CellTree2d(vertices, faces, -1, cells_per_leaf=cells_per_leaf)
+    tree = CellTree2d(
+        vertices, faces, -1, cells_per_leaf=cells_per_leaf, builder="lbvh"
+    )
+    assert tree.validate_node_bounds().all()
+    assert tree_depth(tree) < MAX_TREE_DEPTH
+    points = np.random.default_rng(1).uniform(-0.1, 1.1, (500, 2))
+    assert np.array_equal(tree.locate_points(points), sah.locate_points(points))
+    boxes = np.array([[0.1, 0.3, 0.2, 0.25], [0.5, 0.5, 0.5, 0.5]])
+    for actual, expected in zip(tree.locate_boxes(boxes), sah.locate_boxes(boxes)):
+        assert np.array_equal(np.sort(actual), np.sort(expected))
+
+
+def test_lbvh_builder_rebuild(tmp_path):
+    vertices, faces = triangle_grid(5)
+    tree = CellTree2d(vertices, faces, -1, builder="lbvh")
+    tree.save(tmp_path / "tree.bin")
+    assert CellTree2d.load(tmp_path / "tree.bin").builder == "lbvh"
+    tree.rebalance()
+    assert tree.validate_node_bounds().all()
+    with pytest.raises(ValueError, match="builder must be one of"):
+        CellTree2d(vertices, faces, -1, builder="octree")
+
+
+def test_lbvh_depth():
+    # Every Morton split separates a single face: without limiting the depth,
+    # the depth of the tree would equal the number of faces.
+    n = 80
+    offset = 0.5 ** np.arange(n)
+    triangle = np.array([[1.0, 1.0], [1.1, 1.0], [1.0, 1.1]])
+    vertices = (offset[:, None, None] * triangle[None]).reshape((-1, 2))
+    faces = np.arange(3 * n).reshape((n, 3))
+    tree = CellTree2d(vertices, faces, -1, cells_per_leaf=1, builder="lbvh")
+    assert tree_depth(tree) <= MAX_TREE_DEPTH
+    assert tree.validate_node_bounds().all()
+    points = offset[:, None] * np.array([[1.02, 1.02]])
+    assert np.array_equal(tree.locate_points(points), np.arange(n))
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from numba_celltree import CellTree2d, demo
+from numba_celltree import serialization as sr
+from numba_celltree.constants import NodeDType
+
+
+@pytest.fixture
+def tree():
+    vertices, faces = demo.generate_disk(5, 5)
+    return CellTree2d(vertices, faces, -1, n_buckets=3, cells_per_leaf=1)
+
+
+def test_dtype_roundtrip():
+    for dtype in (np.dtype(np.float64), np.dtype(np.intp), NodeDType):
+        assert sr.dict_to_dtype(sr.dtype_to_dict(dtype)) == dtype
+
+
+def test_save_load_arrays(tmp_path):
+    path = tmp_path / "arrays.bin"
+    arrays = {
+        "a": np.arange(10.0).reshape((5, 2)),
+        "b": np.array([1, 2, 3], dtype=np.int8),
+        "c": np.empty((0, 3), dtype=np.intp),
+        "d": np.zeros(4, dtype=NodeDType),
+    }
+    attrs = {"x": 1, "y": "z"}
+    sr.save_arrays(path, arrays, attrs)
+
+    header = sr.read_header(path)
+    for entry in header["arrays"].values():
+        assert entry["offset"] % sr.ALIGNMENT == 0
+
+    for mmap in (True, False):
+        loaded, loaded_attrs = sr.load_arrays(path, mmap=mmap)
+        assert loaded_attrs == attrs
+        assert loaded.keys() == arrays.keys()
+        for name, array in arrays.items():
+            assert loaded[name].dtype == array.dtype
+            assert np.array_equal(loaded[name], array)
+        if mmap:
+            assert isinstance(loaded["a"], np.memmap)
+            assert not loaded["a"].flags.writeable
+
+
+def test_load_errors(tmp_path):
+    path = tmp_path / "garbage.bin"
+    path.write_bytes(b"garbage")
+    with pytest.raises(ValueError, match="is not a numba_celltree file"):
+        sr.load_arrays(path)
+
+    path = tmp_path / "future.bin"
+    sr.save_arrays(path, {"a": np.arange(3)}, {})
+    content = bytearray(path.read_bytes())
+    content[8:12] = (sr.FORMAT_VERSION + 1).to_bytes(4, "little")
+    path.write_bytes(bytes(content))
+    with pytest.raises(ValueError, match="format version"):
+        sr.load_arrays(path)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_celltree_save_load(tree, tmp_path, mmap):
+    path = tmp_path / "tree.bin"
+    tree.save(path)
+    loaded = CellTree2d.load(path, mmap=mmap)
+
+    assert loaded.n_buckets == 3
+    assert loaded.cells_per_leaf == 1
+    for name in ("vertices", "faces", "nodes", "bb_indices", "bb_coords", "bbox"):
+        assert np.array_equal(getattr(loaded, name), getattr(tree, name))
+
+    points = np.array([[0.1, 0.1], [0.5, -0.5], [2.0, 2.0]])
+    assert np.array_equal(loaded.locate_points(points), tree.locate_points(points))
+    box_coords = np.array([[-0.5, 0.5, -0.5, 0.5]])
+    for actual, expected in zip(
+        loaded.locate_boxes(box_coords), tree.locate_boxes(box_coords)
+    ):
+        assert np.array_equal(actual, expected)
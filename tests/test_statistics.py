@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from numba_celltree import AABBTree2d, CellTree2d, EdgeTree2d, demo
+
+
+def tree_depth(tree):
+    depth = {0: 0}
+    for parent, children in tree.to_dict_of_lists().items():
+        for child in children:
+            depth[child] = depth[parent] + 1
+    return max(depth.values())
+
+
+@pytest.mark.parametrize("cells_per_leaf", [1, 2, 4])
+def test_stats(cells_per_leaf):
+    vertices, faces = demo.generate_disk(5, 5)
+    tree = CellTree2d(vertices, faces, -1, cells_per_leaf=cells_per_leaf)
+    stats = tree.stats()
+    assert stats["n_nodes"] == len(tree.nodes)
+    assert stats["n_leaves"] == (tree.nodes["child"] == -1).sum()
+    assert stats["n_nodes"] == 2 * stats["n_leaves"] - 1
+    assert stats["max_depth"] == tree_depth(tree)
+    assert stats["depth_histogram"].sum() == stats["n_leaves"]
+    sizes = stats["leaf_size_histogram"]
+    assert len(sizes) == cells_per_leaf + 1
+    assert (sizes * np.arange(len(sizes))).sum() == len(faces)
+    assert stats["mean_leaf_size"] == len(faces) / stats["n_leaves"]
+    assert stats["overlap"] > 0.0
+    assert 0.0 < stats["mean_relative_overlap"] <= 1.0
+    assert stats["n_overlapping"] <= stats["n_nodes"] - stats["n_leaves"]
+    assert stats["sah_cost"] > 0.0
+    assert stats["nbytes"]["nodes"] == tree.nodes.nbytes
+    assert stats["nbytes"]["face_nodes"] == tree.face_nodes.nbytes
+    assert stats["nbytes"]["face_offsets"] == tree.face_offsets.nbytes
+
+
+def test_stats_overlap():
+    x, y = np.meshgrid(np.arange(16.0), np.arange(16.0))
+    x = x.ravel()
+    y = y.ravel()
+    tree = AABBTree2d(np.column_stack([x, x + 1.0, y, y + 1.0]), cells_per_leaf=1)
+    stats = tree.stats()
+    internal = tree.nodes[tree.nodes["child"] != -1]
+    overlap = internal["Lmax"] - internal["Rmin"]
+    assert stats["n_leaves"] == 256
+    assert stats["overlap"] == overlap[overlap > 0].sum()
+    assert stats["n_overlapping"] == (overlap > 0).sum()
+    assert 0.0 <= stats["mean_relative_overlap"] <= 1.0
+    assert set(stats["nbytes"]) == {"nodes", "bb_indices", "bb_coords"}
+
+
+# The bounds of emptied nodes are inverted: subtracting them overflows, with a
+# warning when running without JIT.
+@pytest.mark.filterwarnings("error")
+def test_stats_removed_faces():
+    vertices, faces = demo.generate_disk(5, 5)
+    tree = CellTree2d(vertices, faces, -1, cells_per_leaf=1)
+    tree.remove_faces(np.arange(10))
+    stats = tree.stats()
+    assert stats["leaf_size_histogram"][0] == 10
+    assert np.isfinite(stats["sah_cost"])
+    assert np.isfinite(stats["mean_relative_overlap"])
+
+    tree.remove_faces(np.arange(10, len(faces)))
+    stats = tree.stats()
+    assert stats["leaf_size_histogram"][0] == stats["n_leaves"]
+    assert stats["sah_cost"] == 0.0
+    assert stats["overlap"] == 0.0
+
+
+def test_edge_tree_stats():
+    vertices, faces = demo.generate_disk(5, 5)
+    edge_nodes = demo.edges(faces, -1)
+    stats = EdgeTree2d(vertices, edge_nodes).stats()
+    sizes = stats["leaf_size_histogram"]
+    assert (sizes * np.arange(len(sizes))).sum() == len(edge_nodes)
+    assert stats["nbytes"]["edge_nodes"] == edge_nodes.astype(np.intp).nbytes
@@ -48,6 +48,17 @@ def test_allocate_stack():
     assert do_allocate_stack()
 
 
+@nb.njit
+def do_allocate_float_stack():
+    stack = ut.allocate_float_stack()
+    stack[0] = 0.5
+    return (stack.size == MAX_TREE_DEPTH) and (stack[0] == 0.5)
+
+
+def test_allocate_float_stack():
+    assert do_allocate_float_stack()
+
+
 @nb.njit
 def do_allocate_polygon():
     poly = ut.allocate_polygon()